@@ -0,0 +1,296 @@
+"""
+Bulk booking and rescheduling.
+
+A batch is a list of items; an item without ``id`` books a new appointment
+and an item with ``id`` moves an existing scheduled one to another time
+and/or doctor. Items are applied in order, so a later item may take a slot
+an earlier reschedule freed, and all of them are validated with a fixed
+number of queries regardless of the batch size: one each for the
+appointments being moved, the patients and the doctors, the slot index for
+working hours and one range query for the doctors' scheduled appointments,
+against which conflicts are checked in memory.
+
+``atomic`` batches are written all or nothing. Otherwise valid items are
+written and invalid ones reported. Writes use ``bulk_create`` and
+``bulk_update``, publish one outbox event per batch and invalidate the slot
+index of the affected doctors.
+"""
+import bisect
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from doctors import slots
+from doctors.caching import invalidate_doctor
+from doctors.models import Doctor
+from patients.models import Patient
+from .exceptions import AppointmentConflict, conflict_guard
+from .models import Appointment
+from . import events
+
+
+class BulkItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    patient = serializers.IntegerField(required=False)
+    doctor = serializers.IntegerField(required=False)
+    appointment_datetime = serializers.DateTimeField(required=False)
+    reason = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, data):
+        if 'id' not in data:
+            missing = [field for field in ('patient', 'doctor', 'appointment_datetime') if field not in data]
+            if missing:
+                raise serializers.ValidationError({field: ['This field is required.'] for field in missing})
+        return data
+
+
+class BulkItem:
+    __slots__ = ('index', 'data', 'appointment', 'previous', 'errors')
+
+    def __init__(self, index, data=None, errors=None):
+        self.index = index
+        self.data = data
+        self.appointment = None
+        # (doctor_id, appointment_datetime) before a reschedule
+        self.previous = None
+        self.errors = errors
+
+    def fail(self, message):
+        self.errors = {'non_field_errors': [message]}
+
+
+def _parse(items):
+    serializer = BulkItemSerializer()
+    parsed = []
+    for index, item in enumerate(items):
+        try:
+            parsed.append(BulkItem(index, serializer.run_validation(item)))
+        except ValidationError as error:
+            parsed.append(BulkItem(index, errors=as_serializer_error(error)))
+    return parsed
+
+
+def _resolve(parsed):
+    """Turn items into unsaved or modified Appointment instances (three queries)."""
+    pending = [item for item in parsed if item.errors is None]
+    existing = Appointment.objects.in_bulk([item.data['id'] for item in pending if 'id' in item.data])
+    patient_ids = set(Patient.objects.filter(
+        id__in={item.data['patient'] for item in pending if 'patient' in item.data}
+    ).values_list('id', flat=True))
+    doctor_ids = set(Doctor.objects.filter(
+        id__in={item.data['doctor'] for item in pending if 'doctor' in item.data}
+    ).values_list('id', flat=True))
+
+    moved = set()
+    for item in pending:
+        data = item.data
+        if 'patient' in data and data['patient'] not in patient_ids:
+            item.errors = {'patient': [f"Patient {data['patient']} does not exist."]}
+            continue
+        if 'doctor' in data and data['doctor'] not in doctor_ids:
+            item.errors = {'doctor': [f"Doctor {data['doctor']} does not exist."]}
+            continue
+        if 'id' not in data:
+            item.appointment = Appointment(
+                patient_id=data['patient'], doctor_id=data['doctor'],
+                appointment_datetime=data['appointment_datetime'],
+                reason=data.get('reason'), notes=data.get('notes'),
+            )
+            continue
+
+        appointment = existing.get(data['id'])
+        if appointment is None:
+            item.errors = {'id': [f"Appointment {data['id']} does not exist."]}
+        elif appointment.status != 'SCHEDULED':
+            item.fail("Only scheduled appointments can be rescheduled.")
+        elif appointment.id in moved:
+            item.errors = {'id': ["Appointment appears more than once in the batch."]}
+        else:
+            moved.add(appointment.id)
+            item.previous = (appointment.doctor_id, appointment.appointment_datetime)
+            if 'patient' in data:
+                appointment.patient_id = data['patient']
+            appointment.doctor_id = data.get('doctor', appointment.doctor_id)
+            appointment.appointment_datetime = data.get('appointment_datetime', appointment.appointment_datetime)
+            for field in ('reason', 'notes'):
+                if field in data:
+                    setattr(appointment, field, data[field])
+            item.appointment = appointment
+
+
+def _check_hours(items, now):
+    """Working hours and the no-past rule, from the slot index; returns the days looked at."""
+    for item in items:
+        appointment = item.appointment
+        if timezone.is_naive(appointment.appointment_datetime):
+            appointment.appointment_datetime = timezone.make_aware(appointment.appointment_datetime)
+    days = slots.get_days(
+        {item.appointment.doctor_id for item in items},
+        {timezone.localtime(item.appointment.appointment_datetime).date() for item in items},
+    )
+    for item in items:
+        value = item.appointment.appointment_datetime
+        local = timezone.localtime(value)
+        day = days[(item.appointment.doctor_id, local.date())]
+        minute = local.hour * 60 + local.minute
+        if value < now:
+            item.fail("Cannot schedule appointments in the past")
+        elif day is None:
+            item.fail(f"Doctor is not available on {value.strftime('%A')}")
+        elif not day.contains(minute):
+            item.fail(slots.hours_error(day))
+    return days
+
+
+def _check_conflicts(items, days):
+    """
+    Check every item against the scheduled appointments and the items accepted
+    before it (one query), giving each a free seat of its slot.
+    """
+    lookback = datetime.timedelta(minutes=slots.LOOKBACK_MINUTES)
+    values = [item.appointment.appointment_datetime for item in items]
+    booked = {}
+    for appointment_id, doctor_id, value, duration, seat in Appointment.objects.filter(
+        doctor_id__in={item.appointment.doctor_id for item in items},
+        status='SCHEDULED',
+        appointment_datetime__gt=min(values) - lookback,
+        appointment_datetime__lt=max(values) + lookback,
+    ).values_list('id', 'doctor_id', 'appointment_datetime', 'duration_minutes', 'seat'):
+        booked.setdefault(doctor_id, []).append((value, duration, seat, appointment_id))
+    for times in booked.values():
+        times.sort()
+
+    for item in items:
+        appointment = item.appointment
+        value = appointment.appointment_datetime
+        local = timezone.localtime(value)
+        day = days[(appointment.doctor_id, local.date())]
+        times = booked.setdefault(appointment.doctor_id, [])
+        nearby = []
+        for other, duration, seat, other_id in times[bisect.bisect_left(times, (value - lookback,)):]:
+            if other >= value + datetime.timedelta(minutes=day.span):
+                break
+            if other_id != appointment.id:
+                nearby.append((slots.local_minute(other, local.date()), duration, seat))
+        preferred = appointment.seat if item.previous else None
+        seat = day.free_seat(local.hour * 60 + local.minute, nearby, preferred)
+        if seat is None:
+            item.errors = {'non_field_errors': [AppointmentConflict.default_detail]}
+            continue
+        appointment.seat = seat
+        appointment.duration_minutes = day.policy.slot_minutes
+        if item.previous:
+            previous = booked.get(item.previous[0], [])
+            previous[:] = [entry for entry in previous if entry[3] != appointment.id]
+        # new bookings have no id yet; 0 never matches a stored appointment
+        bisect.insort(times, (value, appointment.duration_minutes, seat, appointment.id or 0))
+
+
+def validate(items, now=None):
+    """Validate a batch; returns the ``BulkItem`` list with ``errors`` set on the failures."""
+    now = now or timezone.now()
+    parsed = _parse(items)
+    _resolve(parsed)
+    pending = [item for item in parsed if item.errors is None]
+    if pending:
+        days = _check_hours(pending, now)
+        pending = [item for item in pending if item.errors is None]
+    if pending:
+        _check_conflicts(pending, days)
+    return parsed
+
+
+def _assign_ids(appointments):
+    """Fill in the ids ``bulk_create`` could not return, via the unique scheduled seat."""
+    missing = [appointment for appointment in appointments if appointment.pk is None]
+    if not missing:
+        return
+    stored = {
+        (doctor_id, value, seat): appointment_id
+        for appointment_id, doctor_id, value, seat in Appointment.objects.filter(
+            status='SCHEDULED',
+            doctor_id__in={appointment.doctor_id for appointment in missing},
+            appointment_datetime__in={appointment.appointment_datetime for appointment in missing},
+        ).values_list('id', 'doctor_id', 'appointment_datetime', 'seat')
+    }
+    for appointment in missing:
+        appointment.pk = stored[(appointment.doctor_id, appointment.appointment_datetime, appointment.seat)]
+
+
+def _write_items(items):
+    booked = [item for item in items if not item.previous]
+    moved = [item for item in items if item.previous]
+    now = timezone.now()
+
+    # moves first: a booking may take a slot a reschedule frees
+    updated = [item.appointment for item in moved]
+    for appointment in updated:
+        appointment.updated_at = now
+    Appointment.objects.bulk_update(
+        updated, ['patient', 'doctor', 'appointment_datetime', 'duration_minutes', 'seat', 'reason', 'notes', 'updated_at']
+    )
+
+    created = [item.appointment for item in booked]
+    for appointment in created:
+        appointment.created_at = appointment.updated_at = now
+    Appointment.objects.bulk_create(created)
+    _assign_ids(created)
+
+    if created:
+        events.appointments_booked(created)
+    if moved:
+        events.appointments_rescheduled([(item.appointment, *item.previous) for item in moved])
+
+    doctor_ids = {item.appointment.doctor_id for item in items} | {item.previous[0] for item in moved}
+    for doctor_id in doctor_ids:
+        invalidate_doctor(doctor_id)
+
+
+def write(items, atomic=True):
+    """
+    Write the valid ``items``. In an ``atomic`` batch any invalid item, or a
+    slot taken concurrently, writes nothing; otherwise a concurrent conflict
+    only fails the items involved.
+    """
+    valid = [item for item in items if item.errors is None]
+    if atomic and len(valid) != len(items):
+        return False
+    if not valid:
+        return True
+    if atomic:
+        with conflict_guard():
+            _write_items(valid)
+        return True
+
+    try:
+        with transaction.atomic():
+            _write_items(valid)
+    except IntegrityError:
+        # a slot was taken after validation; retry item by item to isolate it
+        for item in valid:
+            if not item.previous:
+                item.appointment.pk = None
+            try:
+                with transaction.atomic():
+                    _write_items([item])
+            except IntegrityError:
+                item.errors = {'non_field_errors': [AppointmentConflict.default_detail]}
+    return True
+
+
+def result(item):
+    if item.errors is not None:
+        return {'index': item.index, 'status': 'error', 'errors': item.errors}
+    appointment = item.appointment
+    return {
+        'index': item.index,
+        'status': 'rescheduled' if item.previous else 'created',
+        'id': appointment.id,
+        'doctor': appointment.doctor_id,
+        'appointment_datetime': appointment.appointment_datetime.isoformat(),
+    }
@@ -0,0 +1,51 @@
+"""Outbox events published by appointment writes."""
+from core import outbox
+
+APPOINTMENT_CREATED = 'appointment.created'
+APPOINTMENT_STATUS_CHANGED = 'appointment.status_changed'
+# one event for a whole batch of bookings made through the bulk endpoint
+APPOINTMENTS_BOOKED = 'appointment.bulk_created'
+APPOINTMENTS_RESCHEDULED = 'appointment.rescheduled'
+
+
+def _payload(appointment, **extra):
+    return {
+        'appointment_id': appointment.id,
+        'patient_id': appointment.patient_id,
+        'doctor_id': appointment.doctor_id,
+        'appointment_datetime': appointment.appointment_datetime.isoformat(),
+        'status': appointment.status,
+        **extra,
+    }
+
+
+def appointment_created(appointment):
+    return outbox.publish(APPOINTMENT_CREATED, appointment, _payload(appointment))
+
+
+def status_changed(appointment, previous_status):
+    return outbox.publish(
+        APPOINTMENT_STATUS_CHANGED,
+        appointment,
+        _payload(appointment, previous_status=previous_status),
+    )
+
+
+def appointments_booked(appointments):
+    return outbox.publish_batch(
+        APPOINTMENTS_BOOKED,
+        appointments,
+        {'appointment_ids': [appointment.id for appointment in appointments]},
+    )
+
+
+def appointments_rescheduled(changes):
+    """``changes`` are ``(appointment, previous doctor_id, previous appointment_datetime)``."""
+    return outbox.publish_batch(
+        APPOINTMENTS_RESCHEDULED,
+        [appointment for appointment, _, _ in changes],
+        {'appointments': [
+            _payload(appointment, previous_doctor_id=doctor_id, previous_datetime=value.isoformat())
+            for appointment, doctor_id, value in changes
+        ]},
+    )
@@ -0,0 +1,24 @@
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class AppointmentConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This time slot conflicts with an existing appointment. Please select another time."
+    default_code = 'appointment_conflict'
+
+
+@contextmanager
+def conflict_guard():
+    """
+    Run a booking write in its own savepoint and report a violation of the
+    scheduled-slot constraints as a 409 instead of a server error.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        raise AppointmentConflict() from exc
@@ -0,0 +1,85 @@
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# appointments were 30 minutes long when this migration was written
+APPOINTMENT_MINUTES = 30
+
+# PostgreSQL can reject overlapping scheduled appointments, not just identical
+# start times. The range is built in UTC so that the index expression stays
+# immutable. Other backends rely on the unique constraint alone, which only
+# rejects identical start times; overlaps there are caught by the serializer's
+# check, which a concurrent booking can still race.
+CREATE_EXCLUSION = """
+    CREATE EXTENSION IF NOT EXISTS btree_gist;
+    ALTER TABLE appointments_appointment
+        ADD CONSTRAINT exclude_overlapping_scheduled_appointments
+        EXCLUDE USING gist (
+            doctor_id WITH =,
+            tsrange(
+                appointment_datetime AT TIME ZONE 'UTC',
+                (appointment_datetime AT TIME ZONE 'UTC') + interval '30 minutes'
+            ) WITH &&
+        )
+        WHERE (status = 'SCHEDULED');
+"""
+
+DROP_EXCLUSION = """
+    ALTER TABLE appointments_appointment
+        DROP CONSTRAINT IF EXISTS exclude_overlapping_scheduled_appointments;
+"""
+
+
+def cancel_conflicting_appointments(apps, schema_editor):
+    """
+    Cancel every scheduled appointment that overlaps an earlier one of the same
+    doctor, so that the constraints can be added to a table already holding
+    double bookings. The earliest booking of each conflict is kept; the
+    cancelled ones are flagged in their notes.
+    """
+    Appointment = apps.get_model('appointments', 'Appointment')
+    scheduled = Appointment.objects.filter(status='SCHEDULED').order_by(
+        'doctor_id', 'appointment_datetime', 'created_at', 'id'
+    )
+    now = timezone.now()
+    cancelled = []
+    doctor_id = kept = kept_until = None
+    for appointment in scheduled.iterator():
+        if appointment.doctor_id == doctor_id and appointment.appointment_datetime < kept_until:
+            appointment.status = 'CANCELLED'
+            flag = f'Cancelled when double bookings were removed: overlapped appointment {kept}.'
+            appointment.notes = f'{flag}\n{appointment.notes}' if appointment.notes else flag
+            appointment.updated_at = now
+            cancelled.append(appointment)
+            continue
+        # appointments are equally long, so overlapping the last kept one is the only case
+        doctor_id, kept = appointment.doctor_id, appointment.id
+        kept_until = appointment.appointment_datetime + datetime.timedelta(minutes=APPOINTMENT_MINUTES)
+    Appointment.objects.bulk_update(cancelled, ['status', 'notes', 'updated_at'], batch_size=500)
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_EXCLUSION)
+
+
+def remove_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_EXCLUSION)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_conflicting_appointments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'SCHEDULED')), fields=('doctor', 'appointment_datetime'), name='unique_scheduled_doctor_slot'),
+        ),
+        migrations.RunPython(add_exclusion_constraint, remove_exclusion_constraint),
+    ]
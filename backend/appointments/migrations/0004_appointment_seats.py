@@ -0,0 +1,80 @@
+# Generated by Django 3.2.12 on 2026-10-18 07:28
+
+from django.db import migrations, models
+
+# the overlap constraint of migration 0002 assumed 30 minute appointments with one
+# patient each; it now covers each appointment's own duration, per seat. Existing
+# rows get duration 30 and seat 0, which is what 0002 already enforced (after
+# cancelling the double bookings), so no data needs fixing here.
+DROP_EXCLUSION = """
+    ALTER TABLE appointments_appointment
+        DROP CONSTRAINT IF EXISTS exclude_overlapping_scheduled_appointments;
+"""
+
+CREATE_SEAT_EXCLUSION = """
+    ALTER TABLE appointments_appointment
+        ADD CONSTRAINT exclude_overlapping_scheduled_appointments
+        EXCLUDE USING gist (
+            doctor_id WITH =,
+            seat WITH =,
+            tsrange(
+                appointment_datetime AT TIME ZONE 'UTC',
+                (appointment_datetime AT TIME ZONE 'UTC') + duration_minutes * interval '1 minute'
+            ) WITH &&
+        )
+        WHERE (status = 'SCHEDULED');
+"""
+
+CREATE_EXCLUSION = """
+    ALTER TABLE appointments_appointment
+        ADD CONSTRAINT exclude_overlapping_scheduled_appointments
+        EXCLUDE USING gist (
+            doctor_id WITH =,
+            tsrange(
+                appointment_datetime AT TIME ZONE 'UTC',
+                (appointment_datetime AT TIME ZONE 'UTC') + interval '30 minutes'
+            ) WITH &&
+        )
+        WHERE (status = 'SCHEDULED');
+"""
+
+
+def add_seat_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_EXCLUSION)
+        schema_editor.execute(CREATE_SEAT_EXCLUSION)
+
+
+def restore_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_EXCLUSION)
+        schema_editor.execute(CREATE_EXCLUSION)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_appointment_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='appointment',
+            name='unique_scheduled_doctor_slot',
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='duration_minutes',
+            field=models.PositiveSmallIntegerField(default=30),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='seat',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'SCHEDULED')), fields=('doctor', 'appointment_datetime', 'seat'), name='unique_scheduled_doctor_slot'),
+        ),
+        migrations.RunPython(add_seat_exclusion, restore_exclusion),
+    ]
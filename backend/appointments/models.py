@@ -1,30 +1,73 @@
 from django.db import models
+from django.utils import timezone
 from patients.models import Patient
 from doctors.models import Doctor
+from doctors.slots import day_bounds
+
+
+class AppointmentQuerySet(models.QuerySet):
+    def on_date(self, date):
+        """
+        Appointments on a local calendar day. Filters on a datetime range rather
+        than ``appointment_datetime__date`` so the lookup can use an index.
+        """
+        start, end = day_bounds(date)
+        return self.filter(appointment_datetime__gte=start, appointment_datetime__lt=end)
+
 
 class Appointment(models.Model):
+    """
+    A booking of a doctor's slot. Scheduled appointments may not overlap on the
+    same seat: PostgreSQL enforces it with an exclusion constraint, while other
+    backends only reject identical start times at the database and rely on the
+    serializer's overlap check otherwise.
+    """
     STATUS_CHOICES = [
         ('SCHEDULED', 'Scheduled'),
         ('COMPLETED', 'Completed'),
         ('CANCELLED', 'Cancelled'),
     ]
     
-    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='appointments')
-    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='appointments')
+    # no index of their own: the composite indexes below lead with these columns
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='appointments', db_index=False)
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='appointments', db_index=False)
     appointment_datetime = models.DateTimeField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='SCHEDULED')
     reason = models.TextField(blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
+    # set from the doctor's slot policy when booked; seats let a slot take several patients
+    duration_minutes = models.PositiveSmallIntegerField(default=30)
+    seat = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AppointmentQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.patient} with {self.doctor} on {self.appointment_datetime}"
         
     class Meta:
         ordering = ['-appointment_datetime']
+        indexes = [
+            # doctor schedules: slot lookups and conflict checks
+            models.Index(fields=['doctor', 'status', 'appointment_datetime'], name='appt_doctor_status_dt_idx'),
+            # my_appointments and the dashboard, whatever the status
+            models.Index(fields=['doctor', 'appointment_datetime'], name='appt_doctor_dt_idx'),
+            # patient history, newest first
+            models.Index(fields=['patient', 'appointment_datetime'], name='appt_patient_dt_idx'),
+            # ?date= and ?upcoming= filters across all doctors
+            models.Index(fields=['appointment_datetime'], name='appt_dt_idx'),
+        ]
+        constraints = [
+            # a seat of a doctor's slot cannot hold two scheduled appointments starting at the same
+            # time; on PostgreSQL migration 0004 also adds an exclusion constraint for overlaps
+            models.UniqueConstraint(
+                fields=['doctor', 'appointment_datetime', 'seat'],
+                condition=models.Q(status='SCHEDULED'),
+                name='unique_scheduled_doctor_slot',
+            ),
+        ]
         
     def is_upcoming(self):
         """Return whether the appointment is in the future"""
-        from django.utils import timezone
         return self.appointment_datetime > timezone.now()
\ No newline at end of file
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from .models import Appointment
+from .exceptions import AppointmentConflict, conflict_guard
 from patients.serializers import PatientListSerializer
 from doctors.serializers import DoctorListSerializer
+from doctors import slots
 from django.utils import timezone
 import datetime
 
@@ -15,13 +17,15 @@ class AppointmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = '__all__'
+        read_only_fields = ['duration_minutes', 'seat']
         
     def get_appointment_date(self, obj):
         return obj.appointment_datetime.date()
         
     def validate(self, data):
-        doctor = data.get('doctor')
-        appointment_datetime = data.get('appointment_datetime')
+        doctor = data.get('doctor', getattr(self.instance, 'doctor', None))
+        appointment_datetime = data.get('appointment_datetime', getattr(self.instance, 'appointment_datetime', None))
+        appointment_status = data.get('status', getattr(self.instance, 'status', 'SCHEDULED'))
         appointment_id = self.instance.id if self.instance else None
         
         if timezone.is_naive(appointment_datetime):
@@ -30,45 +34,44 @@ class AppointmentSerializer(serializers.ModelSerializer):
         if appointment_datetime < timezone.now():
             raise serializers.ValidationError("Cannot schedule appointments in the past")
         
-        appointment_day = appointment_datetime.strftime('%a').upper()[:3]
-        doctor_availabilities = doctor.availabilities.filter(day_of_week=appointment_day)
-        
-        if not doctor_availabilities.exists():
-            raise serializers.ValidationError(f"Doctor is not available on {appointment_datetime.strftime('%A')}")
-        
+        # the doctor's day comes from the slot index, so only the conflict check below hits the database
         local_appointment_datetime = timezone.localtime(appointment_datetime)
-        appointment_time = local_appointment_datetime.time()
-        availability = doctor_availabilities.first()
-        
-        print(f"Appointment time: {appointment_time.strftime('%H:%M')}")
-        print(f"Doctor available from: {availability.start_time.strftime('%H:%M')} to {availability.end_time.strftime('%H:%M')}")
-        
-        appt_minutes = appointment_time.hour * 60 + appointment_time.minute
-        start_minutes = availability.start_time.hour * 60 + availability.start_time.minute
-        end_minutes = availability.end_time.hour * 60 + availability.end_time.minute
-        
-        if appt_minutes < start_minutes or appt_minutes > end_minutes:
-            raise serializers.ValidationError(
-                f"Appointment time must be between {availability.start_time.strftime('%H:%M')} and {availability.end_time.strftime('%H:%M')}")
+        day = slots.get_day(doctor.id, local_appointment_datetime.date())
         
-        appointment_end = appointment_datetime + datetime.timedelta(minutes=30)
-        
-        conflicting_appointments = Appointment.objects.filter(
-            doctor=doctor,
-            status='SCHEDULED',
-            appointment_datetime__lt=appointment_end,
-            appointment_datetime__gt=appointment_datetime - datetime.timedelta(minutes=30)
-        )
-        
-        print(f"Conflicting appointments found: {conflicting_appointments.exists()}")
-        if conflicting_appointments.exists():
-            print(f"Conflict with: {conflicting_appointments.first().appointment_datetime}")
-        
-        if appointment_id:
-            conflicting_appointments = conflicting_appointments.exclude(id=appointment_id)
-        
-        if conflicting_appointments.exists():
-            raise serializers.ValidationError(
-                "This time slot conflicts with an existing appointment. Please select another time.")
+        if day is None:
+            raise serializers.ValidationError(f"Doctor is not available on {appointment_datetime.strftime('%A')}")
         
-        return data
\ No newline at end of file
+        appt_minutes = local_appointment_datetime.hour * 60 + local_appointment_datetime.minute
+        
+        if not day.contains(appt_minutes):
+            raise serializers.ValidationError(slots.hours_error(day))
+        
+        if appointment_status != 'SCHEDULED':
+            return data
+        
+        # one query for the appointments that may overlap, then a free seat is picked in memory
+        booked = [
+            (slots.local_minute(value, local_appointment_datetime.date()), duration, seat)
+            for value, duration, seat in Appointment.objects.filter(
+                doctor=doctor,
+                status='SCHEDULED',
+                appointment_datetime__lt=appointment_datetime + datetime.timedelta(minutes=day.span),
+                appointment_datetime__gt=appointment_datetime - datetime.timedelta(minutes=slots.LOOKBACK_MINUTES)
+            ).exclude(id=appointment_id).values_list('appointment_datetime', 'duration_minutes', 'seat')
+        ]
+        
+        seat = day.free_seat(appt_minutes, booked, getattr(self.instance, 'seat', None))
+        if seat is None:
+            raise AppointmentConflict()
+        
+        data['seat'] = seat
+        data['duration_minutes'] = day.policy.slot_minutes
+        return data
+    
+    def create(self, validated_data):
+        with conflict_guard():
+            return super().create(validated_data)
+    
+    def update(self, instance, validated_data):
+        with conflict_guard():
+            return super().update(instance, validated_data)
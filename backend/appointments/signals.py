@@ -0,0 +1,35 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from doctors import slots
+from .models import Appointment
+
+
+def _booking(instance):
+    if instance.status == 'SCHEDULED' and instance.doctor_id and instance.appointment_datetime:
+        return (instance.doctor_id, instance.appointment_datetime, instance.duration_minutes)
+    return None
+
+
+@receiver(post_init, sender=Appointment)
+def remember_booking(sender, instance, **kwargs):
+    instance._slot_booking = _booking(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Appointment)
+def update_slot_index(sender, instance, **kwargs):
+    previous = getattr(instance, '_slot_booking', None)
+    current = _booking(instance)
+    if previous != current:
+        if previous:
+            slots.invalidate_booking(*previous)
+        if current:
+            slots.invalidate_booking(*current)
+    instance._slot_booking = current
+
+
+@receiver(post_delete, sender=Appointment)
+def release_slot(sender, instance, **kwargs):
+    previous = getattr(instance, '_slot_booking', None)
+    if previous:
+        slots.invalidate_booking(*previous)
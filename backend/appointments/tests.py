@@ -1,3 +1,292 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+import datetime
 
-# Create your tests here.
+from patients.models import Patient
+from doctors.models import Doctor, Availability
+from appointments.models import Appointment
+from appointments.serializers import AppointmentSerializer
+from appointments.exceptions import AppointmentConflict
+from appointments import bulk
+from notifications.models import Notification
+from core.models import OutboxEvent
+from core import outbox
+
+
+User = get_user_model()
+
+
+def next_weekday(weekday):
+   date = timezone.localdate() + datetime.timedelta(days=7)
+   return date + datetime.timedelta(days=(weekday - date.weekday()) % 7)
+
+
+def local_datetime(date, hour, minute=0):
+   return timezone.make_aware(datetime.datetime.combine(date, datetime.time(hour, minute)))
+
+
+class AppointmentConflictTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       self.other_patient = Patient.objects.create(
+           first_name='Alice',
+           last_name='Johnson',
+           date_of_birth='1985-05-15',
+           email='alice.johnson@example.com'
+       )
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology'
+       )
+       Availability.objects.create(
+           doctor=self.doctor,
+           day_of_week='MON',
+           start_time=datetime.time(9, 0),
+           end_time=datetime.time(17, 0)
+       )
+       self.monday = next_weekday(0)
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def booking(self, patient, hour, minute=0):
+       return {
+           'patient': patient.id,
+           'doctor': self.doctor.id,
+           'appointment_datetime': local_datetime(self.monday, hour, minute).isoformat(),
+           'status': 'SCHEDULED'
+       }
+
+   def test_overlapping_booking_is_rejected_with_409(self):
+       response = self.client.post('/api/appointments/', self.booking(self.patient, 10))
+       self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+       response = self.client.post('/api/appointments/', self.booking(self.other_patient, 10, 15))
+       self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+   def test_concurrent_bookings_of_same_slot_get_409(self):
+       first = AppointmentSerializer(data=self.booking(self.patient, 10))
+       second = AppointmentSerializer(data=self.booking(self.other_patient, 10))
+       self.assertTrue(first.is_valid())
+       self.assertTrue(second.is_valid())
+       first.save()
+       # the second booking passed validation before the first one was written
+       with self.assertRaises(AppointmentConflict):
+           second.save()
+       self.assertEqual(Appointment.objects.count(), 1)
+
+   def test_database_rejects_duplicate_scheduled_slot(self):
+       Appointment.objects.create(
+           patient=self.patient,
+           doctor=self.doctor,
+           appointment_datetime=local_datetime(self.monday, 10)
+       )
+       with self.assertRaises(IntegrityError), transaction.atomic():
+           Appointment.objects.create(
+               patient=self.other_patient,
+               doctor=self.doctor,
+               appointment_datetime=local_datetime(self.monday, 10)
+           )
+
+   def test_cancelled_slot_can_be_rebooked(self):
+       Appointment.objects.create(
+           patient=self.patient,
+           doctor=self.doctor,
+           appointment_datetime=local_datetime(self.monday, 10),
+           status='CANCELLED'
+       )
+       response = self.client.post('/api/appointments/', self.booking(self.other_patient, 10))
+       self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+   def test_validation_checks_conflicts_in_one_query(self):
+       AppointmentSerializer(data=self.booking(self.patient, 10)).is_valid()
+       serializer = AppointmentSerializer(data=self.booking(self.patient, 11))
+       # patient and doctor lookups plus the conflict check; the doctor's day is cached
+       with self.assertNumQueries(3):
+           self.assertTrue(serializer.is_valid())
+
+
+class BulkAppointmentTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       self.sick_doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Physiotherapy'
+       )
+       self.cover_doctor = Doctor.objects.create(
+           first_name='Greg',
+           last_name='House',
+           email='greg.house@example.com',
+           specialization='Physiotherapy'
+       )
+       for doctor in (self.sick_doctor, self.cover_doctor):
+           Availability.objects.create(
+               doctor=doctor,
+               day_of_week='MON',
+               start_time=datetime.time(9, 0),
+               end_time=datetime.time(17, 0)
+           )
+       self.monday = next_weekday(0)
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def item(self, doctor, date, hour, minute=0):
+       return {
+           'patient': self.patient.id,
+           'doctor': doctor.id,
+           'appointment_datetime': local_datetime(date, hour, minute).isoformat(),
+           'reason': 'Physiotherapy'
+       }
+
+   def series(self, weeks, hour=10):
+       return [self.item(self.sick_doctor, self.monday + datetime.timedelta(weeks=i), hour) for i in range(weeks)]
+
+   def test_books_recurring_series(self):
+       response = self.client.post('/api/appointments/bulk/', {'items': self.series(6)}, format='json')
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       self.assertEqual(response.data['created'], 6)
+       ids = [result['id'] for result in response.data['results']]
+       self.assertEqual(sorted(ids), sorted(Appointment.objects.values_list('id', flat=True)))
+
+       # one event for the batch; its consumer bulk-inserts the confirmations
+       event = OutboxEvent.objects.get(topic='appointment.bulk_created')
+       self.assertEqual(sorted(event.payload['appointment_ids']), sorted(ids))
+       outbox.process_batch()
+       self.assertEqual(Notification.objects.filter(notification_type='APPOINTMENT_CONFIRMATION').count(), 6)
+
+   def test_validation_uses_fixed_number_of_queries(self):
+       def queries(weeks):
+           cache.clear()
+           with CaptureQueriesContext(connection) as captured:
+               checked = bulk.validate(self.series(weeks))
+           self.assertTrue(all(item.errors is None for item in checked))
+           return len(captured)
+       # patients, doctors, slot policies, availabilities and exceptions, scheduled appointments
+       # in the slot index and for conflicts
+       self.assertEqual(queries(1), 7)
+       self.assertEqual(queries(20), 7)
+
+   def test_atomic_batch_writes_nothing_on_error(self):
+       Appointment.objects.create(
+           patient=self.patient, doctor=self.sick_doctor,
+           appointment_datetime=local_datetime(self.monday, 10, 15)
+       )
+       items = self.series(3) + [self.item(self.sick_doctor, self.monday + datetime.timedelta(days=1), 10)]
+       response = self.client.post('/api/appointments/bulk/', {'items': items}, format='json')
+       self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+       self.assertEqual([result['index'] for result in response.data['results']], [0, 3])
+       self.assertEqual(Appointment.objects.count(), 1)
+
+       response = self.client.post('/api/appointments/bulk/', {'items': items, 'atomic': False}, format='json')
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       self.assertEqual((response.data['created'], response.data['failed']), (2, 2))
+       self.assertEqual(Appointment.objects.count(), 3)
+
+   def test_items_conflict_with_each_other(self):
+       items = [self.item(self.sick_doctor, self.monday, 10), self.item(self.sick_doctor, self.monday, 10, 20)]
+       checked = bulk.validate(items)
+       self.assertIsNone(checked[0].errors)
+       self.assertIsNotNone(checked[1].errors)
+
+   def test_moves_a_sick_doctors_day(self):
+       day = [
+           Appointment.objects.create(
+               patient=self.patient, doctor=self.sick_doctor,
+               appointment_datetime=local_datetime(self.monday, hour)
+           )
+           for hour in (9, 10, 11)
+       ]
+       slots_url = f'/api/doctors/{self.cover_doctor.id}/available_slots/'
+       self.assertIn('10:00', self.client.get(slots_url, {'date': self.monday.isoformat()}).data['available_slots'])
+
+       # the first reschedule frees 09:00 on the sick doctor's calendar for the new booking
+       items = [{'id': appointment.id, 'doctor': self.cover_doctor.id} for appointment in day]
+       items.append(self.item(self.sick_doctor, self.monday, 9))
+       response = self.client.post('/api/appointments/bulk/', {'items': items}, format='json')
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       self.assertEqual((response.data['rescheduled'], response.data['created']), (3, 1))
+       self.assertEqual(Appointment.objects.filter(doctor=self.cover_doctor).count(), 3)
+
+       # the cover doctor's indexed day was invalidated
+       self.assertNotIn('10:00', self.client.get(slots_url, {'date': self.monday.isoformat()}).data['available_slots'])
+
+       outbox.process_batch()
+       self.assertEqual(Notification.objects.filter(notification_type='APPOINTMENT_RESCHEDULED').count(), 3)
+
+
+class ConflictMigrationTests(TransactionTestCase):
+   before = [('appointments', '0001_initial')]
+   after = [('appointments', '0002_appointment_conflict_constraints')]
+
+   def setUp(self):
+      executor = MigrationExecutor(connection)
+      executor.migrate(self.before)
+      self.apps = executor.loader.project_state(self.before).apps
+
+   def tearDown(self):
+      executor = MigrationExecutor(connection)
+      executor.migrate(executor.loader.graph.leaf_nodes())
+
+   def test_double_bookings_are_cancelled_before_the_constraints(self):
+      patient = Patient.objects.create(first_name='John', last_name='Doe', date_of_birth='1990-01-01', email='john@example.com')
+      doctor = Doctor.objects.create(first_name='Jane', last_name='Smith', email='jane@example.com', specialization='Cardiology')
+      other = Doctor.objects.create(first_name='Bob', last_name='Brown', email='bob@example.com', specialization='Neurology')
+      OldAppointment = self.apps.get_model('appointments', 'Appointment')
+      start = timezone.now().replace(microsecond=0) + datetime.timedelta(days=7)
+
+      def book(doctor, minutes, **fields):
+         return OldAppointment.objects.create(
+            patient_id=patient.id, doctor_id=doctor.id,
+            appointment_datetime=start + datetime.timedelta(minutes=minutes), **fields
+         ).id
+
+      kept = book(doctor, 0)
+      same_time = book(doctor, 0, notes='Walk-in')
+      overlapping = book(doctor, 15)
+      next_slot = book(doctor, 30)
+      other_doctor = book(other, 0)
+      completed = book(doctor, 0, status='COMPLETED')
+
+      executor = MigrationExecutor(connection)
+      executor.migrate(self.after)
+      MigratedAppointment = executor.loader.project_state(self.after).apps.get_model('appointments', 'Appointment')
+
+      statuses = dict(MigratedAppointment.objects.values_list('id', 'status'))
+      self.assertEqual(
+         [statuses[pk] for pk in (kept, same_time, overlapping, next_slot, other_doctor, completed)],
+         ['SCHEDULED', 'CANCELLED', 'CANCELLED', 'SCHEDULED', 'SCHEDULED', 'COMPLETED']
+      )
+      notes = MigratedAppointment.objects.get(id=same_time).notes
+      self.assertIn(f'overlapped appointment {kept}', notes)
+      self.assertTrue(notes.endswith('Walk-in'))
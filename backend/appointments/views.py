@@ -4,29 +4,50 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
+import datetime
 
 from .models import Appointment
 from .serializers import AppointmentSerializer
-from notifications.models import Notification
+from .exceptions import conflict_guard
+from . import events
+from . import bulk
+from core.conditional import ConditionalGetMixin
+from core.prefetch import PrefetchPlanMixin
+from core.pagination import AppointmentCursorPagination
+from core.export import StreamingExportMixin
+
+# items accepted by one bulk request
+MAX_BULK_ITEMS = 500
 
 # Create your views here.
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(ConditionalGetMixin, StreamingExportMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AppointmentCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['patient', 'doctor', 'status']
     search_fields = ['patient__first_name', 'patient__last_name', 'doctor__first_name', 'doctor__last_name']
+    export_fields = [
+        'id', 'patient', 'patient__first_name', 'patient__last_name', 'doctor', 'doctor__first_name',
+        'doctor__last_name', 'appointment_datetime', 'status', 'reason', 'notes', 'created_at', 'updated_at',
+    ]
+    prefetch_actions = PrefetchPlanMixin.prefetch_actions + ('update_status',)
     
     def get_queryset(self):
-        queryset = Appointment.objects.all()
+        queryset = super().get_queryset()
         
         
         date = self.request.query_params.get('date', None)
         if date:
-            queryset = queryset.filter(appointment_datetime__date=date)
+            try:
+                queryset = queryset.on_date(datetime.datetime.strptime(date, '%Y-%m-%d').date())
+            except ValueError:
+                raise ValidationError({"date": "Invalid date format. Use YYYY-MM-DD."})
             
         # upcoming appointments
         upcoming = self.request.query_params.get('upcoming', None)
@@ -46,28 +67,62 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         if status_value not in [choice[0] for choice in Appointment.STATUS_CHOICES]:
             return Response({"detail": "Invalid status value."}, status=status.HTTP_400_BAD_REQUEST)
         
+        previous_status = appointment.status
         appointment.status = status_value
-        appointment.save()
-        
-        # notification for status change
-        if status_value == 'CANCELLED':
-            Notification.objects.create(
-                patient=appointment.patient,
-                appointment=appointment,
-                notification_type='APPOINTMENT_CANCELLATION',
-                message=f"Your appointment with {appointment.doctor} on {appointment.appointment_datetime.strftime('%B %d, %Y at %I:%M %p')} has been cancelled."
-            )
+        with transaction.atomic():
+            with conflict_guard():
+                appointment.save()
+            # notifications and other side effects are handled by the outbox consumers
+            if status_value != previous_status:
+                events.status_changed(appointment, previous_status)
         
         serializer = self.get_serializer(appointment)
         return Response(serializer.data)
     
+    @transaction.atomic
     def perform_create(self, serializer):
         appointment = serializer.save()
+        events.appointment_created(appointment)
+        
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous_status = serializer.instance.status
+        previous_slot = (serializer.instance.doctor_id, serializer.instance.appointment_datetime)
+        appointment = serializer.save()
+        if appointment.status != previous_status:
+            events.status_changed(appointment, previous_status)
+        elif appointment.status == 'SCHEDULED' and (appointment.doctor_id, appointment.appointment_datetime) != previous_slot:
+            events.appointments_rescheduled([(appointment, *previous_slot)])
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Book (items without ``id``) and reschedule (items with ``id``) many
+        appointments at once. With ``atomic`` (the default) nothing is written
+        unless every item is valid.
+        """
+        items = request.data.get('items')
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "items must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_ITEMS:
+            return Response(
+                {"detail": f"At most {MAX_BULK_ITEMS} items per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        atomic = request.data.get('atomic', True) not in (False, 'false', '0', 0)
         
-        # confirmation notification
-        Notification.objects.create(
-            patient=appointment.patient,
-            appointment=appointment,
-            notification_type='APPOINTMENT_CONFIRMATION',
-            message=f"Your appointment with {appointment.doctor} has been scheduled for {appointment.appointment_datetime.strftime('%B %d, %Y at %I:%M %p')}."
+        checked = bulk.validate(items)
+        written = bulk.write(checked, atomic)
+        results = [bulk.result(item) for item in checked]
+        counts = {
+            'created': sum(result['status'] == 'created' for result in results),
+            'rescheduled': sum(result['status'] == 'rescheduled' for result in results),
+            'failed': sum(result['status'] == 'error' for result in results),
+        }
+        if not written:
+            counts['created'] = counts['rescheduled'] = 0
+            results = [result for result in results if result['status'] == 'error']
+        return Response(
+            {'atomic': atomic, **counts, 'results': results},
+            status=status.HTTP_200_OK if written else status.HTTP_400_BAD_REQUEST
         )
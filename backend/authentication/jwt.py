@@ -0,0 +1,159 @@
+"""
+Stateless JWT authentication.
+
+Access tokens carry the user's id, username, names, email, role and staff
+flags, so ``ClaimsJWTAuthentication`` can build the request user from the
+token without loading the ``users`` row. Anything the token
+does not carry is read from the full User, loaded on first access and cached
+for ``AUTH_USER_CACHE_TIMEOUT`` seconds. Changing the password, ``is_active``,
+the staff flags or ``role`` revokes the tokens issued so far (see
+``authentication.signals``), so stale authorization claims are never honored.
+Changes made with ``QuerySet.update()`` skip the signal; call
+``revoke_tokens()`` after them.
+
+Revocation: ``revoke_tokens()`` stamps ``User.tokens_revoked_at`` and every
+token issued before that moment is rejected. ``iat`` only has whole seconds,
+so tokens also carry their issue time with microseconds (``iat_us``) and a
+login right after a revocation is accepted. The stamp is read from
+the cache and only falls back to the database on a miss, so with a shared
+cache revocation is immediate; with per-process local memory it takes
+effect within ``AUTH_REVOCATION_CACHE_TIMEOUT`` seconds.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from core import cache as cache_layer
+
+# bumped when the set of claims changes; tokens without it are served the old way
+CLAIMS_VERSION = 1
+
+# sub-second issue time in microseconds; copied from the refresh token into its access tokens
+ISSUED_CLAIM = 'iat_us'
+
+# cached revocation stamp for users that no longer exist
+USER_GONE = 2 ** 62
+
+
+def user_resource(user_id):
+    return f'user:{user_id}'
+
+
+def add_claims(token, user):
+    """Copy the user fields the API reads on every request into ``token``."""
+    token['cv'] = CLAIMS_VERSION
+    token[ISSUED_CLAIM] = _stamp(token.current_time)
+    token['username'] = user.username
+    token['email'] = user.email
+    token['first_name'] = user.first_name
+    token['last_name'] = user.last_name
+    token['role'] = user.role
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    return token
+
+
+def _revocation_key(user_id):
+    return f'auth:revoked_us:{user_id}'
+
+
+def _stamp(value):
+    # microseconds since the epoch; whole-second ``iat`` claims are compared scaled up
+    return round(value.timestamp() * 1_000_000) if value else 0
+
+
+def revoked_at(user_id):
+    """Unix time in microseconds before which the user's tokens are revoked (0 for none)."""
+    key = _revocation_key(user_id)
+    stamp = cache.get(key)
+    if stamp is None:
+        row = get_user_model().objects.filter(pk=user_id).values_list('tokens_revoked_at', flat=True)
+        stamp = _stamp(row[0]) if row else USER_GONE
+        cache.set(key, stamp, settings.AUTH_REVOCATION_CACHE_TIMEOUT)
+    return stamp
+
+
+def remember_revocation(user_id, value):
+    cache.set(_revocation_key(user_id), _stamp(value), settings.AUTH_REVOCATION_CACHE_TIMEOUT)
+
+
+def forget_user(user_id):
+    cache.set(_revocation_key(user_id), USER_GONE, settings.AUTH_REVOCATION_CACHE_TIMEOUT)
+
+
+def revoke_tokens(user):
+    """Reject every token issued to ``user`` so far."""
+    user.tokens_revoked_at = timezone.now()
+    user.save(update_fields=['tokens_revoked_at'])
+
+
+def check_not_revoked(token):
+    user_id = token[api_settings.USER_ID_CLAIM]
+    issued = token.get(ISSUED_CLAIM)
+    if issued is None:
+        # tokens issued without the claim only know their second, which counts as its start
+        issued = token.get('iat', 0) * 1_000_000
+    if issued < revoked_at(user_id):
+        raise AuthenticationFailed('Token has been revoked.', code='token_revoked')
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user backed by the access token's claims. Attributes the token does
+    not carry, and ``instance`` itself, come from the cached User row; pass
+    ``instance`` wherever a model object is required (e.g. foreign keys).
+    """
+
+    def __str__(self):
+        return self.username
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def first_name(self):
+        return self.token.get('first_name', '')
+
+    @cached_property
+    def last_name(self):
+        return self.token.get('last_name', '')
+
+    @cached_property
+    def instance(self):
+        user = cache_layer.get_or_build(
+            'auth.user', [user_resource(self.id)], [],
+            lambda: get_user_model().objects.filter(pk=self.id).first(),
+            settings.AUTH_USER_CACHE_TIMEOUT,
+        )
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        return user
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.instance, attr)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that returns a ClaimsUser instead of querying the users table."""
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        check_not_revoked(validated_token)
+        if validated_token.get('cv') != CLAIMS_VERSION:
+            # issued before the claims were added
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token)
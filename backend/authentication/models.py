@@ -7,6 +7,8 @@ class User(AbstractUser):
         ('DOCTOR', 'Doctor'),
     )
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='STAFF')
+    # access and refresh tokens issued at or before this moment are rejected
+    tokens_revoked_at = models.DateTimeField(null=True, blank=True)
 
     
     groups = models.ManyToManyField(
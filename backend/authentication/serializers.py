@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from authentication.models import User
 from django.contrib.auth.password_validation import validate_password
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+from .jwt import add_claims, check_not_revoked
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True)
@@ -38,11 +40,15 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def get_token(cls, user):
         token = super().get_token(user)
     
-        token['role'] = user.role
-        return token
+        return add_claims(token, user)
         
     def validate(self, attrs):
         data = super().validate(attrs)
     
         data['user_role'] = self.user.role
-        return data
\ No newline at end of file
+        return data
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        check_not_revoked(RefreshToken(attrs['refresh']))
+        return super().validate(attrs)
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import cache as cache_layer
+from .jwt import forget_user, remember_revocation, user_resource
+
+User = get_user_model()
+
+
+def _credentials(instance):
+    # the authorization fields are copied into tokens, so changing them must retire the old ones
+    return (instance.password, instance.is_active, instance.is_staff, instance.is_superuser, instance.role)
+
+
+@receiver(post_init, sender=User)
+def remember_credentials(sender, instance, **kwargs):
+    instance._credentials = _credentials(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_credentials', None)
+    credentials = _credentials(instance)
+    # a new password, a deactivated account or changed permissions invalidate the tokens issued so far
+    if previous and credentials != previous:
+        instance.tokens_revoked_at = timezone.now()
+        User.objects.filter(pk=instance.pk).update(tokens_revoked_at=instance.tokens_revoked_at)
+    instance._credentials = credentials
+
+    remember_revocation(instance.pk, instance.tokens_revoked_at)
+    cache_layer.invalidate(user_resource(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    forget_user(instance.pk)
+    cache_layer.invalidate(user_resource(instance.pk))
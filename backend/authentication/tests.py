@@ -1,3 +1,127 @@
 from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-# Create your tests here.
+from doctors.models import Doctor
+from authentication.jwt import ClaimsUser, add_claims
+
+
+User = get_user_model()
+
+
+class ClaimsAuthenticationTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       self.user = User.objects.create_user(
+           username='doctoruser',
+           password='doctorpass123',
+           email='doctor@example.com',
+           first_name='Jane',
+           last_name='Smith',
+           role='DOCTOR'
+       )
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology',
+           user=self.user
+       )
+       response = self.client.post('/api/auth/token/', {
+           'username': 'doctoruser',
+           'password': 'doctorpass123'
+       })
+       self.access = response.data['access']
+       self.refresh = response.data['refresh']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+   def test_token_carries_user_claims(self):
+       token = AccessToken(self.access)
+       self.assertEqual(token['role'], 'DOCTOR')
+       # the linked doctor is resolved by doctors.access, which follows relinking
+       self.assertNotIn('doctor_id', token)
+       self.assertEqual(token['username'], 'doctoruser')
+
+   def test_user_details_without_queries(self):
+       with self.assertNumQueries(0):
+           response = self.client.get('/api/auth/user/')
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       self.assertEqual(response.data['role'], 'DOCTOR')
+       self.assertEqual(response.data['email'], 'doctor@example.com')
+
+   def test_full_user_is_loaded_once_and_cached(self):
+       token = add_claims(RefreshToken.for_user(self.user), self.user).access_token
+       with self.assertNumQueries(1):
+           self.assertEqual(ClaimsUser(token).date_joined, self.user.date_joined)
+       with self.assertNumQueries(0):
+           self.assertEqual(ClaimsUser(token).instance, self.user)
+
+       self.user.first_name = 'Janet'
+       self.user.save()
+       self.assertEqual(ClaimsUser(token).instance.first_name, 'Janet')
+
+   def test_revoke_rejects_issued_tokens(self):
+       response = self.client.post('/api/auth/token/revoke/')
+       self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+       self.assertEqual(self.client.get('/api/auth/user/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+       self.client.credentials()
+       response = self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh})
+       self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+   def test_login_right_after_revoke_is_accepted(self):
+       self.client.post('/api/auth/token/revoke/')
+       self.client.credentials()
+       response = self.client.post('/api/auth/token/', {'username': 'doctoruser', 'password': 'doctorpass123'})
+       self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+       self.assertEqual(self.client.get('/api/auth/user/').status_code, status.HTTP_200_OK)
+
+       self.client.credentials()
+       response = self.client.post('/api/auth/token/refresh/', {'refresh': response.data['refresh']})
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+   def test_password_change_revokes_tokens(self):
+       self.user.set_password('newpass456')
+       self.user.save()
+       self.assertEqual(self.client.get('/api/auth/user/').status_code, status.HTTP_401_UNAUTHORIZED)
+       self.user.refresh_from_db()
+       self.assertIsNotNone(self.user.tokens_revoked_at)
+
+   def test_losing_staff_status_revokes_tokens(self):
+       self.user.is_staff = True
+       self.user.save()
+       response = self.client.post('/api/auth/token/', {'username': 'doctoruser', 'password': 'doctorpass123'})
+       access, refresh = response.data['access'], response.data['refresh']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+       self.assertEqual(self.client.get('/api/cache/stats/').status_code, status.HTTP_200_OK)
+
+       self.user.is_staff = False
+       self.user.save()
+       self.assertEqual(self.client.get('/api/cache/stats/').status_code, status.HTTP_401_UNAUTHORIZED)
+       self.client.credentials()
+       response = self.client.post('/api/auth/token/refresh/', {'refresh': refresh})
+       self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+   def test_role_change_revokes_tokens(self):
+       self.user.role = 'STAFF'
+       self.user.save()
+       self.assertEqual(self.client.get('/api/auth/user/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+   def test_revocation_survives_cache_loss(self):
+       self.client.post('/api/auth/token/revoke/')
+       cache.clear()
+       self.assertEqual(self.client.get('/api/auth/user/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+   def test_deleted_user_is_rejected(self):
+       self.user.delete()
+       self.assertEqual(self.client.get('/api/auth/user/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+   def test_tokens_without_claims_still_work(self):
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+       response = self.client.get('/api/auth/user/')
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       self.assertEqual(response.data['role'], 'DOCTOR')
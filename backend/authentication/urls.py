@@ -1,9 +1,8 @@
-
-from .views import CustomTokenObtainPairView, UserDetailsView
-from rest_framework_simplejwt.views import TokenRefreshView
+from .views import CustomTokenObtainPairView, CustomTokenRefreshView, RevokeTokensView, UserDetailsView
 from django.urls import path
 urlpatterns = [
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    path('token/revoke/', RevokeTokensView.as_view(), name='token_revoke'),
     path('user/', UserDetailsView.as_view(), name='user_details'),
 ]
\ No newline at end of file
@@ -3,11 +3,11 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth.models import User
 from .serializers import UserSerializer
-from .serializers import CustomTokenObtainPairSerializer
+from .serializers import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer
+from .jwt import revoke_tokens
 
 # Create your views here.
 
@@ -18,7 +18,7 @@ class RegisterView(APIView):
         serializer = UserSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = CustomTokenObtainPairSerializer.get_token(user)
             
             return Response({
                 'refresh': str(refresh),
@@ -48,4 +48,15 @@ class UserDetailsView(APIView):
         })
         
 class CustomTokenObtainPairView(TokenObtainPairView):
-    serializer_class = CustomTokenObtainPairSerializer
\ No newline at end of file
+    serializer_class = CustomTokenObtainPairSerializer
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
+class RevokeTokensView(APIView):
+    """Log out everywhere: rejects every token issued to the current user so far."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke_tokens(getattr(request.user, 'instance', request.user))
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     'appointments',
     'records',
     'notifications',
+    'search',
     'rest_framework_simplejwt',  
     'django_filters',
     'rest_framework',
@@ -63,6 +64,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    # outermost, so its latency covers the rest of the stack
+    'core.middleware.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -120,7 +123,7 @@ AUTH_USER_MODEL = 'authentication.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.jwt.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -128,6 +131,8 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.StandardPagination',
+    'PAGE_SIZE': 50,
      'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
@@ -152,6 +157,98 @@ SIMPLE_JWT = {
     'SIGNING_KEY': os.getenv('JWT_SECRET_KEY', SECRET_KEY),
 }
 
+# Seconds the full User row behind a token-backed request user stays cached
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 60))
+# Seconds a user's token revocation stamp is cached before it is re-read from the database
+AUTH_REVOCATION_CACHE_TIMEOUT = int(os.getenv('AUTH_REVOCATION_CACHE_TIMEOUT', 60))
+# Seconds the Doctor linked to a user account stays cached (invalidated on Doctor changes)
+DOCTOR_LOOKUP_CACHE_TIMEOUT = int(os.getenv('DOCTOR_LOOKUP_CACHE_TIMEOUT', 300))
+
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared store
+# (e.g. django.core.cache.backends.memcached.PyMemcacheCache) when running several processes,
+# as docker-compose.yml does
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'hospital-crm'),
+    }
+}
+
+# Seconds a cached doctor directory response is served before it is rebuilt
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 600))
+
+# Seconds an indexed doctor day stays cached before it is rebuilt from the database
+SLOT_INDEX_TIMEOUT = int(os.getenv('SLOT_INDEX_TIMEOUT', 300))
+# The slot index needs a cache shared by every process. With the local memory backend it is
+# rebuilt from the database on each read, unless this allows it for a single-process deployment
+SLOT_INDEX_LOCAL_CACHE = os.getenv('SLOT_INDEX_LOCAL_CACHE', str(DEBUG)).lower() == 'true'
+
+# Slot length, buffer after each appointment and patients per slot for doctors whose
+# own fields and specialization's SlotPolicy leave them unset
+SLOT_MINUTES = int(os.getenv('SLOT_MINUTES', 30))
+SLOT_BUFFER_MINUTES = int(os.getenv('SLOT_BUFFER_MINUTES', 0))
+SLOT_CAPACITY = int(os.getenv('SLOT_CAPACITY', 1))
+
+# Notification dispatch (python manage.py dispatch_notifications)
+NOTIFICATION_BACKEND = os.getenv('NOTIFICATION_BACKEND', 'notifications.backends.ConsoleBackend')
+NOTIFICATION_FILE_PATH = os.getenv('NOTIFICATION_FILE_PATH', os.path.join(BASE_DIR, 'notifications.log'))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', 5))
+NOTIFICATION_RETRY_BACKOFF = int(os.getenv('NOTIFICATION_RETRY_BACKOFF', 60))
+NOTIFICATION_RETRY_MAX_DELAY = int(os.getenv('NOTIFICATION_RETRY_MAX_DELAY', 3600))
+NOTIFICATION_CLAIM_TIMEOUT = int(os.getenv('NOTIFICATION_CLAIM_TIMEOUT', 300))
+
+# Appointment reminders (python manage.py generate_reminders); windows are minutes before the appointment
+APPOINTMENT_REMINDER_WINDOWS = [int(m) for m in os.getenv('APPOINTMENT_REMINDER_WINDOWS', '1440,120').split(',')]
+APPOINTMENT_REMINDER_CHUNK_SIZE = int(os.getenv('APPOINTMENT_REMINDER_CHUNK_SIZE', 2000))
+
+# Outbox processing (python manage.py process_outbox)
+OUTBOX_CLAIM_TIMEOUT = int(os.getenv('OUTBOX_CLAIM_TIMEOUT', 300))
+OUTBOX_RETRY_BACKOFF = int(os.getenv('OUTBOX_RETRY_BACKOFF', 10))
+OUTBOX_RETRY_MAX_DELAY = int(os.getenv('OUTBOX_RETRY_MAX_DELAY', 3600))
+# Days processed events are kept (and can be replayed) before the worker deletes them
+OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', 30))
+# Seconds between two prunes of processed events by an idle worker
+OUTBOX_PRUNE_INTERVAL = int(os.getenv('OUTBOX_PRUNE_INTERVAL', 3600))
+
+# Request instrumentation (core.middleware); query counts and DB/serialization time are
+# recorded for the sampled share of requests, latency for all of them
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'true').lower() == 'true'
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', 0.1))
+REQUEST_METRICS_SLOW_MS = int(os.getenv('REQUEST_METRICS_SLOW_MS', 1000))
+
+# sampled requests are logged at INFO, slow ones at WARNING
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Health and metrics endpoints (/health/, /health/ready/, /metrics/)
+# seconds a readiness result is reused before the database and cache are checked again
+HEALTH_CHECK_CACHE_SECONDS = int(os.getenv('HEALTH_CHECK_CACHE_SECONDS', 5))
+# seconds queue depths and server connection counts are reused between scrapes
+METRICS_QUEUE_CACHE_SECONDS = int(os.getenv('METRICS_QUEUE_CACHE_SECONDS', 30))
+# queue depths are counted up to this many rows
+METRICS_QUEUE_COUNT_LIMIT = int(os.getenv('METRICS_QUEUE_COUNT_LIMIT', 100000))
+# bearer token required by /metrics/ when set
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Bulk patient import (python manage.py import_patients, POST /api/patients/import/)
+PATIENT_IMPORT_BATCH_SIZE = int(os.getenv('PATIENT_IMPORT_BATCH_SIZE', 1000))
+# row errors kept in an import report; further errors are only counted
+PATIENT_IMPORT_MAX_ERRORS = int(os.getenv('PATIENT_IMPORT_MAX_ERRORS', 1000))
+# rows accepted by one upload to POST /api/patients/import/, which runs within the request and so
+# must finish inside the gunicorn worker timeout; larger files go through the command
+PATIENT_IMPORT_MAX_ROWS = int(os.getenv('PATIENT_IMPORT_MAX_ROWS', 20000))
 
 # CORS_ALLOW_ALL_ORIGINS = DEBUG  
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
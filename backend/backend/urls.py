@@ -26,6 +26,8 @@ urlpatterns = [
     path('api/appointments/', include('appointments.urls')),
     path('api/records/', include('records.urls')),
     path('api/notifications/', include('notifications.urls')),
+    path('api/search/', include('search.urls')),
+    path('', include('core.urls')),
     
     
     # path('docs/', include_docs_urls(title='Healthcare API')),
@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import OutboxEvent
 
-# Register your models here.
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['topic', 'aggregate_type', 'aggregate_id', 'created_at', 'processed_at', 'attempts']
+    list_filter = ['topic', 'aggregate_type']
+    search_fields = ['aggregate_id', 'last_error']
+    readonly_fields = [
+        'topic', 'aggregate_type', 'aggregate_id', 'payload', 'created_at',
+        'processed_at', 'attempts', 'next_attempt_at', 'last_error',
+    ]
+    exclude = ['claim_token']
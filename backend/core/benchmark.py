@@ -0,0 +1,261 @@
+"""
+Offline benchmarks of the hot API endpoints.
+
+``run()`` creates a throwaway test database on the configured backend
+(SQLite or PostgreSQL), fills it with ``core.synthetic`` at each requested
+scale and drives every scenario in-process through the full middleware and
+DRF stack with an ``APIClient``, authenticating with real JWTs. For each
+scenario it records per-request latency, the SQL queries issued (through a
+database execute wrapper) and error responses, after a few untimed warm-up
+requests so caches are in their steady state. Writes run inside a
+transaction that is rolled back, so every iteration sees the same data.
+
+Results are plain dicts, saved as JSON by the ``benchmark`` command;
+``compare()`` flags scenarios whose p95 latency or query count regressed
+against a saved run.
+"""
+import datetime
+import math
+import platform
+import statistics
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from appointments.models import Appointment
+from doctors import slots
+from doctors.models import Doctor
+from doctors.schedule import get_schedules
+from .middleware import QueryTimer
+from . import synthetic
+
+SCALES = {
+    'small': {'doctors': 5, 'patients': 500, 'years': 0.5},
+    'medium': {'doctors': 20, 'patients': 5000, 'years': 1},
+    'large': {'doctors': 50, 'patients': 50000, 'years': 2},
+}
+STAFF_USERNAME = 'benchmark-staff'
+PASSWORD = 'benchmark-pass'
+# days ahead the generated schedule extends; slot scenarios stay inside it
+FUTURE_DAYS = 30
+# p95 latency growth tolerated before a scenario is flagged
+DEFAULT_THRESHOLD = 0.2
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` (sorted)."""
+    if not values:
+        return None
+    return values[min(max(math.ceil(q * len(values)) - 1, 0), len(values) - 1)]
+
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies), 3) if latencies else None,
+            'p50': round(percentile(latencies, 0.5), 3) if latencies else None,
+            'p95': round(percentile(latencies, 0.95), 3) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 3) if latencies else None,
+        },
+        'queries': {
+            'mean': round(statistics.mean(queries), 2) if queries else None,
+            'max': max(queries) if queries else None,
+        },
+    }
+
+
+class Context:
+    """Clients, tokens and the rows scenarios pick from at one scale."""
+
+    def __init__(self):
+        user_model = get_user_model()
+        self.staff = user_model.objects.create_user(username=STAFF_USERNAME, password=PASSWORD, role='STAFF')
+        self.doctors = list(Doctor.objects.select_related('user').order_by('id'))
+        self.doctor_usernames = [doctor.user.username for doctor in self.doctors]
+        self.patient_ids = list(Appointment.objects.values_list('patient_id', flat=True).distinct()[:200])
+        self.today = timezone.localdate()
+        self.staff_client = self._client(STAFF_USERNAME, PASSWORD)
+        self.doctor_client = self._client(self.doctor_usernames[0], PASSWORD)
+        self.working_days = self._working_days()
+        self.bookable = self._bookable()
+
+    def _client(self, username, password):
+        client = APIClient()
+        token = client.post('/api/auth/token/', {'username': username, 'password': password}, format='json').data['access']
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def _working_days(self):
+        """``(doctor id, date)`` of the upcoming days each doctor works, interleaved across doctors."""
+        schedules = get_schedules([doctor.id for doctor in self.doctors])
+        return [
+            (doctor.id, date)
+            for date in (self.today + datetime.timedelta(days=offset) for offset in range(1, FUTURE_DAYS))
+            for doctor in self.doctors
+            if schedules[doctor.id].intervals_on(date)
+        ]
+
+    def _bookable(self):
+        """``(doctor id, aware datetime)`` of free slots, a few per working day."""
+        found = []
+        for doctor_id, date in self.working_days:
+            for value in (slots.free_slots(doctor_id, date) or [])[:3]:
+                hour, minute = map(int, value.split(':'))
+                found.append((doctor_id, timezone.make_aware(datetime.datetime.combine(date, datetime.time(hour, minute)))))
+        return found
+
+
+def _available_slots(context, i):
+    doctor_id, date = context.working_days[i % len(context.working_days)]
+    return context.staff_client, 'get', f'/api/doctors/{doctor_id}/available_slots/?date={date}', None
+
+
+def _appointment_create(context, i):
+    doctor_id, when = context.bookable[i % len(context.bookable)]
+    data = {
+        'patient': context.patient_ids[i % len(context.patient_ids)],
+        'doctor': doctor_id,
+        'appointment_datetime': when.isoformat(),
+        'reason': 'Benchmark visit',
+    }
+    return context.staff_client, 'post', '/api/appointments/', data
+
+
+def _token_obtain(context, i):
+    data = {'username': context.doctor_usernames[i % len(context.doctor_usernames)], 'password': PASSWORD}
+    return APIClient(), 'post', '/api/auth/token/', data
+
+
+def _get(path, doctor=False):
+    def request(context, i):
+        return (context.doctor_client if doctor else context.staff_client), 'get', path, None
+    return request
+
+
+# name -> (request builder, expected status, writes)
+SCENARIOS = {
+    'available_slots': (_available_slots, 200, False),
+    'appointment_create': (_appointment_create, 201, True),
+    'appointments_list': (_get('/api/appointments/'), 200, False),
+    'records_list': (_get('/api/records/'), 200, False),
+    'notifications_list': (_get('/api/notifications/'), 200, False),
+    'my_appointments': (_get('/api/doctors/my_appointments/', doctor=True), 200, False),
+    'my_patients': (_get('/api/doctors/my_patients/', doctor=True), 200, False),
+    'my_records': (_get('/api/doctors/my_records/', doctor=True), 200, False),
+    'my_dashboard': (_get('/api/doctors/my_dashboard/', doctor=True), 200, False),
+    'token_obtain': (_token_obtain, 200, False),
+}
+
+
+def _call(context, build, i, writes):
+    client, method, path, data = build(context, i)
+    timer = QueryTimer()
+    with connection.execute_wrapper(timer):
+        started = time.perf_counter()
+        if writes:
+            with transaction.atomic():
+                response = getattr(client, method)(path, data, format='json')
+                # every iteration books against the same state
+                transaction.set_rollback(True)
+        else:
+            response = getattr(client, method)(path, data, format='json') if data else getattr(client, method)(path)
+        elapsed = time.perf_counter() - started
+    return response.status_code, elapsed * 1000, timer.queries
+
+
+def run_scenario(context, name, iterations, warmup):
+    build, expected, writes = SCENARIOS[name]
+    for i in range(warmup):
+        _call(context, build, i, writes)
+    latencies, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for i in range(warmup, warmup + iterations):
+        status_code, latency, count = _call(context, build, i, writes)
+        latencies.append(latency)
+        queries.append(count)
+        errors += status_code != expected
+    return summarize(latencies, queries, errors, time.perf_counter() - started)
+
+
+def _populate(scale, seed, batch_size):
+    call_command('flush', interactive=False, verbosity=0)
+    cache.clear()
+    return synthetic.generate(
+        seed=seed, future_days=FUTURE_DAYS, batch_size=batch_size, password=PASSWORD, **SCALES[scale],
+    ).counts
+
+
+def run(scales, scenarios=None, iterations=50, warmup=5, seed=0, batch_size=5000, progress=None):
+    """
+    Benchmark ``scenarios`` (default all) at each of ``scales`` in a fresh
+    test database. Calls ``progress(scale, scenario, result)`` as results come in.
+    """
+    scenarios = list(scenarios or SCENARIOS)
+    results = {}
+    setup_test_environment(debug=False)
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        for scale in scales:
+            rows = _populate(scale, seed, batch_size)
+            context = Context()
+            results[scale] = {'rows': rows, 'scenarios': {}}
+            for name in scenarios:
+                result = run_scenario(context, name, iterations, warmup)
+                results[scale]['scenarios'][name] = result
+                if progress:
+                    progress(scale, name, result)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+    return {
+        'meta': {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'cache': settings.CACHES['default']['BACKEND'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': iterations,
+            'warmup': warmup,
+            'seed': seed,
+            'scales': {scale: SCALES[scale] for scale in scales},
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Return the regressions of ``current`` against ``baseline`` (both as
+    returned by ``run``): scenarios whose p95 latency grew by more than
+    ``threshold`` or whose mean query count grew at all.
+    """
+    regressions = []
+    for scale, measured in current['results'].items():
+        previous = baseline.get('results', {}).get(scale, {}).get('scenarios', {})
+        for name, result in measured['scenarios'].items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            old_p95, new_p95 = before['latency_ms']['p95'], result['latency_ms']['p95']
+            if old_p95 and new_p95 and new_p95 > old_p95 * (1 + threshold):
+                regressions.append({
+                    'scale': scale, 'scenario': name, 'metric': 'p95_ms', 'before': old_p95, 'after': new_p95,
+                })
+            old_queries, new_queries = before['queries']['mean'], result['queries']['mean']
+            if old_queries is not None and new_queries is not None and new_queries > old_queries:
+                regressions.append({
+                    'scale': scale, 'scenario': name, 'metric': 'queries', 'before': old_queries, 'after': new_queries,
+                })
+    return regressions
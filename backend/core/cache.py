@@ -0,0 +1,139 @@
+"""
+Versioned read-through caching on top of Django's cache framework.
+
+Every cached value belongs to a *resource* (``'doctors'``, ``'doctor:12'``)
+whose version number is part of the key. Invalidating a resource bumps its
+version, which orphans every key built from the old one at once without
+having to find and delete them. The backend is whatever ``CACHES['default']``
+configures, so the same code runs on local memory or on a shared store.
+
+Hits and misses are counted per key group in this process and reported by
+``stats()``.
+"""
+import json
+import threading
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .conditional import is_fresh, make_etag, not_modified, set_validators
+
+_lock = threading.Lock()
+_counters = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+
+def _version_key(resource):
+    return f'version:{resource}'
+
+
+def versions(resources):
+    """Return ``{resource: current version}``; unknown resources are at version 1."""
+    found = cache.get_many([_version_key(resource) for resource in resources])
+    return {resource: found.get(_version_key(resource), 1) for resource in resources}
+
+
+def version(resource):
+    return versions([resource])[resource]
+
+
+def _bump(resource):
+    key = _version_key(resource)
+    cache.add(key, 1, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted between add() and incr()
+        cache.set(key, 2, None)
+
+
+def invalidate(*resources):
+    """
+    Bump the version of ``resources``. Inside a transaction the bump is
+    repeated on commit, so a read racing the write cannot cache data the
+    transaction has not committed yet under the new version.
+    """
+    for resource in resources:
+        _bump(resource)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: [_bump(resource) for resource in resources])
+
+
+def make_key(resources, *parts):
+    """Build a key covering ``resources``; bumping any of them invalidates it."""
+    current = versions(resources)
+    stamp = ','.join(f'{resource}@{current[resource]}' for resource in resources)
+    return ':'.join(['cache', stamp, *map(str, parts)])
+
+
+def record(group, hit):
+    with _lock:
+        _counters[group]['hits' if hit else 'misses'] += 1
+
+
+def stats():
+    """Return ``{group: {'hits', 'misses', 'hit_ratio'}}`` for this process."""
+    with _lock:
+        snapshot = {group: dict(counts) for group, counts in _counters.items()}
+    for counts in snapshot.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_ratio'] = round(counts['hits'] / total, 4) if total else None
+    return snapshot
+
+
+def reset_stats():
+    with _lock:
+        _counters.clear()
+
+
+def get_or_build(group, resources, parts, build, timeout=None):
+    """
+    Return the value cached under ``resources`` and ``parts``, calling
+    ``build()`` and storing its result on a miss. None is never cached.
+    ``group`` names the hit/miss counter.
+    """
+    key = make_key(resources, group, *parts)
+    value = cache.get(key)
+    record(group, value is not None)
+    if value is None:
+        value = build()
+        if value is not None:
+            cache.set(key, value, settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+def cached_response(request, group, resources, build, timeout=None):
+    """
+    Serve the Response returned by ``build()`` from the cache. The key covers
+    ``resources``, the host and the query string; only 200 responses are
+    stored, as plain JSON data. Sets ``X-Cache: HIT`` or ``MISS``.
+
+    The key, resource versions included, is also the response's ETag, so a
+    client sending it back in ``If-None-Match`` gets a 304 without the
+    cached payload being read.
+    """
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    key = make_key(resources, group, request.get_host(), query)
+    etag = make_etag(key)
+    if is_fresh(request, etag):
+        record(group, True)
+        return not_modified(etag)
+
+    data = cache.get(key)
+    hit = data is not None
+    record(group, hit)
+
+    if not hit:
+        response = build()
+        if response.status_code != 200:
+            return response
+        data = json.loads(JSONRenderer().render(response.data))
+        cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout)
+
+    response = Response(data)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return set_validators(response, etag)
@@ -0,0 +1,161 @@
+"""
+Conditional GET (``ETag`` / ``Last-Modified``) for list and detail reads.
+
+Validators are computed without serializing: a list is described by the
+rows of the page being served (their keys and ``updated_at``) and the page's
+links and count, a detail by the fetched row's ``updated_at``. Only the page
+query runs, never an aggregate over the whole filtered queryset. The
+``updated_at`` of objects nested through single-valued relations, as planned
+by ``core.prefetch``, is folded in too, so renaming a patient changes the
+validators of the appointments that embed it. When the client's
+``If-None-Match`` or ``If-Modified-Since`` still matches, the view answers
+304 without serializing the page.
+"""
+import hashlib
+from functools import lru_cache
+
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .prefetch import plan_related
+
+
+def make_etag(*parts):
+    """A weak entity tag over ``parts``; equal payloads need not be byte-identical."""
+    digest = hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+    return f'W/{quote_etag(digest)}'
+
+
+def _matches(header, etag):
+    if header.strip() == '*':
+        return True
+    # weak comparison: the W/ prefix is ignored
+    wanted = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def is_fresh(request, etag, last_modified=None):
+    """Whether the client's cached copy, per its conditional headers, is still current."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since
+        return _matches(if_none_match, etag)
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    if if_modified_since is None or last_modified is None:
+        return False
+    return int(last_modified.timestamp()) <= if_modified_since
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+
+def conditional(request, etag, last_modified, build):
+    """Return 304 when the client is current, else ``build()`` with the validators set on a 200."""
+    if is_fresh(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+@lru_cache(maxsize=None)
+def _tracked_relations(serializer_class, model):
+    """select_related lookups of ``serializer_class`` (and their prefixes) whose model has ``updated_at``."""
+    lookups = set()
+    for lookup in plan_related(serializer_class, model)[0]:
+        parts = lookup.split('__')
+        lookups.update('__'.join(parts[:i]) for i in range(1, len(parts) + 1))
+    tracked = []
+    for lookup in sorted(lookups):
+        target = model
+        for part in lookup.split('__'):
+            target = target._meta.get_field(part).related_model
+        if any(field.name == 'updated_at' for field in target._meta.concrete_fields):
+            tracked.append(lookup)
+    return tuple(tracked)
+
+
+def _newest(values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+class ConditionalGetMixin:
+    """
+    Viewset mixin answering ``list`` and ``retrieve`` with 304 when the
+    client's copy is current. The model needs an ``updated_at`` field;
+    changes that bypass it (``QuerySet.update``) are not seen.
+    """
+
+    def _etag_parts(self, request):
+        # querysets may be scoped to the user, so validators are too
+        return [
+            self.__class__.__name__,
+            self.action,
+            request.user.pk,
+            request.accepted_renderer.format,
+            request.get_full_path(),
+        ]
+
+    def _stamps(self, instance):
+        """``updated_at`` of ``instance`` and of the tracked objects nested in its representation."""
+        stamps = [instance.updated_at]
+        for lookup in _tracked_relations(self.get_serializer_class(), type(instance)):
+            related = instance
+            for part in lookup.split('__'):
+                related = getattr(related, part, None) if related is not None else None
+            stamps.append(related.updated_at if related is not None else None)
+        return stamps
+
+    def _page_parts(self):
+        """Links and total count of the page just paginated, which the payload carries too."""
+        page = getattr(self.paginator, 'page', None)
+        count = page.paginator.count if hasattr(page, 'paginator') else None
+        return [self.paginator.get_next_link(), self.paginator.get_previous_link(), count]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+
+        stamps = {row.pk: self._stamps(row) for row in rows}
+        last_modified = _newest(stamp for row_stamps in stamps.values() for stamp in row_stamps)
+        etag = make_etag(
+            *self._etag_parts(request),
+            *(self._page_parts() if page is not None else []),
+            *[(pk, *[stamp.isoformat() if stamp else '' for stamp in row_stamps]) for pk, row_stamps in stamps.items()],
+        )
+
+        def build():
+            # serialize the rows already fetched rather than loading them again
+            serializer = self.get_serializer(rows, many=True)
+            if page is None:
+                return Response(serializer.data)
+            return self.get_paginated_response(serializer.data)
+        return conditional(request, etag, last_modified, build)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        stamps = self._stamps(instance)
+        last_modified = _newest(stamps)
+        etag = make_etag(*self._etag_parts(request), instance.pk, *[
+            stamp.isoformat() if stamp else '' for stamp in stamps
+        ])
+        # serialize the instance already fetched rather than loading it again
+        return conditional(request, etag, last_modified, lambda: Response(self.get_serializer(instance).data))
@@ -0,0 +1,145 @@
+"""
+Health checks and the gauges behind ``/metrics/``.
+
+Liveness needs nothing but a running process. Readiness runs a trivial
+query on every database and a set/get round trip on the cache; the outcome
+is kept in-process for ``HEALTH_CHECK_CACHE_SECONDS`` so frequent probes do
+not turn into load. Queue depths (pending notifications, unprocessed outbox
+events) and the database server's connection counts are likewise refreshed
+at most every ``METRICS_QUEUE_CACHE_SECONDS``. The counts only read the
+partial indexes over pending rows and stop at ``METRICS_QUEUE_COUNT_LIMIT``,
+so a scrape never counts a whole table.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+_lock = threading.Lock()
+_memo = {}
+
+
+def _memoized(name, seconds, compute):
+    """Return ``compute()``, reusing the value from the last ``seconds``."""
+    now = time.monotonic()
+    with _lock:
+        cached = _memo.get(name)
+        if cached is not None and now - cached[0] < seconds:
+            return cached[1]
+    value = compute()
+    with _lock:
+        _memo[name] = (now, value)
+    return value
+
+
+def reset():
+    with _lock:
+        _memo.clear()
+
+
+def _error(exc):
+    return f'{exc.__class__.__name__}: {exc}'
+
+
+def check_databases():
+    results = {}
+    for alias in connections:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            results[alias] = 'ok'
+        except Exception as exc:
+            results[alias] = _error(exc)
+    return results
+
+
+def check_cache():
+    key = f'health:{uuid.uuid4().hex}'
+    try:
+        cache.set(key, 1, 10)
+        found = cache.get(key)
+        cache.delete(key)
+    except Exception as exc:
+        return _error(exc)
+    return 'ok' if found == 1 else 'cache did not return the value stored'
+
+
+def _readiness():
+    checks = {f'database:{alias}': result for alias, result in check_databases().items()}
+    checks['cache'] = check_cache()
+    return {
+        'status': 'ok' if all(result == 'ok' for result in checks.values()) else 'unavailable',
+        'checks': checks,
+    }
+
+
+def readiness():
+    """``{'status': 'ok' | 'unavailable', 'checks': {name: 'ok' or the error}}``."""
+    return _memoized('readiness', settings.HEALTH_CHECK_CACHE_SECONDS, _readiness)
+
+
+def _bounded_count(queryset):
+    # COUNT over a LIMITed subquery; reads at most the limit's worth of index entries
+    return queryset.values('pk')[:settings.METRICS_QUEUE_COUNT_LIMIT].count()
+
+
+def _age_seconds(value, now):
+    return max((now - value).total_seconds(), 0.0) if value is not None else 0.0
+
+
+def _queues():
+    from notifications.models import Notification
+    from .models import OutboxEvent
+
+    now = timezone.now()
+    # both filters match the partial indexes notif_pending_idx and outbox_pending_idx
+    notifications = Notification.objects.filter(status='PENDING')
+    events = OutboxEvent.objects.filter(processed_at__isnull=True)
+    oldest_notification = notifications.order_by('created_at').values_list('created_at', flat=True).first()
+    oldest_event = events.order_by('id').values_list('created_at', flat=True).first()
+    return {
+        'notifications': {
+            'depth': _bounded_count(notifications),
+            'oldest_age_seconds': _age_seconds(oldest_notification, now),
+        },
+        'outbox': {
+            'depth': _bounded_count(events),
+            'oldest_age_seconds': _age_seconds(oldest_event, now),
+        },
+    }
+
+
+def _server_connections():
+    connection = connections['default']
+    if connection.vendor != 'postgresql':
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT coalesce(state, 'unknown'), count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() GROUP BY 1"
+        )
+        return dict(cursor.fetchall())
+
+
+def queues():
+    """``{queue: {'depth', 'oldest_age_seconds'}}``; depths stop at ``METRICS_QUEUE_COUNT_LIMIT``."""
+    return _memoized('queues', settings.METRICS_QUEUE_CACHE_SECONDS, _queues)
+
+
+def server_connections():
+    """Connections to the database server by state (PostgreSQL only)."""
+    return _memoized('server_connections', settings.METRICS_QUEUE_CACHE_SECONDS, _server_connections)
+
+
+def local_connections():
+    """``{alias: (open, persistent)}`` for this process's database connections."""
+    # Django keeps one connection per alias and thread rather than a pool
+    return {
+        alias: (connections[alias].connection is not None, connections[alias].settings_dict.get('CONN_MAX_AGE', 0) != 0)
+        for alias in connections
+    }
@@ -0,0 +1,42 @@
+"""
+Lease-based claiming for database work queues.
+
+Queue rows carry ``next_attempt_at`` and ``claim_token`` columns. A worker
+claims a batch by stamping due rows with its own token and pushing
+``next_attempt_at`` out by a lease. Where the database supports it the
+candidates are locked with SKIP LOCKED, so concurrent workers take disjoint
+batches; elsewhere the conditional UPDATE alone keeps two workers from
+claiming the same row. Rows held by a worker that died are claimed again
+once the lease runs out.
+"""
+import datetime
+import uuid
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+
+def due(now):
+    return Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+
+
+def claim_due(queryset, batch_size, lease_seconds, now, order_by=('pk',)):
+    """Claim up to ``batch_size`` due rows of ``queryset`` and return them in ``order_by`` order."""
+    token = uuid.uuid4().hex
+    lease_until = now + datetime.timedelta(seconds=lease_seconds)
+
+    with transaction.atomic():
+        candidates = queryset.filter(due(now)).order_by(*order_by)
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        # re-check the due condition so a row another worker claimed meanwhile is skipped
+        queryset.filter(due(now), pk__in=ids).update(claim_token=token, next_attempt_at=lease_until)
+    return list(queryset.model._default_manager.filter(claim_token=token).order_by(*order_by))
+
+
+def retry_delay(attempts, base, cap):
+    """Exponential backoff: base, 2x base, 4x base ... capped at ``cap`` seconds."""
+    return datetime.timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
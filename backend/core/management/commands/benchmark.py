@@ -0,0 +1,76 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import DEFAULT_THRESHOLD, SCALES, SCENARIOS, compare, run
+
+
+def _names(value, known, kind):
+    names = [name for name in value.split(',') if name]
+    unknown = set(names) - set(known)
+    if unknown:
+        raise CommandError(f"Unknown {kind}: {', '.join(sorted(unknown))} (choose from {', '.join(known)})")
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the hot API endpoints against generated data in a throwaway test database; '
+        'reports p50/p95/p99 latency, throughput and query counts per scale'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=str, default='small,medium',
+                            help=f"Comma separated data scales ({', '.join(SCALES)})")
+        parser.add_argument('--scenarios', type=str, default='',
+                            help=f"Comma separated scenarios ({', '.join(SCENARIOS)}); all by default")
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=str, default=None, help='Write the results to this JSON file')
+        parser.add_argument('--compare', type=str, default=None,
+                            help='Compare against the results in this JSON file and list regressions')
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='Relative p95 latency growth flagged as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when a regression is found')
+
+    def handle(self, *args, **kwargs):
+        scales = _names(kwargs['scales'], SCALES, 'scales')
+        scenarios = _names(kwargs['scenarios'], SCENARIOS, 'scenarios') or None
+        if kwargs['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+        baseline = None
+        if kwargs['compare']:
+            try:
+                with open(kwargs['compare']) as stream:
+                    baseline = json.load(stream)
+            except (OSError, ValueError) as error:
+                raise CommandError(f"Cannot read {kwargs['compare']}: {error}")
+
+        def progress(scale, name, result):
+            latency, queries = result['latency_ms'], result['queries']
+            self.stdout.write(
+                f"{scale:<8} {name:<20} p50 {latency['p50']:>9.2f} ms  p95 {latency['p95']:>9.2f} ms  "
+                f"p99 {latency['p99']:>9.2f} ms  {result['throughput_rps']:>8.1f} req/s  "
+                f"{queries['mean']:>6.1f} queries" + (f"  {result['errors']} errors" if result['errors'] else '')
+            )
+
+        results = run(scales, scenarios, kwargs['iterations'], kwargs['warmup'], kwargs['seed'], progress=progress)
+
+        if kwargs['output']:
+            with open(kwargs['output'], 'w') as stream:
+                json.dump(results, stream, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {kwargs['output']}"))
+
+        if baseline is not None:
+            regressions = compare(results, baseline, kwargs['threshold'])
+            for regression in regressions:
+                self.stderr.write(
+                    f"{regression['scale']} {regression['scenario']}: {regression['metric']} "
+                    f"{regression['before']} -> {regression['after']}"
+                )
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('No regressions'))
+            elif kwargs['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regressions')
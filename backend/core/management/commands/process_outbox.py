@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = 'Fan outbox events out to their consumers; run several workers to scale out'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Seconds to wait when no event is due')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no event is due instead of polling')
+        parser.add_argument('--replay', type=str, default=None, metavar='CONSUMER',
+                            help='Run CONSUMER over already processed events and exit')
+        parser.add_argument('--since', type=str, default=None,
+                            help='With --replay, only events created at or after this ISO datetime')
+        parser.add_argument('--topic', type=str, default=None,
+                            help='With --replay, only events of this topic')
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete events processed more than OUTBOX_RETENTION_DAYS ago and exit')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['replay']:
+            if kwargs['replay'] not in outbox.consumer_names():
+                raise CommandError(f"Unknown consumer. Use one of: {', '.join(outbox.consumer_names())}")
+            since = None
+            if kwargs['since']:
+                since = parse_datetime(kwargs['since'])
+                if since is None:
+                    raise CommandError('--since must be an ISO datetime')
+            count = outbox.replay(kwargs['replay'], since=since, topic=kwargs['topic'])
+            self.stdout.write(self.style.SUCCESS(f'Replayed {count} events to {kwargs["replay"]}'))
+            return
+
+        if kwargs['prune']:
+            self.stdout.write(self.style.SUCCESS(f'Pruned {outbox.prune()} processed events'))
+            return
+
+        total_processed = total_failed = 0
+        pruned_at = None
+        try:
+            while True:
+                processed, failed = outbox.process_batch(kwargs['batch_size'])
+                total_processed += processed
+                total_failed += failed
+                if processed or failed:
+                    self.stdout.write(f'Processed {processed}, failed {failed}')
+                    continue
+                if kwargs['once']:
+                    break
+                # idle: drop processed events past their retention now and then
+                if pruned_at is None or time.monotonic() - pruned_at >= settings.OUTBOX_PRUNE_INTERVAL:
+                    pruned = outbox.prune()
+                    pruned_at = time.monotonic()
+                    if pruned:
+                        self.stdout.write(f'Pruned {pruned} processed events')
+                time.sleep(kwargs['sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total_processed} events, {total_failed} failed'))
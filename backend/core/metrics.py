@@ -0,0 +1,127 @@
+"""
+In-process request metrics.
+
+``core.middleware.InstrumentationMiddleware`` records every request against
+its resolved endpoint (``ViewSet.action``): a request counter per status
+class and a latency histogram. Sampled requests also record their SQL query
+count, the time spent in the database and the time spent rendering the
+response body. Histograms have fixed buckets, so recording is a bisect and a
+few increments under a lock and memory does not grow with traffic.
+Percentiles in ``report()`` are interpolated within the buckets.
+
+Counters live in this process only; every worker reports its own.
+"""
+import bisect
+import threading
+
+# upper bounds; a final bucket catches everything above the last one
+MILLISECOND_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+_lock = threading.Lock()
+_endpoints = {}
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i else 0
+                if i == len(self.bounds):
+                    # no upper bound to interpolate towards
+                    return lower
+                return round(lower + (self.bounds[i] - lower) * (rank - seen) / count, 2)
+            seen += count
+        return self.bounds[-1]
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.sum / self.count, 2),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+class EndpointStats:
+    __slots__ = ('statuses', 'latency', 'queries', 'db', 'serialize')
+
+    def __init__(self):
+        # {'2xx': n, ...}
+        self.statuses = {}
+        self.latency = Histogram(MILLISECOND_BUCKETS)
+        # sampled requests only
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db = Histogram(MILLISECOND_BUCKETS)
+        self.serialize = Histogram(MILLISECOND_BUCKETS)
+
+
+def observe(endpoint, status_code, latency_ms, queries=None, db_ms=None, serialize_ms=None):
+    """Record one request; the last three are given for sampled requests."""
+    status_class = f'{status_code // 100}xx'
+    with _lock:
+        stats = _endpoints.get(endpoint)
+        if stats is None:
+            stats = _endpoints[endpoint] = EndpointStats()
+        stats.statuses[status_class] = stats.statuses.get(status_class, 0) + 1
+        stats.latency.observe(latency_ms)
+        if queries is not None:
+            stats.queries.observe(queries)
+            stats.db.observe(db_ms)
+            stats.serialize.observe(serialize_ms or 0)
+
+
+def endpoints():
+    """Return ``{endpoint: EndpointStats}``, a consistent copy."""
+    with _lock:
+        copies = {}
+        for endpoint, stats in _endpoints.items():
+            copy = EndpointStats()
+            copy.statuses = dict(stats.statuses)
+            for name in ('latency', 'queries', 'db', 'serialize'):
+                histogram, source = getattr(copy, name), getattr(stats, name)
+                histogram.counts, histogram.sum, histogram.count = list(source.counts), source.sum, source.count
+            copies[endpoint] = copy
+        return copies
+
+
+def report():
+    """Aggregated per-endpoint figures, most time consuming first."""
+    rows = {
+        endpoint: {
+            'requests': stats.latency.count,
+            'statuses': stats.statuses,
+            'latency_ms': stats.latency.summary(),
+            'queries': stats.queries.summary(),
+            'db_ms': stats.db.summary(),
+            'serialize_ms': stats.serialize.summary(),
+        }
+        for endpoint, stats in endpoints().items()
+    }
+    return dict(sorted(rows.items(), key=lambda item: -item[1]['requests'] * item[1]['latency_ms'].get('mean', 0)))
+
+
+def reset():
+    with _lock:
+        _endpoints.clear()
@@ -0,0 +1,102 @@
+"""
+Per-endpoint request instrumentation; see ``core.metrics``.
+
+Latency and status are recorded for every request. A share of requests set
+by ``REQUEST_METRICS_SAMPLE_RATE`` is also run under a database execute
+wrapper counting queries and their time, and has its response rendering
+timed; those are logged as one JSON line on the ``core.requests`` logger.
+Requests slower than ``REQUEST_METRICS_SLOW_MS`` are logged as warnings
+whether sampled or not.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger('core.requests')
+
+
+class QueryTimer:
+    """Execute wrapper counting the queries run and the seconds they take."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+def endpoint_name(request):
+    """``ViewSet.action`` for DRF views, the URL name otherwise; unmatched URLs share one name."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view = getattr(match.func, 'cls', None)
+    if view is None:
+        return match.view_name or match._func_path
+    actions = getattr(match.func, 'actions', None) or {}
+    return f'{view.__name__}.{actions.get(request.method.lower(), request.method.lower())}'
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_METRICS_ENABLED', True)
+        self.sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 0.1)
+        self.slow_ms = getattr(settings, 'REQUEST_METRICS_SLOW_MS', 1000)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        timer = QueryTimer() if random.random() < self.sample_rate else None
+        request._metrics_render_seconds = 0.0
+        request._metrics_sampled = timer is not None
+        started = time.perf_counter()
+        if timer is None:
+            response = self.get_response(request)
+        else:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        endpoint = endpoint_name(request)
+        line = {'endpoint': endpoint, 'method': request.method, 'status': response.status_code, 'latency_ms': round(latency_ms, 2)}
+        if timer is None:
+            metrics.observe(endpoint, response.status_code, latency_ms)
+        else:
+            db_ms = timer.seconds * 1000
+            serialize_ms = request._metrics_render_seconds * 1000
+            metrics.observe(endpoint, response.status_code, latency_ms, timer.queries, db_ms, serialize_ms)
+            line.update(queries=timer.queries, db_ms=round(db_ms, 2), serialize_ms=round(serialize_ms, 2))
+
+        if latency_ms >= self.slow_ms:
+            logger.warning(json.dumps({'slow': True, **line}))
+        elif timer is not None:
+            logger.info(json.dumps(line))
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook; time it for sampled requests
+        if getattr(request, '_metrics_sampled', False):
+            started = time.perf_counter()
+
+            def rendered(response):
+                request._metrics_render_seconds = time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
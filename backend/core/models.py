@@ -1,3 +1,34 @@
 from django.db import models
 
-# Create your models here.
+
+class OutboxEvent(models.Model):
+    """
+    A domain event written in the same transaction as the change it describes
+    and fanned out to consumers by ``python manage.py process_outbox``.
+    """
+    topic = models.CharField(max_length=100)
+    aggregate_type = models.CharField(max_length=50)
+    aggregate_id = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # delivery bookkeeping for the outbox worker
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    claim_token = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+
+    class Meta:
+        db_table = 'outbox_events'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['aggregate_type', 'aggregate_id'], name='outbox_aggregate_idx'),
+            models.Index(fields=['topic', 'created_at'], name='outbox_topic_created_idx'),
+            # only unprocessed events are ever polled
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='outbox_pending_idx'),
+            # pruning finds the events processed before the retention cutoff
+            models.Index(fields=['processed_at'], condition=models.Q(processed_at__isnull=False), name='outbox_processed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} {self.aggregate_type}#{self.aggregate_id}"
@@ -0,0 +1,134 @@
+"""
+Transactional outbox.
+
+Writes append events with ``publish()`` inside the transaction that changes
+the data, so an event exists exactly when its change was committed. The
+``process_outbox`` worker later hands every event to the consumers registered
+for its topic. The consumers of one event run in a single transaction
+together with marking the event processed, so database side effects are
+applied once; a failure rolls them back and the event is retried with
+backoff. Processed events stay in the table for ``OUTBOX_RETENTION_DAYS``,
+during which they can be replayed to a consumer, e.g. to backfill a new one;
+``prune()``, run by the worker when it is idle, deletes them afterwards.
+"""
+import datetime
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .leases import claim_due, retry_delay
+from .models import OutboxEvent
+
+_consumers = defaultdict(dict)
+
+
+def consumer(topic, name=None):
+    """Register the decorated ``function(event)`` as a consumer of ``topic``."""
+    def register(function):
+        _consumers[topic][name or f'{function.__module__}.{function.__name__}'] = function
+        return function
+    return register
+
+
+def consumers_for(topic):
+    return dict(_consumers.get(topic, {}))
+
+
+def consumer_names():
+    return sorted({name for registered in _consumers.values() for name in registered})
+
+
+def publish(topic, instance, payload):
+    """Append an event about the model ``instance``; call inside the writing transaction."""
+    return OutboxEvent.objects.create(
+        topic=topic,
+        aggregate_type=instance._meta.label_lower,
+        aggregate_id=str(instance.pk),
+        payload=payload,
+    )
+
+
+def publish_batch(topic, instances, payload):
+    """
+    Append one event about several ``instances`` of a model. The aggregate id
+    is the first instance's; the payload lists the rest.
+    """
+    return OutboxEvent.objects.create(
+        topic=topic,
+        aggregate_type=instances[0]._meta.label_lower,
+        aggregate_id=str(instances[0].pk),
+        payload=payload,
+    )
+
+
+def _error(exc):
+    return f'{exc.__class__.__name__}: {exc}'
+
+
+def process_batch(batch_size=100, now=None):
+    """Claim and process one batch of events. Returns ``(processed, failed)``."""
+    now = now or timezone.now()
+    events = claim_due(
+        OutboxEvent.objects.filter(processed_at__isnull=True),
+        batch_size,
+        settings.OUTBOX_CLAIM_TIMEOUT,
+        now,
+    )
+
+    processed = failed = 0
+    for event in events:
+        event.attempts += 1
+        event.claim_token = None
+        try:
+            with transaction.atomic():
+                for function in consumers_for(event.topic).values():
+                    function(event)
+                event.processed_at = timezone.now()
+                event.next_attempt_at = None
+                event.last_error = ''
+                event.save(update_fields=['attempts', 'claim_token', 'processed_at', 'next_attempt_at', 'last_error'])
+            processed += 1
+        except Exception as exc:
+            event.processed_at = None
+            event.last_error = _error(exc)
+            # keep retrying with the capped delay; a stuck event shows up in last_error
+            event.next_attempt_at = now + retry_delay(
+                event.attempts,
+                settings.OUTBOX_RETRY_BACKOFF,
+                settings.OUTBOX_RETRY_MAX_DELAY,
+            )
+            event.save(update_fields=['attempts', 'claim_token', 'next_attempt_at', 'last_error'])
+            failed += 1
+    return processed, failed
+
+
+def replay(consumer_name, since=None, topic=None):
+    """Run one consumer over already processed events, oldest first. Returns the count."""
+    topics = [t for t, registered in _consumers.items() if consumer_name in registered]
+    if topic:
+        topics = [t for t in topics if t == topic]
+    events = OutboxEvent.objects.filter(topic__in=topics, processed_at__isnull=False)
+    if since:
+        events = events.filter(created_at__gte=since)
+
+    count = 0
+    for event in events.order_by('id').iterator():
+        with transaction.atomic():
+            _consumers[event.topic][consumer_name](event)
+        count += 1
+    return count
+
+
+def prune(now=None, batch_size=5000):
+    """Delete the events processed more than ``OUTBOX_RETENTION_DAYS`` ago, in batches. Returns the count."""
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    expired = OutboxEvent.objects.filter(processed_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
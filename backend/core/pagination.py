@@ -0,0 +1,34 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class StandardPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class NewestFirstCursorPagination(CursorPagination):
+    """
+    Keyset pagination for time-ordered tables: each page continues from the
+    position encoded in the cursor instead of an OFFSET, so deep pages cost
+    the same as the first one.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-created_at'
+
+
+class AppointmentCursorPagination(NewestFirstCursorPagination):
+    ordering = '-appointment_datetime'
+
+
+def paginated_response(view, queryset, serializer_class, pagination_class=None):
+    """
+    Paginate and serialize ``queryset`` for a custom action, using the view's
+    own paginator unless the action lists a different model.
+    """
+    paginator = pagination_class() if pagination_class else view.paginator
+    page = paginator.paginate_queryset(queryset, view.request, view=view)
+    serializer = serializer_class(page, many=True, context=view.get_serializer_context())
+    return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,96 @@
+"""
+Derive select_related/prefetch_related lookups from a serializer's fields.
+
+Nested serializers and dotted ``source=`` paths are resolved against the
+model: single-valued relations become ``select_related`` joins and anything
+that crosses a to-many relation becomes a ``prefetch_related`` lookup, so a
+list page costs a fixed number of queries however many rows it renders.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+def _relation_path(model, source_attrs):
+    """Follow ``source_attrs`` through model relations; return (path, many, target model)."""
+    path, many = [], False
+    for attr in source_attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        path.append(attr)
+        many = many or field.one_to_many or field.many_to_many
+        model = field.related_model
+    return path, many, model
+
+
+def _walk(serializer, model, prefix, in_prefetch, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+            continue
+
+        if isinstance(field, ManyRelatedField):
+            source_attrs, nested = field.source_attrs, None
+        elif isinstance(field, serializers.ListSerializer):
+            source_attrs, nested = field.source_attrs, field.child
+        else:
+            source_attrs, nested = field.source_attrs, field
+
+        path, many, target = _relation_path(model, source_attrs)
+        if not path:
+            continue
+        if isinstance(field, RelatedField) and field.use_pk_only_optimization() and len(path) == len(source_attrs):
+            # primary key fields read the ``<name>_id`` column of the row itself
+            continue
+
+        many = many or isinstance(field, ManyRelatedField)
+        lookup = '__'.join(prefix + path)
+        if in_prefetch or many:
+            prefetch.add(lookup)
+        else:
+            select.add(lookup)
+
+        if isinstance(nested, serializers.BaseSerializer):
+            _walk(nested, target, prefix + path, in_prefetch or many, select, prefetch)
+
+
+@lru_cache(maxsize=None)
+def plan_related(serializer_class, model):
+    """Return the sorted (select_related, prefetch_related) lookups for a serializer."""
+    select, prefetch = set(), set()
+    _walk(serializer_class(), model, [], False, select, prefetch)
+    # a select_related join already covers the shorter prefixes of longer ones
+    select = {lookup for lookup in select if not any(other.startswith(lookup + '__') for other in select)}
+    return tuple(sorted(select)), tuple(sorted(prefetch))
+
+
+def optimize_queryset(queryset, serializer_class):
+    """Apply the joins ``serializer_class`` needs to ``queryset``."""
+    select, prefetch = plan_related(serializer_class, queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class PrefetchPlanMixin:
+    """
+    Viewset mixin applying the serializer's prefetch plan to ``get_queryset()``
+    for the actions in ``prefetch_actions``, the ones that render its rows with
+    ``get_serializer_class()``. Other actions get the bare queryset; those that
+    serialize with another serializer pass it through ``optimize_queryset``
+    themselves.
+    """
+    prefetch_actions = ('list', 'retrieve', 'update', 'partial_update')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.prefetch_actions:
+            queryset = optimize_queryset(queryset, self.get_serializer_class())
+        return queryset
@@ -0,0 +1,107 @@
+"""
+Prometheus text exposition (format 0.0.4) of ``core.metrics`` and ``core.health``.
+
+Request figures come from this worker's in-process histograms, so under
+several gunicorn workers each scrape sees the worker that answered it; sum
+or average across scrapes accordingly. Latencies are exported in seconds.
+"""
+from . import health, metrics
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'hospital'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text):
+        self.lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        self.lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+
+    def sample(self, name, value, **labels):
+        self.lines.append(f'{PREFIX}_{name}{_labels(labels)} {_number(value)}')
+
+    def histogram(self, name, histogram, scale=1, **labels):
+        """Cumulative buckets of a ``metrics.Histogram``, bounds and sum multiplied by ``scale``."""
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.counts):
+            cumulative += count
+            self.sample(f'{name}_bucket', cumulative, **labels, le=_number(round(bound * scale, 6)))
+        self.sample(f'{name}_bucket', histogram.count, **labels, le='+Inf')
+        self.sample(f'{name}_sum', round(histogram.sum * scale, 6), **labels)
+        self.sample(f'{name}_count', histogram.count, **labels)
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _requests(exposition, endpoints):
+    exposition.family('http_requests_total', 'counter', 'Requests handled by this worker, by endpoint and status class.')
+    for endpoint, stats in endpoints.items():
+        for status_class, count in sorted(stats.statuses.items()):
+            exposition.sample('http_requests_total', count, endpoint=endpoint, status=status_class)
+
+    histograms = (
+        ('http_request_duration_seconds', 'latency', 0.001, 'Request latency.'),
+        ('http_request_db_seconds', 'db', 0.001, 'Time spent in the database, sampled requests only.'),
+        ('http_request_render_seconds', 'serialize', 0.001, 'Response rendering time, sampled requests only.'),
+        ('http_request_queries', 'queries', 1, 'SQL queries per request, sampled requests only.'),
+    )
+    for name, attribute, scale, help_text in histograms:
+        exposition.family(name, 'histogram', help_text)
+        for endpoint, stats in endpoints.items():
+            exposition.histogram(name, getattr(stats, attribute), scale, endpoint=endpoint)
+
+
+def _database(exposition):
+    exposition.family('db_connection_open', 'gauge', "Whether this worker's connection to the database is open.")
+    persistent = {}
+    for alias, (is_open, is_persistent) in health.local_connections().items():
+        exposition.sample('db_connection_open', int(is_open), alias=alias)
+        persistent[alias] = is_persistent
+    exposition.family('db_connection_persistent', 'gauge', 'Whether connections are kept between requests (CONN_MAX_AGE).')
+    for alias, is_persistent in persistent.items():
+        exposition.sample('db_connection_persistent', int(is_persistent), alias=alias)
+
+    server = health.server_connections()
+    if server:
+        exposition.family('db_server_connections', 'gauge', 'Connections to the application database on the server, by state.')
+        for state, count in sorted(server.items()):
+            exposition.sample('db_server_connections', count, state=state)
+
+
+def _queues(exposition):
+    depths = health.queues()
+    exposition.family('queue_depth', 'gauge', 'Rows waiting in a background queue (capped at METRICS_QUEUE_COUNT_LIMIT).')
+    for queue, figures in depths.items():
+        exposition.sample('queue_depth', figures['depth'], queue=queue)
+    exposition.family('queue_oldest_age_seconds', 'gauge', 'Age of the oldest row waiting in a background queue.')
+    for queue, figures in depths.items():
+        exposition.sample('queue_oldest_age_seconds', round(figures['oldest_age_seconds'], 3), queue=queue)
+
+
+def render():
+    exposition = Exposition()
+    _requests(exposition, metrics.endpoints())
+    _database(exposition)
+    _queues(exposition)
+    return exposition.render()
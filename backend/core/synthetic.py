@@ -0,0 +1,429 @@
+"""
+Deterministic synthetic hospital data for load and query-plan work.
+
+``generate()`` writes doctors (with user accounts, weekly availability,
+breaks, vacations and per-specialization slot policies), patients, and
+appointments over ``years`` of history plus ``future_days`` ahead, with the
+medical records and notifications those appointments would have produced.
+Every choice comes from one ``random.Random(seed)`` and every timestamp is
+relative to ``today``, so the same arguments against an empty database give
+the same rows, primary keys included.
+
+Rows are produced by generators and written in chunks of ``batch_size``
+with ``bulk_create``, each chunk in its own transaction, so memory stays
+bounded by the chunk size and the doctor list however many rows are
+written. Primary keys are assigned here, which lets one chunk reference
+the previous ones without reading anything back; sequences are reset at
+the end. Appointments follow each doctor's compiled ``Schedule``, so they
+respect working hours, breaks, vacations, slot length and capacity, and
+the scheduled ones never collide.
+
+Signals are bypassed: no outbox events are written and the search index
+and patient lookup keys are filled directly unless ``index`` is False (run
+``rebuild_search_index`` later in that case).
+"""
+import contextlib
+import datetime
+import itertools
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from appointments.models import Appointment
+from doctors.caching import DIRECTORY, invalidate_doctor
+from doctors.models import Availability, AvailabilityException, Doctor, SlotPolicy
+from doctors.schedule import Policy, WEEKDAYS, compile_schedule, default_policy
+from notifications.models import Notification
+from notifications.reminders import format_when, reminder_windows
+from patients.lookup import index_patients
+from patients.models import Patient
+from records.models import MedicalRecord
+from search.index import index_objects
+from . import cache as cache_layer
+
+FIRST_NAMES = (
+    'Amina', 'Brian', 'Carol', 'David', 'Esther', 'Felix', 'Grace', 'Hassan', 'Irene', 'James',
+    'Joy', 'Kevin', 'Lucy', 'Mark', 'Mercy', 'Njeri', 'Otieno', 'Peter', 'Rose', 'Samuel',
+    'Tabitha', 'Victor', 'Wanjiru', 'Yusuf', 'Zawadi', 'Achieng', 'Daniel', 'Faith', 'George', 'Mary',
+)
+LAST_NAMES = (
+    'Kamau', 'Otieno', 'Wanjiku', 'Mwangi', 'Ochieng', 'Kiprop', 'Njoroge', 'Mutua', 'Akinyi', 'Chebet',
+    'Omondi', 'Wambui', 'Kariuki', 'Hassan', 'Mohamed', 'Smith', 'Johnson', 'Patel', 'Okafor', 'Mensah',
+)
+INSURERS = ('NHIF', 'AAR', 'Jubilee', 'Britam', 'CIC', 'Madison')
+# specialization -> (slot minutes, buffer minutes, capacity), stored as SlotPolicy rows
+SPECIALIZATIONS = {
+    'General Practice': (15, 0, 1),
+    'Pediatrics': (20, 0, 1),
+    'Cardiology': (30, 10, 1),
+    'Dermatology': (15, 5, 1),
+    'Orthopedics': (30, 0, 1),
+    'Psychiatry': (50, 10, 1),
+    'Physiotherapy': (60, 0, 3),
+    'Radiology': (20, 0, 2),
+}
+# (weekdays, working windows, breaks); times as (hour, minute)
+SHIFTS = (
+    (range(5), (((8, 0), (17, 0)),), (((12, 30), (13, 30)),)),
+    (range(5), (((8, 0), (12, 0)), ((14, 0), (18, 0))), ()),
+    (range(6), (((9, 0), (15, 0)),), (((12, 0), (12, 30)),)),
+    ((0, 2, 4), (((9, 0), (13, 0)),), ()),
+)
+REASONS = (
+    'Routine check-up', 'Follow-up visit', 'Persistent cough', 'Back pain', 'Skin rash', 'Headaches',
+    'Chest pain', 'Blood pressure review', 'Vaccination', 'Joint pain', 'Fatigue', 'Lab results review',
+)
+DIAGNOSES = (
+    ('Upper respiratory tract infection', 'Cough, sore throat, mild fever', 'Amoxicillin 500mg three times daily for 7 days'),
+    ('Hypertension', 'Elevated blood pressure, occasional headaches', 'Amlodipine 5mg once daily'),
+    ('Type 2 diabetes mellitus', 'Increased thirst, frequent urination', 'Metformin 500mg twice daily'),
+    ('Lower back strain', 'Lumbar pain after lifting', 'Ibuprofen 400mg as needed; physiotherapy'),
+    ('Atopic dermatitis', 'Itchy, dry patches on forearms', 'Hydrocortisone cream 1% twice daily'),
+    ('Migraine', 'Recurrent unilateral headaches with nausea', 'Sumatriptan 50mg at onset'),
+    ('Malaria', 'Fever, chills, joint aches', 'Artemether-lumefantrine for 3 days'),
+    ('Healthy', 'No complaints', ''),
+)
+# status mixes of past and upcoming appointments
+PAST_STATUSES = (('COMPLETED', 0.82), ('CANCELLED', 0.13), ('SCHEDULED', 0.05))
+FUTURE_STATUSES = (('SCHEDULED', 0.9), ('CANCELLED', 0.1))
+REMINDER_FAILURE_RATE = 0.03
+VACATION_DAYS = 10
+
+
+class GenerationReport:
+    def __init__(self):
+        self.counts = {}
+
+    def add(self, name, count):
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    def __getitem__(self, name):
+        return self.counts.get(name, 0)
+
+
+@contextlib.contextmanager
+def historical_timestamps(*models):
+    """Let ``created_at``/``updated_at`` be set explicitly on ``models`` instead of to now."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _pick(rng, weighted):
+    roll = rng.random()
+    for value, weight in weighted:
+        roll -= weight
+        if roll < 0:
+            return value
+    return weighted[-1][0]
+
+
+def _aware(date, minute):
+    naive = datetime.datetime.combine(date, datetime.time(minute // 60, minute % 60))
+    return timezone.make_aware(naive, is_dst=False)
+
+
+def _phone(rng):
+    return f'+2547{rng.randrange(10 ** 8):08d}'
+
+
+class Generator:
+    def __init__(self, seed, today, years, future_days, utilization, record_rate, batch_size, index, password):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.today = today
+        self.now = _aware(today, 12 * 60)
+        self.start = today - datetime.timedelta(days=round(365.25 * years))
+        self.end = today + datetime.timedelta(days=future_days)
+        self.utilization = utilization
+        self.record_rate = record_rate
+        self.batch_size = batch_size
+        self.index = index
+        self.password = password
+        self.windows = reminder_windows()
+        self.report = GenerationReport()
+
+    # doctors
+
+    def _slot_policies(self):
+        SlotPolicy.objects.bulk_create(
+            [SlotPolicy(specialization=name, slot_minutes=slot, buffer_minutes=buffer, capacity=capacity)
+             for name, (slot, buffer, capacity) in SPECIALIZATIONS.items()],
+            ignore_conflicts=True,
+        )
+        # existing rows win, so read back what booking will actually use
+        return {
+            policy.specialization: default_policy()._replace(**{
+                field: getattr(policy, field) for field in Policy._fields if getattr(policy, field) is not None
+            })
+            for policy in SlotPolicy.objects.filter(specialization__in=SPECIALIZATIONS)
+        }
+
+    def _availabilities(self, doctor_id):
+        weekdays, windows, breaks = self.rng.choice(SHIFTS)
+        rows = []
+        for day in weekdays:
+            for kind, intervals in ((Availability.WORK, windows), (Availability.BREAK, breaks)):
+                for start, end in intervals:
+                    rows.append(Availability(
+                        doctor_id=doctor_id, day_of_week=WEEKDAYS[day], kind=kind,
+                        start_time=datetime.time(*start), end_time=datetime.time(*end),
+                    ))
+        return rows
+
+    def _vacations(self, doctor_id):
+        rows = []
+        for year in range(self.start.year, self.end.year + 1):
+            start = datetime.date(year, 1, 1) + datetime.timedelta(days=self.rng.randrange(350))
+            rows.append(AvailabilityException(
+                doctor_id=doctor_id, start_date=start,
+                end_date=start + datetime.timedelta(days=VACATION_DAYS - 1), reason='Annual leave',
+            ))
+        return rows
+
+    def doctors(self, count):
+        """Write ``count`` doctors and return ``[(doctor id, user id, Schedule)]``."""
+        policies = self._slot_policies()
+        password = make_password(self.password)
+        user_model = get_user_model()
+        first_user, first_doctor = _next_id(user_model), _next_id(Doctor)
+        created_at = _aware(self.start, 8 * 60)
+        doctors = []
+        for chunk in _chunks(range(count), self.batch_size):
+            users, rows, availabilities, exceptions = [], [], [], []
+            for n in chunk:
+                first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+                specialization = self.rng.choice(list(SPECIALIZATIONS))
+                user_id, doctor_id = first_user + n, first_doctor + n
+                users.append(user_model(
+                    id=user_id, username=f'dr{self.seed}_{n}', password=password, role='DOCTOR',
+                    first_name=first, last_name=last, email=f'dr.{first}.{last}.{self.seed}.{n}@example.org'.lower(),
+                ))
+                rows.append(Doctor(
+                    id=doctor_id, user_id=user_id, first_name=first, last_name=last,
+                    email=f'dr.{first}.{last}.{self.seed}.{n}@example.org'.lower(), phone=_phone(self.rng),
+                    specialization=specialization, bio=f'{specialization} consultant.',
+                    created_at=created_at, updated_at=created_at,
+                ))
+                doctor_availabilities = self._availabilities(doctor_id)
+                doctor_exceptions = self._vacations(doctor_id)
+                availabilities += doctor_availabilities
+                exceptions += doctor_exceptions
+                doctors.append((doctor_id, user_id, compile_schedule(
+                    doctor_availabilities, doctor_exceptions, policies[specialization],
+                )))
+            with transaction.atomic():
+                user_model.objects.bulk_create(users)
+                Doctor.objects.bulk_create(rows)
+                Availability.objects.bulk_create(availabilities)
+                AvailabilityException.objects.bulk_create(exceptions)
+                if self.index:
+                    index_objects('doctor', rows)
+            self.report.add('doctors', len(rows))
+            self.report.add('availabilities', len(availabilities))
+        return doctors
+
+    # patients
+
+    def _patients(self, count, first_id):
+        for n in range(count):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            born = datetime.date(1935, 1, 1) + datetime.timedelta(days=self.rng.randrange(365 * 88))
+            created_at = _aware(self.start - datetime.timedelta(days=self.rng.randrange(730)), 8 * 60 + self.rng.randrange(600))
+            insured = self.rng.random() < 0.7
+            yield Patient(
+                id=first_id + n, first_name=first, last_name=last, date_of_birth=born,
+                email=f'{first}.{last}.{self.seed}.{n}@example.com'.lower(), phone=_phone(self.rng),
+                address=f'{self.rng.randrange(1, 999)} {self.rng.choice(LAST_NAMES)} Road, Nairobi',
+                insurance_provider=self.rng.choice(INSURERS) if insured else None,
+                insurance_id=f'INS-{self.rng.randrange(10 ** 9):09d}' if insured else None,
+                created_at=created_at, updated_at=created_at,
+            )
+
+    def patients(self, count):
+        """Write ``count`` patients and return the range of their ids."""
+        first_id = _next_id(Patient)
+        for chunk in _chunks(self._patients(count, first_id), self.batch_size):
+            with transaction.atomic():
+                Patient.objects.bulk_create(chunk)
+                if self.index:
+                    index_patients(chunk)
+                    index_objects('patient', chunk)
+            self.report.add('patients', len(chunk))
+            yield
+        self.patient_ids = range(first_id, first_id + count)
+
+    # appointments, records and notifications
+
+    def _patient_id(self):
+        # squaring skews visits towards a minority of frequent patients
+        return self.patient_ids[int(len(self.patient_ids) * self.rng.random() ** 2)]
+
+    def _appointments(self, doctors, first_id):
+        next_id = first_id
+        date = self.start
+        while date <= self.end:
+            for doctor_id, user_id, schedule in doctors:
+                policy = schedule.policy
+                span = policy.slot_minutes + policy.buffer_minutes
+                for window_start, window_end in schedule.intervals_on(date):
+                    for minute in range(window_start, window_end - policy.slot_minutes + 1, span):
+                        for seat in range(policy.capacity):
+                            if self.rng.random() >= self.utilization:
+                                continue
+                            yield self._appointment(next_id, doctor_id, user_id, date, minute, seat, policy)
+                            next_id += 1
+            date += datetime.timedelta(days=1)
+
+    def _appointment(self, appointment_id, doctor_id, user_id, date, minute, seat, policy):
+        when = _aware(date, minute)
+        booked_at = when - datetime.timedelta(minutes=self.rng.randrange(60, 60 * 24 * 30))
+        if booked_at > self.now:
+            booked_at = self.now - datetime.timedelta(minutes=self.rng.randrange(1, 60 * 24 * 14))
+        if when < self.now:
+            status = _pick(self.rng, PAST_STATUSES)
+            updated_at = when + datetime.timedelta(minutes=policy.slot_minutes) if status != 'SCHEDULED' else booked_at
+        else:
+            status = _pick(self.rng, FUTURE_STATUSES)
+            updated_at = booked_at
+        if status == 'CANCELLED':
+            updated_at = booked_at + (min(when, self.now) - booked_at) * self.rng.random()
+        appointment = Appointment(
+            id=appointment_id, patient_id=self._patient_id(), doctor_id=doctor_id, appointment_datetime=when,
+            status=status, reason=self.rng.choice(REASONS), duration_minutes=policy.slot_minutes, seat=seat,
+            created_at=booked_at, updated_at=min(updated_at, self.now),
+        )
+        # kept for the record's created_by; not a model field
+        appointment.doctor_user_id = user_id
+        return appointment
+
+    def _record(self, record_id, appointment):
+        diagnosis, symptoms, prescription = self.rng.choice(DIAGNOSES)
+        written = appointment.appointment_datetime + datetime.timedelta(minutes=appointment.duration_minutes)
+        return MedicalRecord(
+            id=record_id, patient_id=appointment.patient_id, appointment_id=appointment.id,
+            doctor_id=appointment.doctor_id, diagnosis=diagnosis, symptoms=symptoms,
+            prescription=prescription or None, notes=f'Seen for: {appointment.reason}.',
+            created_by_id=appointment.doctor_user_id, updated_by_id=appointment.doctor_user_id,
+            created_at=written, updated_at=written,
+        )
+
+    def _notification(self, appointment, notification_type, message, created_at, status, window=None):
+        return Notification(
+            patient_id=appointment.patient_id, appointment_id=appointment.id, notification_type=notification_type,
+            message=message, status=status, created_at=created_at, reminder_window=window,
+            sent_at=created_at + datetime.timedelta(seconds=self.rng.randrange(5, 300)) if status == 'SENT' else None,
+            attempts=0 if status == 'PENDING' else 1,
+        )
+
+    def _notifications(self, appointment):
+        when = appointment.appointment_datetime
+        when_text = format_when(timezone.localtime(when))
+        rows = [self._notification(
+            appointment, 'APPOINTMENT_CONFIRMATION', f'Your appointment has been scheduled for {when_text}.',
+            appointment.created_at, 'SENT',
+        )]
+        if appointment.status == 'CANCELLED':
+            rows.append(self._notification(
+                appointment, 'APPOINTMENT_CANCELLATION', f'Your appointment on {when_text} has been cancelled.',
+                appointment.updated_at, 'SENT',
+            ))
+            return rows
+        for window in self.windows:
+            due = when - datetime.timedelta(minutes=window)
+            if due < appointment.created_at or due > self.now:
+                continue
+            if when > self.now:
+                # due but not dispatched yet: the live pending queue
+                status = 'PENDING'
+            else:
+                status = 'FAILED' if self.rng.random() < REMINDER_FAILURE_RATE else 'SENT'
+            rows.append(self._notification(
+                appointment, 'APPOINTMENT_REMINDER', f'Reminder: your appointment is on {when_text}.',
+                due, status, window,
+            ))
+        return rows
+
+    def appointments(self, doctors):
+        first_record = _next_id(MedicalRecord)
+        record_id = first_record
+        for chunk in _chunks(self._appointments(doctors, _next_id(Appointment)), self.batch_size):
+            records, notifications = [], []
+            for appointment in chunk:
+                if appointment.status == 'COMPLETED' and self.rng.random() < self.record_rate:
+                    records.append(self._record(record_id, appointment))
+                    record_id += 1
+                notifications += self._notifications(appointment)
+            with transaction.atomic():
+                Appointment.objects.bulk_create(chunk)
+                MedicalRecord.objects.bulk_create(records)
+                Notification.objects.bulk_create(notifications)
+                if self.index:
+                    index_objects('record', records)
+            self.report.add('appointments', len(chunk))
+            self.report.add('medical_records', len(records))
+            self.report.add('notifications', len(notifications))
+            yield
+
+
+def _reset_sequences(models):
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def generate(doctors, patients, seed=0, today=None, years=2, future_days=60, utilization=0.6,
+             record_rate=0.7, batch_size=5000, index=True, password='synthetic-pass', progress=None):
+    """
+    Generate the dataset and return a ``GenerationReport``. ``progress(stage,
+    report)`` is called after every chunk written.
+    """
+    generator = Generator(
+        seed, today or timezone.localdate(), years, future_days, utilization, record_rate, batch_size, index, password,
+    )
+    models = [get_user_model(), Doctor, Availability, AvailabilityException, Patient, Appointment, MedicalRecord, Notification]
+    with historical_timestamps(*models):
+        schedules = generator.doctors(doctors)
+        if progress:
+            progress('doctors', generator.report)
+        for _ in generator.patients(patients):
+            if progress:
+                progress('patients', generator.report)
+        if patients:
+            for _ in generator.appointments(schedules):
+                if progress:
+                    progress('appointments', generator.report)
+    _reset_sequences(models)
+
+    # bulk_create skips the signals that drop cached schedules and slot indexes
+    for doctor_id, _, _ in schedules:
+        invalidate_doctor(doctor_id)
+    cache_layer.invalidate(DIRECTORY)
+    return generator.report
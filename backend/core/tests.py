@@ -1,3 +1,684 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Subquery, Sum
+from django.utils import timezone
+from unittest import mock, skipUnless
+import csv
+import datetime
+import io
+import json
+import re
 
-# Create your tests here.
+from patients.models import Patient, PatientLookupKey
+from doctors.models import Doctor, Availability, AvailabilityException
+from doctors.schedule import get_schedule
+from doctors.slots import day_bounds
+from doctors.dashboard import doctor_patients, doctor_records
+from appointments.models import Appointment
+from records.models import MedicalRecord
+from notifications.models import Notification
+from notifications.serializers import NotificationSerializer
+from records.serializers import MedicalRecordSerializer
+from doctors.serializers import DoctorSerializer
+from core.prefetch import plan_related
+from core.models import OutboxEvent
+from core import benchmark, health, metrics, outbox, synthetic
+from search import engine
+from rest_framework.test import APIClient
+
+
+User = get_user_model()
+
+
+# SQLite reports "SEARCH" for index range lookups and "SCAN" when it walks a whole
+# table or index; walking a partial index only visits the rows it was built for,
+# and a "VIRTUAL TABLE INDEX" scan is an FTS5 MATCH lookup
+SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?! VIRTUAL TABLE)(?: USING (?:COVERING )?INDEX (\w+))?')
+PARTIAL_INDEXES = {'notif_pending_idx', 'outbox_pending_idx'}
+
+
+@skipUnless(connection.vendor == 'sqlite', 'query plans are checked against SQLite')
+class QueryPlanTests(TestCase):
+   """
+   Runs EXPLAIN QUERY PLAN for the filters the API views issue and fails when
+   one of them has to read a whole table.
+   """
+
+   def assertUsesIndex(self, queryset):
+       plan = queryset.explain()
+       for table, index in SCAN.findall(plan):
+           self.assertIn(index, PARTIAL_INDEXES, f"Full scan of {table} in plan:\n{plan}\nfor query:\n{queryset.query}")
+
+   def setUp(self):
+       self.day = timezone.localdate()
+       self.start, self.end = day_bounds(self.day)
+
+   def test_doctor_schedule_queries(self):
+       # slot index, conflict checks and search_slots
+       self.assertUsesIndex(Appointment.objects.filter(
+           doctor_id=1, status='SCHEDULED',
+           appointment_datetime__gt=self.start, appointment_datetime__lt=self.end
+       ))
+       self.assertUsesIndex(Appointment.objects.filter(
+           doctor_id__in=[1, 2, 3], status='SCHEDULED',
+           appointment_datetime__gt=self.start, appointment_datetime__lt=self.end
+       ).values_list('doctor_id', 'appointment_datetime'))
+       # my_appointments
+       self.assertUsesIndex(Appointment.objects.filter(doctor_id=1).order_by('-appointment_datetime'))
+       self.assertUsesIndex(Appointment.objects.filter(doctor_id=1).on_date(self.day))
+
+   def test_appointment_list_filters(self):
+       self.assertUsesIndex(Appointment.objects.on_date(self.day))
+       self.assertUsesIndex(Appointment.objects.filter(appointment_datetime__gt=timezone.now()))
+       self.assertUsesIndex(Appointment.objects.filter(patient_id=1))
+       self.assertUsesIndex(Appointment.objects.filter(doctor_id=1, status='SCHEDULED'))
+
+   def test_doctor_patient_queries(self):
+       # my_patients and my_records
+       patient_ids = Appointment.objects.filter(doctor_id=1).values('patient')
+       self.assertUsesIndex(Patient.objects.filter(id__in=Subquery(patient_ids)))
+       self.assertUsesIndex(MedicalRecord.objects.filter(patient__id__in=Subquery(patient_ids)))
+       # my_dashboard
+       self.assertUsesIndex(doctor_records(1).order_by('-updated_at'))
+       self.assertUsesIndex(doctor_patients(1).filter(updated_at__gt=self.start).order_by('last_name', 'first_name'))
+
+   def test_medical_record_queries(self):
+       self.assertUsesIndex(MedicalRecord.objects.filter(patient_id=1))
+       self.assertUsesIndex(MedicalRecord.objects.filter(appointment_id=1))
+       self.assertUsesIndex(MedicalRecord.objects.filter(doctor_id=1))
+
+   def test_notification_queries(self):
+       self.assertUsesIndex(Notification.objects.filter(patient_id=1))
+       self.assertUsesIndex(Notification.objects.filter(patient_id=1, status='PENDING'))
+       self.assertUsesIndex(Notification.objects.filter(appointment_id=1))
+       self.assertUsesIndex(Notification.objects.filter(status='PENDING').order_by('created_at'))
+       # reminder scan
+       self.assertUsesIndex(Appointment.objects.filter(
+           status='SCHEDULED', appointment_datetime__gte=self.start, appointment_datetime__lte=self.end
+       ).order_by('appointment_datetime', 'id'))
+
+   def test_search_queries(self):
+       # ?search= on the patient, doctor and record lists
+       self.assertUsesIndex(Patient.objects.filter(pk__in=engine.matching_ids('jane smi', 'patient')))
+       self.assertUsesIndex(MedicalRecord.objects.filter(pk__in=engine.matching_ids('fever', 'record')))
+       # patient check-in lookup
+       self.assertUsesIndex(
+           PatientLookupKey.objects.filter(key__in=['t:$sm', 's:S530'])
+           .values('patient_id').annotate(score=Sum('weight')).order_by('-score')
+       )
+
+   def test_outbox_queries(self):
+       self.assertUsesIndex(OutboxEvent.objects.filter(processed_at__isnull=True).order_by('id'))
+       self.assertUsesIndex(OutboxEvent.objects.filter(aggregate_type='appointments.appointment', aggregate_id='1'))
+
+   def test_availability_queries(self):
+       self.assertUsesIndex(Availability.objects.filter(doctor_id=1, specific_date=self.day))
+       self.assertUsesIndex(Availability.objects.filter(doctor_id__in=[1, 2], specific_date__isnull=True))
+       # compiled schedules
+       self.assertUsesIndex(Availability.objects.filter(doctor_id__in=[1, 2]))
+       self.assertUsesIndex(AvailabilityException.objects.filter(doctor_id__in=[1, 2]))
+
+
+class PrefetchPlanTests(TestCase):
+   def test_nested_serializers_become_joins(self):
+       self.assertEqual(
+           plan_related(NotificationSerializer, Notification),
+           (('appointment__doctor', 'appointment__patient', 'patient'), ())
+       )
+       self.assertEqual(
+           plan_related(MedicalRecordSerializer, MedicalRecord),
+           (('appointment__doctor', 'appointment__patient', 'patient'), ())
+       )
+
+   def test_to_many_relations_are_prefetched(self):
+       self.assertEqual(plan_related(DoctorSerializer, Doctor), ((), ('availabilities',)))
+
+
+class ListQueryCountTests(TestCase):
+   """Every list endpoint must cost the same number of queries for 1 row as for many."""
+
+   def setUp(self):
+       self.client = APIClient()
+       self.doctor_user = User.objects.create_user(username='doctoruser', password='doctorpass123', role='DOCTOR')
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology',
+           user=self.doctor_user
+       )
+       self.rows = 0
+       self.add_rows(1)
+       token = self.client.post('/api/auth/token/', {
+           'username': 'doctoruser',
+           'password': 'doctorpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def add_rows(self, count):
+       for _ in range(count):
+           self.rows += 1
+           patient = Patient.objects.create(
+               first_name=f'Patient{self.rows}',
+               last_name='Doe',
+               date_of_birth='1990-01-01',
+               email=f'patient{self.rows}@example.com'
+           )
+           appointment = Appointment.objects.create(
+               patient=patient,
+               doctor=self.doctor,
+               appointment_datetime=timezone.now() + datetime.timedelta(days=1, hours=self.rows)
+           )
+           MedicalRecord.objects.create(patient=patient, doctor=self.doctor, appointment=appointment, diagnosis='Flu')
+           Notification.objects.create(
+               patient=patient,
+               appointment=appointment,
+               notification_type='APPOINTMENT_CONFIRMATION',
+               message='Scheduled'
+           )
+
+   def count_queries(self, url):
+       # measure the uncached path of endpoints served through core.cache
+       cache.clear()
+       with CaptureQueriesContext(connection) as queries:
+           response = self.client.get(url)
+       self.assertEqual(response.status_code, 200)
+       return len(queries)
+
+   def test_list_endpoints_use_constant_queries(self):
+       urls = [
+           '/api/notifications/',
+           '/api/records/',
+           '/api/appointments/',
+           '/api/doctors/my_appointments/',
+           '/api/doctors/my_records/',
+           '/api/doctors/my_patients/',
+           f'/api/doctors/{self.doctor.id}/',
+       ]
+       single = {url: self.count_queries(url) for url in urls}
+       self.add_rows(5)
+       for url in urls:
+           self.assertEqual(self.count_queries(url), single[url], url)
+
+
+class ConditionalGetTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       self.user = User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology'
+       )
+       self.appointment = Appointment.objects.create(
+           patient=self.patient,
+           doctor=self.doctor,
+           appointment_datetime=timezone.now() + datetime.timedelta(days=1)
+       )
+       self.client.force_authenticate(self.user)
+
+   def revalidate(self, url, response, **headers):
+       return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+
+   def test_list_answers_304_without_serializing(self):
+       response = self.client.get('/api/appointments/')
+       self.assertEqual(response.status_code, 200)
+       self.assertTrue(response['ETag'].startswith('W/"'))
+       # the aggregate for the validators only
+       with self.assertNumQueries(1):
+           self.assertEqual(self.revalidate('/api/appointments/', response).status_code, 304)
+       # other parameters are another representation
+       self.assertEqual(self.revalidate('/api/appointments/?status=SCHEDULED', response).status_code, 200)
+
+   def test_plain_list_runs_no_aggregate(self):
+       with CaptureQueriesContext(connection) as captured:
+           response = self.client.get('/api/appointments/')
+       self.assertEqual(response.status_code, 200)
+       self.assertIn('ETag', response)
+       self.assertTrue(captured.captured_queries)
+       self.assertFalse([query for query in captured if 'MAX(' in query['sql'].upper()])
+
+   def test_list_validators_follow_changes(self):
+       url = '/api/appointments/'
+       response = self.client.get(url)
+       # nested patient details are part of the payload
+       self.patient.first_name = 'Johnny'
+       self.patient.save()
+       response = self.revalidate(url, response)
+       self.assertEqual(response.status_code, 200)
+       self.assertEqual(response.data['results'][0]['patient_details']['first_name'], 'Johnny')
+
+       Appointment.objects.create(
+           patient=self.patient,
+           doctor=self.doctor,
+           appointment_datetime=self.appointment.appointment_datetime - datetime.timedelta(hours=1)
+       )
+       response = self.revalidate(url, response)
+       self.assertEqual(len(response.data['results']), 2)
+       self.appointment.delete()
+       self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+   def test_detail_and_if_modified_since(self):
+       url = f'/api/patients/{self.patient.id}/'
+       response = self.client.get(url)
+       with self.assertNumQueries(1):
+           self.assertEqual(self.revalidate(url, response).status_code, 304)
+       self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+       self.patient.phone = '555-0100'
+       self.patient.save(update_fields=['phone', 'updated_at'])
+       response = self.revalidate(url, response)
+       self.assertEqual(response.status_code, 200)
+       self.assertEqual(response.data['phone'], '555-0100')
+
+   def test_cached_directory_responses(self):
+       url = f'/api/doctors/{self.doctor.id}/'
+       response = self.client.get(url)
+       with self.assertNumQueries(0):
+           self.assertEqual(self.revalidate(url, response).status_code, 304)
+       self.doctor.bio = 'Cardiologist'
+       self.doctor.save()
+       self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0)
+class InstrumentationTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       metrics.reset()
+       self.client = APIClient()
+       self.user = User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       self.client.force_authenticate(self.user)
+
+   def test_histogram_quantiles(self):
+       histogram = metrics.Histogram((10, 20, 40))
+       for value in [5] * 50 + [15] * 45 + [30] * 5:
+           histogram.observe(value)
+       self.assertEqual(histogram.quantile(0.5), 10)
+       self.assertEqual(histogram.quantile(0.95), 20)
+       self.assertEqual(histogram.summary()['mean'], 10.75)
+       histogram.observe(100)
+       self.assertEqual(histogram.quantile(1.0), 40)
+
+   def test_requests_are_recorded_per_action(self):
+       self.client.get('/api/patients/')
+       with self.assertLogs('core.requests', 'INFO') as logs:
+           self.client.get('/api/patients/')
+       self.client.get('/api/patients/999/')
+
+       line = json.loads(logs.records[0].getMessage())
+       self.assertEqual((line['endpoint'], line['method'], line['status']), ('PatientViewSet.list', 'GET', 200))
+       self.assertGreater(line['queries'], 0)
+       report = metrics.report()
+       self.assertEqual(report['PatientViewSet.list']['requests'], 2)
+       self.assertEqual(report['PatientViewSet.list']['queries']['count'], 2)
+       self.assertEqual(report['PatientViewSet.list']['statuses'], {'2xx': 2})
+       self.assertEqual(report['PatientViewSet.retrieve']['statuses'], {'4xx': 1})
+       self.assertGreater(report['PatientViewSet.list']['serialize_ms']['count'], 0)
+
+   @override_settings(REQUEST_METRICS_SAMPLE_RATE=0.0)
+   def test_unsampled_requests_only_record_latency(self):
+       self.client.get('/api/patients/')
+       self.client.get('/api/no-such-endpoint/')
+       report = metrics.report()
+       self.assertEqual(report['PatientViewSet.list']['latency_ms']['count'], 1)
+       self.assertEqual(report['PatientViewSet.list']['queries'], {'count': 0})
+       self.assertIn('unresolved', report)
+
+   def test_report_requires_admin(self):
+       self.assertEqual(self.client.get('/api/metrics/requests/').status_code, 403)
+       self.user.is_staff = True
+       self.user.save()
+       self.client.get('/api/patients/')
+       response = self.client.get('/api/metrics/requests/')
+       self.assertEqual(response.status_code, 200)
+       self.assertEqual(response.data['PatientViewSet.list']['requests'], 1)
+
+
+class HealthTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       health.reset()
+       metrics.reset()
+       self.client = APIClient()
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+
+   def test_liveness_needs_no_database(self):
+       with self.assertNumQueries(0):
+           response = self.client.get('/health/')
+       self.assertEqual(response.status_code, 200)
+       self.assertEqual(response.json(), {'status': 'ok'})
+
+   def test_readiness_checks_are_reused(self):
+       response = self.client.get('/health/ready/')
+       self.assertEqual(response.status_code, 200)
+       self.assertEqual(response.json()['checks'], {'database:default': 'ok', 'cache': 'ok'})
+       with self.assertNumQueries(0):
+           self.assertEqual(self.client.get('/health/ready/').status_code, 200)
+
+   def test_readiness_reports_a_failing_check(self):
+       with mock.patch.object(health, 'check_cache', return_value='ConnectionError: refused'):
+           response = self.client.get('/health/ready/')
+       self.assertEqual(response.status_code, 503)
+       self.assertEqual(response.json()['status'], 'unavailable')
+
+   def test_metrics_exposition(self):
+       for _ in range(3):
+           Notification.objects.create(patient=self.patient, notification_type='GENERAL', message='queued')
+       Notification.objects.create(patient=self.patient, notification_type='GENERAL', message='done', status='SENT')
+       outbox.publish('test.metrics', self.patient, {})
+       self.client.get('/health/')
+
+       response = self.client.get('/metrics/')
+       self.assertEqual(response.status_code, 200)
+       self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+       body = response.content.decode()
+       self.assertIn('hospital_http_requests_total{endpoint="health",status="2xx"} 1', body)
+       self.assertIn('hospital_http_request_duration_seconds_bucket{endpoint="health",le="+Inf"} 1', body)
+       self.assertIn('hospital_queue_depth{queue="notifications"} 3', body)
+       self.assertIn('hospital_queue_depth{queue="outbox"} 1', body)
+       self.assertIn('hospital_db_connection_open{alias="default"} 1', body)
+
+       # queue gauges are reused between scrapes
+       with self.assertNumQueries(0):
+           self.client.get('/metrics/')
+
+   @override_settings(METRICS_TOKEN='scrape-secret')
+   def test_metrics_token(self):
+       self.assertEqual(self.client.get('/metrics/').status_code, 403)
+       response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+       self.assertEqual(response.status_code, 200)
+
+
+class SyntheticDataTests(TestCase):
+   options = dict(seed=11, today=datetime.date(2026, 3, 2), years=0.05, future_days=5, batch_size=7)
+
+   def snapshot(self):
+       return (
+           list(Doctor.objects.order_by('id').values_list('id', 'email', 'specialization')),
+           list(Patient.objects.order_by('id').values_list('id', 'email', 'created_at')),
+           list(Appointment.objects.order_by('id').values_list('id', 'patient_id', 'doctor_id', 'appointment_datetime', 'status', 'seat')),
+           list(MedicalRecord.objects.order_by('id').values_list('id', 'appointment_id', 'diagnosis')),
+           list(Notification.objects.order_by('created_at', 'appointment_id', 'notification_type').values_list(
+               'appointment_id', 'notification_type', 'status', 'created_at',
+           )),
+       )
+
+   def test_same_seed_gives_the_same_rows(self):
+       report = synthetic.generate(3, 40, **self.options)
+       first = self.snapshot()
+       self.assertEqual(report['appointments'], len(first[2]))
+       self.assertGreater(report['appointments'], 7)
+
+       for model in (Notification, MedicalRecord, Appointment, Patient, Doctor, Availability, AvailabilityException):
+           model.objects.all().delete()
+       User.objects.filter(role='DOCTOR').delete()
+       synthetic.generate(3, 40, **self.options)
+       self.assertEqual(self.snapshot(), first)
+
+   def test_rows_follow_schedules_and_status_rules(self):
+       synthetic.generate(3, 40, **self.options)
+       schedules = {doctor.id: get_schedule(doctor.id) for doctor in Doctor.objects.all()}
+       for appointment in Appointment.objects.all():
+           local = timezone.localtime(appointment.appointment_datetime)
+           minute = local.hour * 60 + local.minute
+           schedule = schedules[appointment.doctor_id]
+           self.assertEqual(appointment.duration_minutes, schedule.policy.slot_minutes)
+           self.assertTrue(any(
+               start <= minute and minute + schedule.policy.slot_minutes <= end
+               for start, end in schedule.intervals_on(local.date())
+           ))
+           self.assertLess(appointment.seat, schedule.policy.capacity)
+           self.assertLess(appointment.created_at, appointment.appointment_datetime)
+
+       self.assertFalse(MedicalRecord.objects.exclude(appointment__status='COMPLETED').exists())
+       self.assertTrue(Notification.objects.filter(notification_type='APPOINTMENT_CONFIRMATION').exists())
+       self.assertEqual(
+           PatientLookupKey.objects.values('patient').distinct().count(), Patient.objects.count(),
+       )
+       doctor = Doctor.objects.select_related('user').first()
+       self.assertTrue(doctor.user.check_password('synthetic-pass'))
+
+
+class BenchmarkTests(TestCase):
+   def result(self, p95, queries):
+       return {'latency_ms': {'p95': p95}, 'queries': {'mean': queries}}
+
+   def test_summary_percentiles(self):
+       summary = benchmark.summarize([float(value) for value in range(100, 0, -1)], [3] * 100, 2, 2.0)
+       self.assertEqual(summary['latency_ms']['p50'], 50.0)
+       self.assertEqual(summary['latency_ms']['p95'], 95.0)
+       self.assertEqual(summary['latency_ms']['p99'], 99.0)
+       self.assertEqual((summary['throughput_rps'], summary['errors'], summary['queries']), (50.0, 2, {'mean': 3, 'max': 3}))
+
+   def test_compare_flags_latency_and_query_regressions(self):
+       baseline = {'results': {'small': {'scenarios': {
+           'records_list': self.result(10.0, 2), 'my_dashboard': self.result(10.0, 4), 'token_obtain': self.result(100.0, 2),
+       }}}}
+       current = {'results': {'small': {'scenarios': {
+           'records_list': self.result(11.0, 2), 'my_dashboard': self.result(10.0, 5),
+           'token_obtain': self.result(150.0, 2), 'available_slots': self.result(5.0, 2),
+       }}}}
+       regressions = benchmark.compare(current, baseline, threshold=0.2)
+       self.assertEqual(
+           [(regression['scenario'], regression['metric']) for regression in regressions],
+           [('my_dashboard', 'queries'), ('token_obtain', 'p95_ms')],
+       )
+
+
+class PaginationTests(TestCase):
+   def setUp(self):
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       Notification.objects.bulk_create([
+           Notification(patient=self.patient, notification_type='GENERAL', message=f'Message {i}')
+           for i in range(7)
+       ])
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def test_cursor_pages_cover_every_row_once(self):
+       seen = []
+       url = '/api/notifications/?page_size=3'
+       while url:
+           response = self.client.get(url)
+           self.assertEqual(response.status_code, 200)
+           self.assertNotIn('count', response.data)
+           self.assertLessEqual(len(response.data['results']), 3)
+           seen.extend(row['id'] for row in response.data['results'])
+           url = response.data['next']
+       self.assertEqual(sorted(seen), sorted(Notification.objects.values_list('id', flat=True)))
+
+   def test_page_number_pagination_on_directory_lists(self):
+       response = self.client.get('/api/patients/?page_size=1')
+       self.assertEqual(response.data['count'], 1)
+       self.assertEqual(len(response.data['results']), 1)
+
+
+class ExportTests(TestCase):
+   def setUp(self):
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.patients = [
+           Patient.objects.create(
+               first_name=name,
+               last_name='Doe',
+               date_of_birth='1990-01-01',
+               email=f'{name.lower()}@example.com',
+               insurance_provider=provider
+           )
+           for name, provider in [('John', 'NHIF'), ('Alice', 'AAR'), ('Bob', 'NHIF')]
+       ]
+       for patient in self.patients:
+           MedicalRecord.objects.create(patient=patient, diagnosis=f'Diagnosis, "{patient.first_name}"')
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def fetch(self, url):
+       response = self.client.get(url)
+       self.assertEqual(response.status_code, 200)
+       self.assertTrue(response.streaming)
+       return b''.join(response.streaming_content).decode()
+
+   def test_ndjson_export_applies_list_filters(self):
+       body = self.fetch(f'/api/records/export/?patient={self.patients[1].id}')
+       rows = [json.loads(line) for line in body.splitlines()]
+       self.assertEqual(len(rows), 1)
+       self.assertEqual(rows[0]['patient_first_name'], 'Alice')
+       self.assertEqual(rows[0]['diagnosis'], 'Diagnosis, "Alice"')
+
+   def test_csv_export(self):
+       body = self.fetch('/api/patients/export/?output=csv&insurance_provider=NHIF')
+       rows = list(csv.reader(body.splitlines()))
+       self.assertEqual(rows[0][:3], ['id', 'first_name', 'last_name'])
+       self.assertEqual([row[1] for row in rows[1:]], ['John', 'Bob'])
+
+   def test_unknown_output_is_rejected(self):
+       response = self.client.get('/api/appointments/export/?output=xml')
+       self.assertEqual(response.status_code, 400)
+
+
+class OutboxTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology'
+       )
+       Availability.objects.create(
+           doctor=self.doctor,
+           day_of_week='MON',
+           start_time=datetime.time(9, 0),
+           end_time=datetime.time(17, 0)
+       )
+       monday = timezone.localdate() + datetime.timedelta(days=7)
+       monday += datetime.timedelta(days=-monday.weekday() % 7)
+       self.when = timezone.make_aware(datetime.datetime.combine(monday, datetime.time(10, 0)))
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def book(self):
+       response = self.client.post('/api/appointments/', {
+           'patient': self.patient.id,
+           'doctor': self.doctor.id,
+           'appointment_datetime': self.when.isoformat(),
+           'status': 'SCHEDULED'
+       })
+       self.assertEqual(response.status_code, 201)
+       return response.data['id']
+
+   def test_booking_publishes_event_and_consumer_notifies(self):
+       appointment_id = self.book()
+       event = OutboxEvent.objects.get()
+       self.assertEqual(event.topic, 'appointment.created')
+       self.assertEqual(event.aggregate_id, str(appointment_id))
+       # nothing is sent from the request itself
+       self.assertFalse(Notification.objects.exists())
+
+       self.assertEqual(outbox.process_batch(), (1, 0))
+       notification = Notification.objects.get()
+       self.assertEqual(notification.notification_type, 'APPOINTMENT_CONFIRMATION')
+       self.assertEqual(notification.appointment_id, appointment_id)
+       self.assertIsNotNone(OutboxEvent.objects.get().processed_at)
+       self.assertEqual(outbox.process_batch(), (0, 0))
+
+   def test_cancellation_goes_through_outbox(self):
+       appointment_id = self.book()
+       response = self.client.patch(f'/api/appointments/{appointment_id}/update_status/', {'status': 'CANCELLED'})
+       self.assertEqual(response.status_code, 200)
+       call_command('process_outbox', '--once', stdout=io.StringIO())
+       self.assertEqual(
+           sorted(Notification.objects.values_list('notification_type', flat=True)),
+           ['APPOINTMENT_CANCELLATION', 'APPOINTMENT_CONFIRMATION']
+       )
+
+   def test_failing_consumer_rolls_back_and_retries(self):
+       calls = []
+
+       @outbox.consumer('test.failing', name='test.failing')
+       def failing(event):
+           calls.append(event.id)
+           Notification.objects.create(patient=self.patient, notification_type='GENERAL', message='partial')
+           raise RuntimeError('downstream unavailable')
+
+       try:
+           outbox.publish('test.failing', self.patient, {})
+           self.assertEqual(outbox.process_batch(), (0, 1))
+           event = OutboxEvent.objects.get()
+           self.assertIsNone(event.processed_at)
+           self.assertIn('downstream unavailable', event.last_error)
+           self.assertFalse(Notification.objects.exists())
+           # retried once the backoff has passed
+           self.assertEqual(outbox.process_batch(), (0, 0))
+           outbox.process_batch(now=event.next_attempt_at)
+           self.assertEqual(len(calls), 2)
+       finally:
+           outbox._consumers.pop('test.failing')
+
+   def test_replay_runs_one_consumer_over_processed_events(self):
+       self.book()
+       outbox.process_batch()
+       self.assertEqual(outbox.replay('notifications.confirmation'), 1)
+       self.assertEqual(Notification.objects.filter(notification_type='APPOINTMENT_CONFIRMATION').count(), 2)
+
+   def test_processed_events_are_pruned_after_retention(self):
+       self.book()
+       outbox.process_batch()
+       pending = outbox.publish('test.pending', self.patient, {})
+       with override_settings(OUTBOX_RETENTION_DAYS=30):
+           self.assertEqual(outbox.prune(now=timezone.now() + datetime.timedelta(days=29)), 0)
+           self.assertEqual(outbox.prune(now=timezone.now() + datetime.timedelta(days=31)), 1)
+       # unprocessed events are kept whatever their age
+       self.assertEqual(list(OutboxEvent.objects.values_list('id', flat=True)), [pending.id])
+
+       out = io.StringIO()
+       call_command('process_outbox', '--prune', stdout=out)
+       self.assertIn('Pruned 0 processed events', out.getvalue())
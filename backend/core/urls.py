@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('api/cache/stats/', views.cache_stats, name='cache-stats'),
+    path('health/', views.liveness, name='health'),
+    path('health/ready/', views.readiness, name='health-ready'),
+    path('metrics/', views.prometheus_metrics, name='prometheus-metrics'),
+    path('api/metrics/requests/', views.request_metrics, name='request-metrics'),
+]
@@ -1,3 +1,53 @@
-from django.shortcuts import render
+import hmac
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from . import cache as cache_layer
+from . import health, metrics, prometheus
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Hit/miss counters of the response cache in this process."""
+    return Response(cache_layer.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def request_metrics(request):
+    """Per-endpoint request counts, latency, query and serialization figures in this process."""
+    return Response(metrics.report())
+
+
+# plain Django views: probes and scrapes skip DRF authentication and content negotiation
+
+@never_cache
+@require_GET
+def liveness(request):
+    """The process is up and serving; touches neither the database nor the cache."""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_GET
+def readiness(request):
+    """Database and cache reachable; 503 otherwise. Results are reused for a few seconds."""
+    result = health.readiness()
+    return JsonResponse(result, status=200 if result['status'] == 'ok' else 503)
+
+
+@never_cache
+@require_GET
+def prometheus_metrics(request):
+    """Prometheus scrape endpoint; requires ``Authorization: Bearer <METRICS_TOKEN>`` when the token is set."""
+    token = settings.METRICS_TOKEN
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=403)
+    return HttpResponse(prometheus.render(), content_type=prometheus.CONTENT_TYPE)
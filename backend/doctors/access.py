@@ -0,0 +1,46 @@
+"""
+Resolve the Doctor profile linked to a user account.
+
+The lookup is memoised on the request and cached across requests through
+``core.cache`` under a per-user resource. The Doctor signals invalidate it
+whenever a profile is linked, unlinked, edited or deleted, so doctor
+endpoints normally resolve the caller's profile without a query.
+"""
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+
+from core import cache as cache_layer
+from .models import Doctor
+
+NO_DOCTOR_MESSAGE = "No doctor profile linked to your account."
+
+# cached marker for users without a doctor profile
+NO_DOCTOR = 0
+
+
+def user_doctor_resource(user_id):
+    return f'user-doctor:{user_id}'
+
+
+def doctor_for_user(user_id):
+    """Return the Doctor linked to ``user_id`` or None."""
+    if user_id is None:
+        return None
+    doctor = cache_layer.get_or_build(
+        'doctors.for_user', [user_doctor_resource(user_id)], [],
+        lambda: Doctor.objects.filter(user_id=user_id).first() or NO_DOCTOR,
+        settings.DOCTOR_LOOKUP_CACHE_TIMEOUT,
+    )
+    return doctor or None
+
+
+def request_doctor(request, required=True):
+    """
+    The authenticated user's Doctor, looked up once per request. Raises
+    NotFound when ``required`` and the account has no doctor profile.
+    """
+    if not hasattr(request, '_linked_doctor'):
+        request._linked_doctor = doctor_for_user(request.user.id)
+    if request._linked_doctor is None and required:
+        raise NotFound(NO_DOCTOR_MESSAGE)
+    return request._linked_doctor
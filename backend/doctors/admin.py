@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Doctor, Availability
+from .models import Doctor, Availability, AvailabilityException, SlotPolicy
 
 @admin.register(Doctor)
 class DoctorAdmin(admin.ModelAdmin):
@@ -12,6 +12,17 @@ class DoctorAdmin(admin.ModelAdmin):
 
 @admin.register(Availability)
 class AvailabilityAdmin(admin.ModelAdmin):
-    list_display = ['doctor', 'day_of_week', 'start_time', 'end_time']
-    list_filter = ['day_of_week', 'doctor']
-    search_fields = ['doctor__first_name', 'doctor__last_name']
\ No newline at end of file
+    list_display = ['doctor', 'day_of_week', 'specific_date', 'start_time', 'end_time', 'kind']
+    list_filter = ['day_of_week', 'kind', 'doctor']
+    search_fields = ['doctor__first_name', 'doctor__last_name']
+
+@admin.register(AvailabilityException)
+class AvailabilityExceptionAdmin(admin.ModelAdmin):
+    list_display = ['doctor', 'start_date', 'end_date', 'start_time', 'end_time', 'reason']
+    list_filter = ['doctor']
+    search_fields = ['doctor__first_name', 'doctor__last_name', 'reason']
+
+@admin.register(SlotPolicy)
+class SlotPolicyAdmin(admin.ModelAdmin):
+    list_display = ['specialization', 'slot_minutes', 'buffer_minutes', 'capacity']
+    search_fields = ['specialization']
\ No newline at end of file
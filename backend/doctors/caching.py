@@ -0,0 +1,22 @@
+"""Cache resources of the doctor directory; see ``core.cache``."""
+from core import cache as cache_layer
+
+# the doctor list and anything else spanning several doctors
+DIRECTORY = 'doctors'
+
+
+def doctor_resource(doctor_id):
+    """One doctor's profile, availabilities and slot index."""
+    return f'doctor:{doctor_id}'
+
+
+def doctor_day_resource(doctor_id, date):
+    """One doctor's indexed slots on ``date``; bumped when a booking on that day changes."""
+    return f'doctor:{doctor_id}:day:{date.isoformat()}'
+
+
+def invalidate_doctor(doctor_id, directory=False):
+    resources = [doctor_resource(doctor_id)]
+    if directory:
+        resources.append(DIRECTORY)
+    cache_layer.invalidate(*resources)
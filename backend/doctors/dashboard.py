@@ -0,0 +1,141 @@
+"""
+Doctor dashboard: today's appointments, recent records and the patient roster
+in a fixed number of queries.
+
+A doctor's patients are everyone with an appointment with them, expressed as
+an ``IN (SELECT patient_id ...)`` subquery so the database resolves the
+roster as a semi-join instead of the application shipping id lists back and
+forth. Every section holds at most ``limit`` rows and says in ``has_more``
+whether it was cut short.
+
+With ``since`` only rows changed after that moment are returned, oldest
+change first. When every section fits, ``next_since`` is the moment taken
+before anything was read, so polling with it never skips a concurrent
+write. When a section is cut short, ``next_since`` is the change time of the
+last row it returned (the earliest such time across sections), so the next
+poll carries on from there; rows sharing that time are never split across
+polls, and rows of the other sections may be sent again.
+"""
+from django.db.models import DateTimeField, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from appointments.models import Appointment
+from appointments.serializers import AppointmentSerializer
+from patients.models import Patient
+from patients.serializers import PatientListSerializer
+from records.models import MedicalRecord
+from records.serializers import MedicalRecordSerializer
+from core.prefetch import optimize_queryset
+from .models import Doctor
+
+
+class SubqueryCount(Subquery):
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = IntegerField()
+
+
+def doctor_patient_ids(doctor):
+    return Appointment.objects.filter(doctor=doctor).values('patient')
+
+
+def doctor_patients(doctor):
+    return Patient.objects.filter(id__in=Subquery(doctor_patient_ids(doctor)))
+
+
+def doctor_records(doctor):
+    return MedicalRecord.objects.filter(patient_id__in=Subquery(doctor_patient_ids(doctor)))
+
+
+def _counts(doctor, today):
+    counts = {
+        'patients': SubqueryCount(doctor_patients(doctor).values('id')),
+        'records': SubqueryCount(doctor_records(doctor).values('id')),
+        'appointments_today': SubqueryCount(Appointment.objects.filter(doctor=doctor).on_date(today).values('id')),
+        'upcoming_scheduled': SubqueryCount(
+            Appointment.objects.filter(
+                doctor=doctor, status='SCHEDULED', appointment_datetime__gt=timezone.now()
+            ).values('id')
+        ),
+    }
+    return Doctor.objects.filter(pk=doctor.pk).annotate(**counts).values(*counts).get()
+
+
+def _changed_patients(doctor, since):
+    """The doctor's patients edited, or booked with this doctor, after ``since``, annotated with ``changed_at``."""
+    last_booked = Appointment.objects.filter(doctor=doctor, patient=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    changed_at = Greatest('updated_at', Coalesce(Subquery(last_booked, output_field=DateTimeField()), 'updated_at'))
+    return doctor_patients(doctor).annotate(changed_at=changed_at).filter(changed_at__gt=since)
+
+
+def _page(queryset, limit):
+    """Return ``(rows, has_more)`` with at most ``limit`` rows of an ordered ``queryset``."""
+    rows = list(queryset[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def _delta_page(queryset, field, limit):
+    """
+    Like ``_page`` for a queryset ordered by ``field`` ascending. Returns
+    ``(rows, has_more, resume)``: when cut short, rows changed at ``resume``
+    are all included and those after it are left for the next poll.
+    """
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, False, None
+    cut = getattr(rows[limit], field)
+    kept = [row for row in rows[:limit] if getattr(row, field) < cut]
+    if not kept:
+        # more than ``limit`` rows changed at the same moment; send them together
+        kept = list(queryset.filter(**{f'{field}__lte': cut}))
+        if not queryset.filter(**{f'{field}__gt': cut}).exists():
+            return kept, False, None
+    return kept, True, getattr(kept[-1], field)
+
+
+def build_dashboard(doctor, since=None, limit=20, context=None):
+    next_since = timezone.now()
+    today = timezone.localdate(next_since)
+
+    appointments = optimize_queryset(
+        Appointment.objects.filter(doctor=doctor).on_date(today), AppointmentSerializer,
+    )
+    records = optimize_queryset(doctor_records(doctor), MedicalRecordSerializer)
+    patients = doctor_patients(doctor)
+
+    if since is None:
+        sections = {
+            'appointments_today': _page(appointments.order_by('appointment_datetime', 'id'), limit),
+            'recent_records': _page(records.order_by('-updated_at', '-id'), limit),
+            'patients': _page(patients.order_by('last_name', 'first_name', 'id'), limit),
+        }
+    else:
+        pages = {
+            'appointments_today': _delta_page(
+                appointments.filter(updated_at__gt=since).order_by('updated_at', 'id'), 'updated_at', limit,
+            ),
+            'recent_records': _delta_page(
+                records.filter(updated_at__gt=since).order_by('updated_at', 'id'), 'updated_at', limit,
+            ),
+            'patients': _delta_page(_changed_patients(doctor, since).order_by('changed_at', 'id'), 'changed_at', limit),
+        }
+        resumes = [resume for _, _, resume in pages.values() if resume is not None]
+        if resumes:
+            next_since = min(resumes)
+        sections = {name: (rows, has_more) for name, (rows, has_more, _) in pages.items()}
+
+    serializers = {
+        'appointments_today': AppointmentSerializer,
+        'recent_records': MedicalRecordSerializer,
+        'patients': PatientListSerializer,
+    }
+    data = {
+        'date': today.isoformat(),
+        'since': since.isoformat() if since else None,
+        'next_since': next_since.isoformat(),
+        'counts': _counts(doctor, today),
+    }
+    for name, (rows, _) in sections.items():
+        data[name] = serializers[name](rows, many=True, context=context).data
+    data['has_more'] = {name: has_more for name, (_, has_more) in sections.items()}
+    return data
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.12 on 2026-10-18 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0004_alter_availability_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(fields=['doctor', 'specific_date'], name='avail_doctor_date_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.12 on 2026-10-18 07:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0005_availability_avail_doctor_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availability',
+            name='kind',
+            field=models.CharField(choices=[('WORK', 'Working hours'), ('BREAK', 'Break')], default='WORK', max_length=5),
+        ),
+        migrations.AlterUniqueTogether(
+            name='availability',
+            unique_together=set(),
+        ),
+        migrations.CreateModel(
+            name='AvailabilityException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('start_time', models.TimeField(blank=True, null=True)),
+                ('end_time', models.TimeField(blank=True, null=True)),
+                ('reason', models.CharField(blank=True, max_length=255, null=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_exceptions', to='doctors.doctor')),
+            ],
+            options={
+                'ordering': ['start_date', 'start_time'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.12 on 2026-10-18 07:28
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0006_availability_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialization', models.CharField(max_length=100, unique=True)),
+                ('slot_minutes', models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(240)])),
+                ('buffer_minutes', models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MaxValueValidator(120)])),
+                ('capacity', models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(50)])),
+            ],
+            options={
+                'verbose_name_plural': 'Slot policies',
+            },
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='buffer_minutes',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MaxValueValidator(120)]),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='capacity',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(50)]),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='slot_minutes',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(240)]),
+        ),
+    ]
@@ -1,8 +1,16 @@
 from django.db import models
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# bounds of the slot policy fields; conflict checks look back MAX_SLOT_MINUTES + MAX_BUFFER_MINUTES
+MIN_SLOT_MINUTES = 5
+MAX_SLOT_MINUTES = 240
+MAX_BUFFER_MINUTES = 120
+MAX_CAPACITY = 50
+
+
 class Doctor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
     first_name = models.CharField(max_length=100)
@@ -11,6 +19,16 @@ class Doctor(models.Model):
     phone = models.CharField(max_length=20, blank=True, null=True)
     specialization = models.CharField(max_length=100)
     bio = models.TextField(blank=True, null=True)
+    # slot policy; unset fields fall back to the specialization's SlotPolicy, then to the settings
+    slot_minutes = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(MIN_SLOT_MINUTES), MaxValueValidator(MAX_SLOT_MINUTES)]
+    )
+    buffer_minutes = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MaxValueValidator(MAX_BUFFER_MINUTES)]
+    )
+    capacity = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1), MaxValueValidator(MAX_CAPACITY)]
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -20,6 +38,25 @@ class Doctor(models.Model):
     class Meta:
         ordering = ['last_name', 'first_name']
 
+class SlotPolicy(models.Model):
+    """Slot length, buffer and capacity shared by the doctors of a specialization."""
+    specialization = models.CharField(max_length=100, unique=True)
+    slot_minutes = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(MIN_SLOT_MINUTES), MaxValueValidator(MAX_SLOT_MINUTES)]
+    )
+    buffer_minutes = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MaxValueValidator(MAX_BUFFER_MINUTES)]
+    )
+    capacity = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1), MaxValueValidator(MAX_CAPACITY)]
+    )
+
+    class Meta:
+        verbose_name_plural = 'Slot policies'
+
+    def __str__(self):
+        return f"{self.specialization} slot policy"
+
 class Availability(models.Model):
     DAYS_OF_WEEK = [
         ('MON', 'Monday'),
@@ -30,18 +67,42 @@ class Availability(models.Model):
         ('SAT', 'Saturday'),
         ('SUN', 'Sunday'),
     ]
+    WORK = 'WORK'
+    BREAK = 'BREAK'
+    KINDS = [
+        (WORK, 'Working hours'),
+        (BREAK, 'Break'),
+    ]
     
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='availabilities')
     day_of_week = models.CharField(max_length=3, choices=DAYS_OF_WEEK)
     specific_date = models.DateField(null=True, blank=True)
     start_time = models.TimeField()
     end_time = models.TimeField()
+    kind = models.CharField(max_length=5, choices=KINDS, default=WORK)
 
     class Meta:
-        unique_together = [['doctor', 'day_of_week', 'specific_date']]
+        indexes = [
+            models.Index(fields=['doctor', 'specific_date'], name='avail_doctor_date_idx'),
+        ]
         verbose_name_plural = 'Availabilities'
         
     def __str__(self):
         if self.specific_date:
             return f"{self.doctor} - {self.specific_date.strftime('%Y-%m-%d')} ({self.start_time} - {self.end_time})"
-        return f"{self.doctor} - {self.get_day_of_week_display()} ({self.start_time} - {self.end_time})"
\ No newline at end of file
+        return f"{self.doctor} - {self.get_day_of_week_display()} ({self.start_time} - {self.end_time})"
+
+class AvailabilityException(models.Model):
+    """Time off over a date range; without times it covers the whole of every day."""
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='availability_exceptions')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    reason = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        ordering = ['start_date', 'start_time']
+
+    def __str__(self):
+        return f"{self.doctor} - off {self.start_date.strftime('%Y-%m-%d')} to {self.end_date.strftime('%Y-%m-%d')}"
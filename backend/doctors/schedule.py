@@ -0,0 +1,203 @@
+"""
+Availability rules compiled into per-doctor interval sets.
+
+A doctor's ``Availability`` rows are working windows (``WORK``) and breaks
+(``BREAK``), either weekly or for one ``specific_date``; several rows may
+apply to the same day, so split shifts are several windows. Dated working
+windows replace the weekly rules of that day, dated breaks are cut out of
+whichever windows apply. ``AvailabilityException`` rows then remove time
+(or whole days) over a date range.
+
+All of it is compiled once into a ``Schedule``: flat tuples of sorted,
+disjoint ``(start minute, end minute)`` pairs per weekday and per dated
+override, plus the exceptions. Expanding a date is a dictionary lookup and
+a few interval subtractions, with no queries. The schedule also carries the
+doctor's slot ``Policy`` (slot length, buffer after each appointment and
+patients per slot), resolved from the doctor, then the specialization's
+``SlotPolicy``, then the settings. Schedules are cached under the doctor's
+cache resource, so availability and policy changes drop them.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core import cache as cache_layer
+from .caching import doctor_resource
+
+WORK = 'WORK'
+BREAK = 'BREAK'
+WEEKDAYS = ('MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN')
+
+Policy = namedtuple('Policy', ['slot_minutes', 'buffer_minutes', 'capacity'])
+
+
+def default_policy():
+    return Policy(settings.SLOT_MINUTES, settings.SLOT_BUFFER_MINUTES, settings.SLOT_CAPACITY)
+
+
+def normalize(intervals):
+    """Sort and merge ``(start, end)`` pairs into disjoint intervals, dropping empty ones."""
+    merged = []
+    for start, end in sorted(intervals):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+def subtract(intervals, removed):
+    """Remove the ``removed`` intervals from the disjoint, sorted ``intervals``."""
+    removed = normalize(removed)
+    if not removed:
+        return tuple(intervals)
+    result = []
+    for start, end in intervals:
+        for cut_start, cut_end in removed:
+            if cut_end <= start or cut_start >= end:
+                continue
+            if cut_start > start:
+                result.append((start, cut_start))
+            start = cut_end
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return tuple(result)
+
+
+def minute_of(value):
+    return value.hour * 60 + value.minute
+
+
+class Schedule:
+    __slots__ = ('weekly', 'dates', 'exceptions', 'policy')
+
+    def __init__(self, weekly, dates, exceptions, policy):
+        # one interval tuple per weekday, Monday first
+        self.weekly = weekly
+        # {date: intervals} for days with dated rules
+        self.dates = dates
+        # (start_date, end_date, removed intervals or None for whole days)
+        self.exceptions = exceptions
+        self.policy = policy
+
+    def intervals_on(self, date):
+        """The working intervals on ``date``; an empty tuple when the doctor is off."""
+        intervals = self.dates.get(date)
+        if intervals is None:
+            intervals = self.weekly[date.weekday()]
+        for start_date, end_date, removed in self.exceptions:
+            if start_date > date:
+                break
+            if date <= end_date:
+                intervals = () if removed is None else subtract(intervals, removed)
+        return intervals
+
+    def expand(self, dates):
+        return {date: self.intervals_on(date) for date in dates}
+
+
+def compile_schedule(availabilities, exceptions=(), policy=None):
+    weekly_work = [[] for _ in WEEKDAYS]
+    weekly_breaks = [[] for _ in WEEKDAYS]
+    dated_work = {}
+    dated_breaks = {}
+    for availability in availabilities:
+        window = (minute_of(availability.start_time), minute_of(availability.end_time))
+        if availability.specific_date is not None:
+            rules = dated_breaks if availability.kind == BREAK else dated_work
+            rules.setdefault(availability.specific_date, []).append(window)
+        else:
+            rules = weekly_breaks if availability.kind == BREAK else weekly_work
+            rules[WEEKDAYS.index(availability.day_of_week)].append(window)
+
+    weekly = tuple(subtract(normalize(work), breaks) for work, breaks in zip(weekly_work, weekly_breaks))
+    dates = {}
+    for date in set(dated_work) | set(dated_breaks):
+        # dated working hours replace the weekly rules, weekly breaks included
+        base = normalize(dated_work[date]) if date in dated_work else weekly[date.weekday()]
+        dates[date] = subtract(base, dated_breaks.get(date, ()))
+
+    compiled = []
+    for exception in exceptions:
+        if exception.start_time is None or exception.end_time is None:
+            removed = None
+        else:
+            removed = ((minute_of(exception.start_time), minute_of(exception.end_time)),)
+        compiled.append((exception.start_date, exception.end_date, removed))
+    compiled.sort(key=lambda item: (item[0], item[1]))
+    return Schedule(weekly, dates, tuple(compiled), policy or default_policy())
+
+
+def load_policies(doctor_ids):
+    """Resolve the slot policy of ``doctor_ids`` in one query."""
+    from .models import Doctor, SlotPolicy
+
+    defaults = default_policy()
+    resolved = {
+        field: Coalesce(
+            field,
+            Subquery(SlotPolicy.objects.filter(specialization=OuterRef('specialization')).values(field)[:1]),
+            Value(getattr(defaults, field)),
+        )
+        for field in Policy._fields
+    }
+    rows = Doctor.objects.filter(id__in=doctor_ids).values_list('id').annotate(
+        **{f'policy_{field}': expression for field, expression in resolved.items()}
+    )
+    return {row[0]: Policy(*row[1:]) for row in rows}
+
+
+def load_schedules(doctor_ids):
+    """Compile the schedules of ``doctor_ids`` with three queries."""
+    from .models import Availability, AvailabilityException
+
+    policies = load_policies(doctor_ids)
+    availabilities = {doctor_id: [] for doctor_id in doctor_ids}
+    exceptions = {doctor_id: [] for doctor_id in doctor_ids}
+    for availability in Availability.objects.filter(doctor_id__in=doctor_ids):
+        availabilities[availability.doctor_id].append(availability)
+    for exception in AvailabilityException.objects.filter(doctor_id__in=doctor_ids):
+        exceptions[exception.doctor_id].append(exception)
+    return {
+        doctor_id: compile_schedule(availabilities[doctor_id], exceptions[doctor_id], policies.get(doctor_id))
+        for doctor_id in doctor_ids
+    }
+
+
+def _timeout():
+    return getattr(settings, 'SLOT_INDEX_TIMEOUT', 300)
+
+
+def _schedule_key(doctor_id, version):
+    return f'schedule:{doctor_id}:{version}'
+
+
+def get_schedules(doctor_ids):
+    """Return ``{doctor_id: Schedule}``, compiling the ones not cached in one batch."""
+    doctor_ids = list(doctor_ids)
+    versions = cache_layer.versions([doctor_resource(doctor_id) for doctor_id in doctor_ids])
+    keys = {_schedule_key(doctor_id, versions[doctor_resource(doctor_id)]): doctor_id for doctor_id in doctor_ids}
+
+    cached = cache.get_many(list(keys))
+    schedules = {doctor_id: cached[key] for key, doctor_id in keys.items() if key in cached}
+    missing = [doctor_id for key, doctor_id in keys.items() if key not in cached]
+    if missing:
+        built = load_schedules(missing)
+        cache.set_many(
+            {key: built[doctor_id] for key, doctor_id in keys.items() if key not in cached},
+            _timeout(),
+        )
+        schedules.update(built)
+    return schedules
+
+
+def get_schedule(doctor_id):
+    return get_schedules([doctor_id])[doctor_id]
@@ -1,12 +1,12 @@
 from rest_framework import serializers
-from .models import Doctor, Availability
+from .models import Doctor, Availability, AvailabilityException
 
 class AvailabilitySerializer(serializers.ModelSerializer):
     day_of_week_display = serializers.CharField(source='get_day_of_week_display', read_only=True)
     
     class Meta:
         model = Availability
-        fields = ['id', 'day_of_week', 'day_of_week_display', 'specific_date', 'start_time', 'end_time']
+        fields = ['id', 'day_of_week', 'day_of_week_display', 'specific_date', 'start_time', 'end_time', 'kind']
         
     def validate(self, data):
         """
@@ -16,6 +16,24 @@ class AvailabilitySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("End time must be after start time")
         return data
 
+class AvailabilityExceptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AvailabilityException
+        fields = ['id', 'start_date', 'end_date', 'start_time', 'end_time', 'reason']
+        
+    def validate(self, data):
+        """
+        Check the date range and that times are given together, start before end.
+        """
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("End date must not be before start date")
+        start_time, end_time = data.get('start_time'), data.get('end_time')
+        if (start_time is None) != (end_time is None):
+            raise serializers.ValidationError("Give both start and end time, or neither for whole days")
+        if start_time is not None and start_time >= end_time:
+            raise serializers.ValidationError("End time must be after start time")
+        return data
+
 class DoctorSerializer(serializers.ModelSerializer):
     availabilities = AvailabilitySerializer(many=True, read_only=True)
     
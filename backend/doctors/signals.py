@@ -0,0 +1,34 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from core import cache as cache_layer
+from .models import Doctor, Availability, AvailabilityException, SlotPolicy
+from .caching import invalidate_doctor
+from .access import user_doctor_resource
+
+
+@receiver(post_init, sender=Doctor)
+def remember_user(sender, instance, **kwargs):
+    instance._linked_user_id = instance.user_id if instance.pk else None
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def doctor_changed(sender, instance, **kwargs):
+    invalidate_doctor(instance.pk, directory=True)
+    # both the previously and the newly linked account see a different profile
+    user_ids = {getattr(instance, '_linked_user_id', None), instance.user_id} - {None}
+    if user_ids:
+        cache_layer.invalidate(*[user_doctor_resource(user_id) for user_id in user_ids])
+    instance._linked_user_id = instance.user_id
+
+
+@receiver([post_save, post_delete], sender=Availability)
+@receiver([post_save, post_delete], sender=AvailabilityException)
+def availability_changed(sender, instance, **kwargs):
+    invalidate_doctor(instance.doctor_id)
+
+
+@receiver([post_save, post_delete], sender=SlotPolicy)
+def slot_policy_changed(sender, instance, **kwargs):
+    for doctor_id in Doctor.objects.filter(specialization=instance.specialization).values_list('id', flat=True):
+        invalidate_doctor(doctor_id)
@@ -0,0 +1,266 @@
+"""
+Precomputed slot index for doctor schedules.
+
+Each (doctor, date) pair is resolved once into a compact day index: the
+doctor's working windows on that date, taken from the compiled schedule in
+``doctors.schedule``, and a bytearray holding, for every slot in them, the
+number of scheduled appointments overlapping it. Slot length, the buffer
+kept after each appointment and the number of patients a slot takes come
+from the doctor's slot policy. Counters are built with one sweep over the
+sorted booked intervals (O(n log n) for n appointments) rather than per-slot
+membership checks. Reads are served from the cache, so listing free slots
+does not touch the database once a day is indexed. Keys carry the version of
+the doctor's cache resource and of the doctor-day resource: anything that
+invalidates the doctor drops all of its indexed days, and booking or
+releasing an appointment bumps only the days it overlaps, which are rebuilt
+from the database on their next read. Nothing is edited in place, so
+concurrent bookings cannot lose an update.
+
+The index is only correct when every process sees the same cache. With a
+process-local backend (``LocMemCache``) days are built from the database on
+every read unless ``SLOT_INDEX_LOCAL_CACHE`` says the deployment runs a
+single process.
+"""
+import bisect
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from core import cache as cache_layer
+from .caching import doctor_day_resource, doctor_resource
+from .models import MAX_BUFFER_MINUTES, MAX_SLOT_MINUTES
+from .schedule import Policy, get_schedules
+
+MINUTES_PER_DAY = 24 * 60
+# an appointment starting this long before a slot may still overlap it
+LOOKBACK_MINUTES = MAX_SLOT_MINUTES + MAX_BUFFER_MINUTES
+
+# cached marker for days on which the doctor does not work
+UNAVAILABLE = 'unavailable'
+
+
+class DaySlots:
+    __slots__ = ('windows', 'policy', 'starts', 'booked')
+
+    def __init__(self, windows, policy, booked=None):
+        self.windows = tuple(windows)
+        self.policy = policy
+        # slots never straddle the end of a window or a break
+        self.starts = [
+            minute
+            for start, end in self.windows
+            for minute in range(start, end - policy.slot_minutes + 1, self.span)
+        ]
+        self.booked = bytearray(len(self.starts)) if booked is None else booked
+
+    @property
+    def span(self):
+        """Minutes a slot keeps the doctor busy, buffer included."""
+        return self.policy.slot_minutes + self.policy.buffer_minutes
+
+    def contains(self, minute):
+        """Whether an appointment starting at ``minute`` fits inside one of the windows."""
+        return any(start <= minute and minute + self.policy.slot_minutes <= end for start, end in self.windows)
+
+    def overlaps(self, minute, duration, other):
+        """Whether a slot at ``minute`` overlaps a ``duration`` minute appointment at ``other``, buffers included."""
+        return other < minute + self.span and minute < other + duration + self.policy.buffer_minutes
+
+    def count(self, starts, ends, offset=0):
+        """
+        Set every counter from booked intervals given as separately sorted start
+        and end minutes (buffer included), ``offset`` minutes after this day's midnight.
+        """
+        span = self.span
+        for i, minute in enumerate(self.starts):
+            minute += offset
+            # intervals starting before the slot ends minus those over before it starts
+            overlapping = bisect.bisect_left(starts, minute + span) - bisect.bisect_right(ends, minute)
+            self.booked[i] = min(255, overlapping)
+
+    def free_minutes(self, not_before=None):
+        capacity = self.policy.capacity
+        return [
+            minute
+            for minute, count in zip(self.starts, self.booked)
+            if count < capacity and (not_before is None or minute >= not_before)
+        ]
+
+    def free_seat(self, minute, booked, preferred=None):
+        """
+        Pick a seat for an appointment at ``minute`` given the ``(minute, duration,
+        seat)`` of the doctor's other scheduled appointments; None when the slot is full.
+        """
+        taken = {seat for other, duration, seat in booked if self.overlaps(minute, duration, other)}
+        if preferred is not None and preferred < self.policy.capacity and preferred not in taken:
+            return preferred
+        return next((seat for seat in range(self.policy.capacity) if seat not in taken), None)
+
+
+def _timeout():
+    return getattr(settings, 'SLOT_INDEX_TIMEOUT', 300)
+
+
+def _day_key(doctor_id, date, version, day_version):
+    return f'dayslots:{doctor_id}:{version}:{day_version}:{date.isoformat()}'
+
+
+def _cached():
+    """Whether indexed days may be kept in the cache, i.e. it is shared by every process."""
+    return settings.SLOT_INDEX_LOCAL_CACHE or not isinstance(caches['default'], LocMemCache)
+
+
+def day_bounds(date):
+    """Return the aware start and end datetimes of a local calendar day."""
+    start = timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+def local_minute(value, date):
+    """Minutes between the local midnight of ``date`` and the aware datetime ``value``."""
+    local = timezone.localtime(value)
+    return (local.date() - date).days * MINUTES_PER_DAY + local.hour * 60 + local.minute
+
+
+def _touched_dates(value, duration):
+    """Local dates whose slots a ``duration`` minute appointment starting at ``value`` can overlap."""
+    date = timezone.localtime(value).date()
+    minute = local_minute(value, date)
+    dates = [date]
+    if minute < LOOKBACK_MINUTES:
+        dates.append(date - datetime.timedelta(days=1))
+    if minute + duration + MAX_BUFFER_MINUTES > MINUTES_PER_DAY:
+        dates.append(date + datetime.timedelta(days=1))
+    return dates
+
+
+def build_days(doctor_ids, dates):
+    """
+    Build the DaySlots of every doctor on every date from the compiled
+    schedules and one query for the scheduled appointments in the range.
+    Days on which a doctor does not work map to None.
+    """
+    from appointments.models import Appointment
+
+    doctor_ids = list(doctor_ids)
+    dates = sorted(set(dates))
+    if not doctor_ids or not dates:
+        return {}
+
+    schedules = get_schedules(doctor_ids)
+    days = {}
+    for doctor_id in doctor_ids:
+        schedule = schedules[doctor_id]
+        for date, windows in schedule.expand(dates).items():
+            days[(doctor_id, date)] = DaySlots(windows, schedule.policy) if windows else None
+
+    padding = datetime.timedelta(minutes=LOOKBACK_MINUTES)
+    booked = {doctor_id: [] for doctor_id in doctor_ids}
+    for doctor_id, value, duration in Appointment.objects.filter(
+        doctor_id__in=doctor_ids,
+        status='SCHEDULED',
+        appointment_datetime__gt=day_bounds(dates[0])[0] - padding,
+        appointment_datetime__lt=day_bounds(dates[-1])[1] + padding,
+    ).values_list('doctor_id', 'appointment_datetime', 'duration_minutes'):
+        booked[doctor_id].append((local_minute(value, dates[0]), duration))
+
+    for doctor_id in doctor_ids:
+        buffer = schedules[doctor_id].policy.buffer_minutes
+        starts = sorted(minute for minute, _ in booked[doctor_id])
+        ends = sorted(minute + duration + buffer for minute, duration in booked[doctor_id])
+        for date in dates:
+            day = days[(doctor_id, date)]
+            if day is not None:
+                day.count(starts, ends, (date - dates[0]).days * MINUTES_PER_DAY)
+    return days
+
+
+def _dump(day):
+    return UNAVAILABLE if day is None else (day.windows, tuple(day.policy), bytes(day.booked))
+
+
+def _load(cached):
+    return None if cached == UNAVAILABLE else DaySlots(cached[0], Policy(*cached[1]), bytearray(cached[2]))
+
+
+def get_days(doctor_ids, dates):
+    """
+    Return ``{(doctor_id, date): DaySlots or None}`` for every combination,
+    reading indexed days from the cache and building the rest in one batch.
+    """
+    doctor_ids = list(doctor_ids)
+    dates = list(dates)
+    if not _cached():
+        return build_days(doctor_ids, dates)
+
+    resources = [doctor_resource(doctor_id) for doctor_id in doctor_ids]
+    resources += [doctor_day_resource(doctor_id, date) for doctor_id in doctor_ids for date in dates]
+    versions = cache_layer.versions(resources)
+
+    keys = {}
+    for doctor_id in doctor_ids:
+        version = versions[doctor_resource(doctor_id)]
+        for date in dates:
+            day_version = versions[doctor_day_resource(doctor_id, date)]
+            keys[_day_key(doctor_id, date, version, day_version)] = (doctor_id, date)
+
+    cached = cache.get_many(list(keys))
+    days = {pair: _load(cached[key]) for key, pair in keys.items() if key in cached}
+
+    missing = [pair for key, pair in keys.items() if key not in cached]
+    if missing:
+        built = build_days({doctor_id for doctor_id, _ in missing}, [date for _, date in missing])
+        cache.set_many(
+            {key: _dump(built[pair]) for key, pair in keys.items() if key not in cached},
+            _timeout(),
+        )
+        for pair in missing:
+            days[pair] = built[pair]
+    return days
+
+
+def get_day(doctor_id, date):
+    """Return the DaySlots for a doctor on ``date`` or None when the doctor is off."""
+    return get_days([doctor_id], [date])[(doctor_id, date)]
+
+
+def first_bookable_minute(date, now=None):
+    """Slots on the current day are only offered from the next full hour on."""
+    now = timezone.localtime(now or timezone.now())
+    if date == now.date():
+        return (now.hour + 1) * 60
+    return None
+
+
+def format_minute(minute):
+    return f'{minute // 60:02d}:{minute % 60:02d}'
+
+
+def hours_error(day):
+    """Validation message for an appointment outside the windows of ``day``."""
+    if len(day.windows) == 1:
+        start, end = day.windows[0]
+        return f"Appointment time must be between {format_minute(start)} and {format_minute(end)}"
+    windows = ', '.join(f"{format_minute(start)}-{format_minute(end)}" for start, end in day.windows)
+    return f"Appointment time must fall within {windows}"
+
+
+def free_slots(doctor_id, date, now=None):
+    """Return the free slot start times (``HH:MM``) or None when the doctor is off."""
+    return format_day(get_day(doctor_id, date), date, now)
+
+
+def format_day(day, date, now=None):
+    if day is None:
+        return None
+    return [format_minute(m) for m in day.free_minutes(first_bookable_minute(date, now))]
+
+
+def invalidate_booking(doctor_id, appointment_datetime, duration):
+    """Drop the indexed days a ``duration`` minute appointment starting at ``appointment_datetime`` overlaps."""
+    cache_layer.invalidate(*[
+        doctor_day_resource(doctor_id, date) for date in _touched_dates(appointment_datetime, duration)
+    ])
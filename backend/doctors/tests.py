@@ -1,3 +1,764 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+import datetime
 
-# Create your tests here.
+from patients.models import Patient
+from doctors.models import Doctor, Availability, AvailabilityException, SlotPolicy
+from doctors import schedule, slots
+from doctors.access import doctor_for_user
+from core import cache as cache_layer
+from appointments.models import Appointment
+from appointments.serializers import AppointmentSerializer
+from records.models import MedicalRecord
+
+
+User = get_user_model()
+
+
+def next_weekday(weekday):
+   """Return the next date (at least a week ahead) falling on ``weekday``."""
+   date = timezone.localdate() + datetime.timedelta(days=7)
+   return date + datetime.timedelta(days=(weekday - date.weekday()) % 7)
+
+
+def local_datetime(date, hour, minute=0):
+   return timezone.make_aware(datetime.datetime.combine(date, datetime.time(hour, minute)))
+
+
+class SlotIndexTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology'
+       )
+       Availability.objects.create(
+           doctor=self.doctor,
+           day_of_week='MON',
+           start_time=datetime.time(9, 0),
+           end_time=datetime.time(12, 0)
+       )
+       self.monday = next_weekday(0)
+
+   def book(self, hour, minute=0):
+       with self.captureOnCommitCallbacks(execute=True):
+           return Appointment.objects.create(
+               patient=self.patient,
+               doctor=self.doctor,
+               appointment_datetime=local_datetime(self.monday, hour, minute),
+               status='SCHEDULED'
+           )
+
+   def test_slots_follow_weekly_availability(self):
+       self.assertEqual(
+           slots.free_slots(self.doctor.id, self.monday),
+           ['09:00', '09:30', '10:00', '10:30', '11:00', '11:30']
+       )
+       self.assertIsNone(slots.free_slots(self.doctor.id, self.monday + datetime.timedelta(days=1)))
+
+   def test_specific_date_overrides_weekly_availability(self):
+       Availability.objects.create(
+           doctor=self.doctor,
+           day_of_week='MON',
+           specific_date=self.monday,
+           start_time=datetime.time(14, 0),
+           end_time=datetime.time(15, 0)
+       )
+       self.assertEqual(slots.free_slots(self.doctor.id, self.monday), ['14:00', '14:30'])
+
+   def test_indexed_day_is_served_without_queries(self):
+       slots.free_slots(self.doctor.id, self.monday)
+       with self.assertNumQueries(0):
+           slots.free_slots(self.doctor.id, self.monday)
+
+   def test_booking_invalidates_index(self):
+       slots.free_slots(self.doctor.id, self.monday)
+       appointment = self.book(10)
+       self.assertNotIn('10:00', slots.free_slots(self.doctor.id, self.monday))
+
+       with self.captureOnCommitCallbacks(execute=True):
+           appointment.appointment_datetime = local_datetime(self.monday, 11)
+           appointment.save()
+       free = slots.free_slots(self.doctor.id, self.monday)
+       self.assertIn('10:00', free)
+       self.assertNotIn('11:00', free)
+
+       with self.captureOnCommitCallbacks(execute=True):
+           appointment.status = 'CANCELLED'
+           appointment.save()
+       self.assertIn('11:00', slots.free_slots(self.doctor.id, self.monday))
+
+   def test_booking_rebuilds_only_its_day(self):
+       next_monday = self.monday + datetime.timedelta(days=7)
+       slots.get_days([self.doctor.id], [self.monday, next_monday])
+       self.book(10)
+       with self.assertNumQueries(0):
+           slots.get_day(self.doctor.id, next_monday)
+       # the booked day is read back from the database once
+       with self.assertNumQueries(1):
+           self.assertNotIn('10:00', slots.free_slots(self.doctor.id, self.monday))
+
+   @override_settings(SLOT_INDEX_LOCAL_CACHE=False)
+   def test_process_local_cache_is_not_used(self):
+       slots.free_slots(self.doctor.id, self.monday)
+       Appointment.objects.filter(doctor=self.doctor).delete()
+       # a booking another process made, which this one's cache would never hear of
+       Appointment.objects.bulk_create([Appointment(
+           patient=self.patient, doctor=self.doctor, appointment_datetime=local_datetime(self.monday, 10)
+       )])
+       self.assertNotIn('10:00', slots.free_slots(self.doctor.id, self.monday))
+
+   def test_unaligned_booking_blocks_overlapping_slots(self):
+       self.book(10, 15)
+       free = slots.free_slots(self.doctor.id, self.monday)
+       self.assertNotIn('10:00', free)
+       self.assertNotIn('10:30', free)
+       self.assertIn('11:00', free)
+
+   def test_availability_change_invalidates_index(self):
+       slots.free_slots(self.doctor.id, self.monday)
+       Availability.objects.filter(doctor=self.doctor).delete()
+       Availability.objects.create(
+           doctor=self.doctor,
+           day_of_week='MON',
+           start_time=datetime.time(16, 0),
+           end_time=datetime.time(17, 0)
+       )
+       self.assertEqual(slots.free_slots(self.doctor.id, self.monday), ['16:00', '16:30'])
+
+
+class ScheduleRuleTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology'
+       )
+       # split shift with a break in the morning
+       for start, end, kind in [(9, 12, 'WORK'), (13, 15, 'WORK'), (10, 11, 'BREAK')]:
+           Availability.objects.create(
+               doctor=self.doctor,
+               day_of_week='MON',
+               start_time=datetime.time(start, 0),
+               end_time=datetime.time(end, 0),
+               kind=kind
+           )
+       self.monday = next_weekday(0)
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def booking(self, hour, minute=0):
+       return {
+           'patient': self.patient.id,
+           'doctor': self.doctor.id,
+           'appointment_datetime': local_datetime(self.monday, hour, minute).isoformat()
+       }
+
+   def test_interval_arithmetic(self):
+       self.assertEqual(schedule.normalize([(60, 120), (0, 30), (100, 150), (200, 200)]), ((0, 30), (60, 150)))
+       self.assertEqual(schedule.subtract(((0, 100), (200, 300)), [(50, 250)]), ((0, 50), (250, 300)))
+       self.assertEqual(schedule.subtract(((0, 100),), [(0, 100)]), ())
+
+   def test_windows_and_breaks(self):
+       self.assertEqual(
+           slots.free_slots(self.doctor.id, self.monday),
+           ['09:00', '09:30', '11:00', '11:30', '13:00', '13:30', '14:00', '14:30']
+       )
+
+   def test_dated_rules(self):
+       Availability.objects.create(
+           doctor=self.doctor,
+           day_of_week='MON',
+           specific_date=self.monday,
+           start_time=datetime.time(14, 0),
+           end_time=datetime.time(14, 30),
+           kind='BREAK'
+       )
+       self.assertNotIn('14:00', slots.free_slots(self.doctor.id, self.monday))
+       # dated working hours replace the weekly windows and breaks
+       Availability.objects.create(
+           doctor=self.doctor,
+           day_of_week='MON',
+           specific_date=self.monday,
+           start_time=datetime.time(10, 0),
+           end_time=datetime.time(11, 0)
+       )
+       self.assertEqual(slots.free_slots(self.doctor.id, self.monday), ['10:00', '10:30'])
+       self.assertEqual(len(slots.free_slots(self.doctor.id, self.monday + datetime.timedelta(days=7))), 8)
+
+   def test_exceptions(self):
+       AvailabilityException.objects.create(
+           doctor=self.doctor,
+           start_date=self.monday,
+           end_date=self.monday + datetime.timedelta(days=7),
+           start_time=datetime.time(13, 0),
+           end_time=datetime.time(14, 0)
+       )
+       self.assertEqual(slots.free_slots(self.doctor.id, self.monday)[-2:], ['14:00', '14:30'])
+       AvailabilityException.objects.create(
+           doctor=self.doctor,
+           start_date=self.monday + datetime.timedelta(days=5),
+           end_date=self.monday + datetime.timedelta(days=9),
+           reason='Conference'
+       )
+       self.assertIsNone(slots.free_slots(self.doctor.id, self.monday + datetime.timedelta(days=7)))
+       self.assertEqual(len(slots.free_slots(self.doctor.id, self.monday + datetime.timedelta(days=14))), 8)
+
+   def test_compiled_schedule_is_cached(self):
+       slots.free_slots(self.doctor.id, self.monday)
+       # only the appointments of the new day are read
+       with self.assertNumQueries(1):
+           slots.free_slots(self.doctor.id, self.monday + datetime.timedelta(days=7))
+
+   def test_validation_uses_windows(self):
+       serializer = AppointmentSerializer(data=self.booking(10, 30))
+       self.assertFalse(serializer.is_valid())
+       self.assertEqual(
+           serializer.errors['non_field_errors'][0],
+           'Appointment time must fall within 09:00-10:00, 11:00-12:00, 13:00-15:00'
+       )
+       # must end before the break starts
+       self.assertFalse(AppointmentSerializer(data=self.booking(9, 45)).is_valid())
+       self.assertTrue(AppointmentSerializer(data=self.booking(13, 30)).is_valid())
+
+   def test_availability_and_exception_endpoints(self):
+       url = f'/api/doctors/{self.doctor.id}'
+       # a window replaces only the windows of its kind it overlaps
+       response = self.client.post(f'{url}/add_availability/', {
+           'day_of_week': 'MON',
+           'start_time': '14:00',
+           'end_time': '17:00'
+       })
+       self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+       windows = Availability.objects.filter(doctor=self.doctor, kind='WORK').order_by('start_time')
+       self.assertEqual([w.start_time.hour for w in windows], [9, 14])
+       self.assertEqual(Availability.objects.filter(kind='BREAK').count(), 1)
+
+       response = self.client.post(f'{url}/add_exception/', {
+           'start_date': self.monday,
+           'end_date': self.monday,
+           'reason': 'Training'
+       })
+       self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+       response = self.client.get(f'{url}/available_slots/?date={self.monday}')
+       self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+       self.assertEqual(len(self.client.get(f'{url}/exceptions/').data), 1)
+
+       exception_id = AvailabilityException.objects.get().id
+       response = self.client.delete(f'{url}/remove_exception/?exception_id={exception_id}')
+       self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+       response = self.client.get(f'{url}/available_slots/?date={self.monday}')
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+       response = self.client.post(f'{url}/add_exception/', {
+           'start_date': self.monday,
+           'end_date': self.monday,
+           'start_time': '09:00'
+       })
+       self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SlotPolicyTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.patients = [
+           Patient.objects.create(
+               first_name=f'Patient{i}',
+               last_name='Doe',
+               date_of_birth='1990-01-01',
+               email=f'patient{i}@example.com'
+           )
+           for i in range(3)
+       ]
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Vaccination'
+       )
+       Availability.objects.create(
+           doctor=self.doctor,
+           day_of_week='MON',
+           start_time=datetime.time(9, 0),
+           end_time=datetime.time(10, 0)
+       )
+       self.policy = SlotPolicy.objects.create(specialization='Vaccination', slot_minutes=10)
+       self.monday = next_weekday(0)
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def book(self, patient, hour, minute=0):
+       with self.captureOnCommitCallbacks(execute=True):
+           return self.client.post('/api/appointments/', {
+               'patient': patient.id,
+               'doctor': self.doctor.id,
+               'appointment_datetime': local_datetime(self.monday, hour, minute).isoformat()
+           })
+
+   def test_specialization_slot_length(self):
+       self.assertEqual(
+           slots.free_slots(self.doctor.id, self.monday),
+           ['09:00', '09:10', '09:20', '09:30', '09:40', '09:50']
+       )
+       response = self.book(self.patients[0], 9, 10)
+       self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+       self.assertEqual(response.data['duration_minutes'], 10)
+       self.assertEqual(self.book(self.patients[1], 9, 20).status_code, status.HTTP_201_CREATED)
+       self.assertEqual(slots.free_slots(self.doctor.id, self.monday), ['09:00', '09:30', '09:40', '09:50'])
+
+   def test_longer_appointments_block_every_slot_they_overlap(self):
+       # booked before the clinic moved to 10 minute slots
+       Appointment.objects.create(
+           patient=self.patients[0],
+           doctor=self.doctor,
+           appointment_datetime=local_datetime(self.monday, 9, 5),
+           duration_minutes=30
+       )
+       self.assertEqual(slots.free_slots(self.doctor.id, self.monday), ['09:40', '09:50'])
+       self.assertEqual(self.book(self.patients[1], 9, 30).status_code, status.HTTP_409_CONFLICT)
+
+   def test_doctor_buffer_overrides_specialization(self):
+       self.doctor.slot_minutes = 20
+       self.doctor.buffer_minutes = 10
+       self.doctor.save()
+       self.assertEqual(slots.free_slots(self.doctor.id, self.monday), ['09:00', '09:30'])
+       self.assertEqual(self.book(self.patients[0], 9, 0).status_code, status.HTTP_201_CREATED)
+       # 09:20 would start inside the buffer after the 09:00 appointment
+       self.assertEqual(self.book(self.patients[1], 9, 20).status_code, status.HTTP_409_CONFLICT)
+       self.assertEqual(self.book(self.patients[1], 9, 30).status_code, status.HTTP_201_CREATED)
+
+   def test_capacity_gives_each_patient_a_seat(self):
+       self.policy.capacity = 2
+       self.policy.save()
+       seats = [self.book(patient, 9, 0).data.get('seat') for patient in self.patients[:2]]
+       self.assertEqual(seats, [0, 1])
+       self.assertNotIn('09:00', slots.free_slots(self.doctor.id, self.monday))
+       self.assertEqual(self.book(self.patients[2], 9, 0).status_code, status.HTTP_409_CONFLICT)
+       self.assertEqual(self.book(self.patients[2], 9, 10).status_code, status.HTTP_201_CREATED)
+
+   def test_counts_match_per_slot_checks(self):
+       self.policy.capacity = 3
+       self.policy.buffer_minutes = 5
+       self.policy.save()
+       for i, minute in enumerate([0, 7, 12, 12, 31, 44, 44, 44]):
+           Appointment.objects.create(
+               patient=self.patients[i % 3],
+               doctor=self.doctor,
+               appointment_datetime=local_datetime(self.monday, 9, minute),
+               duration_minutes=10,
+               seat=i
+           )
+       day = slots.get_day(self.doctor.id, self.monday)
+       booked = [(540 + minute, 10) for minute in [0, 7, 12, 12, 31, 44, 44, 44]]
+       expected = [
+           sum(day.overlaps(start, duration, other) for other, duration in booked) for start in day.starts
+       ]
+       self.assertEqual(list(day.booked), expected)
+
+
+class AvailableSlotsAPITests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology'
+       )
+       Availability.objects.create(
+           doctor=self.doctor,
+           day_of_week='MON',
+           start_time=datetime.time(9, 0),
+           end_time=datetime.time(10, 0)
+       )
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def test_available_slots(self):
+       monday = next_weekday(0)
+       response = self.client.get(f'/api/doctors/{self.doctor.id}/available_slots/?date={monday}')
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       self.assertEqual(response.data['day_of_week'], 'Monday')
+       self.assertEqual(response.data['available_slots'], ['09:00', '09:30'])
+
+   def test_indexed_day_costs_only_the_doctor_lookup(self):
+       monday = next_weekday(0)
+       url = f'/api/doctors/{self.doctor.id}/available_slots/?date={monday}'
+       self.client.get(url)
+       # get_object() reads the doctor; the slots come from the index, not a prefetch
+       with self.assertNumQueries(1):
+           response = self.client.get(url)
+       self.assertEqual(response.data['available_slots'], ['09:00', '09:30'])
+
+   def test_available_slots_on_day_off(self):
+       tuesday = next_weekday(1)
+       response = self.client.get(f'/api/doctors/{self.doctor.id}/available_slots/?date={tuesday}')
+       self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SlotSearchAPITests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       self.doctors = []
+       for i, specialization in enumerate(['Cardiology', 'Cardiology', 'Neurology']):
+           doctor = Doctor.objects.create(
+               first_name=f'Doctor{i}',
+               last_name='Smith',
+               email=f'doctor{i}@example.com',
+               specialization=specialization
+           )
+           for day in ['MON', 'WED']:
+               Availability.objects.create(
+                   doctor=doctor,
+                   day_of_week=day,
+                   start_time=datetime.time(9, 0),
+                   end_time=datetime.time(10, 0)
+               )
+           self.doctors.append(doctor)
+       self.monday = next_weekday(0)
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def search(self, **params):
+       query = '&'.join(f'{key}={value}' for key, value in params.items())
+       return self.client.get(f'/api/doctors/search_slots/?{query}')
+
+   def test_search_by_specialization_and_range(self):
+       Appointment.objects.create(
+           patient=self.patient,
+           doctor=self.doctors[0],
+           appointment_datetime=local_datetime(self.monday, 9),
+           status='SCHEDULED'
+       )
+       response = self.search(
+           specialization='Cardiology',
+           start_date=self.monday,
+           end_date=self.monday + datetime.timedelta(days=6)
+       )
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       results = {result['doctor']['id']: result['dates'] for result in response.data['results']}
+       self.assertEqual(set(results), {self.doctors[0].id, self.doctors[1].id})
+       first = results[self.doctors[0].id]
+       self.assertEqual([day['day_of_week'] for day in first], ['Monday', 'Wednesday'])
+       self.assertEqual(first[0]['available_slots'], ['09:30'])
+       self.assertEqual(results[self.doctors[1].id][0]['available_slots'], ['09:00', '09:30'])
+
+   def test_search_by_doctor_list(self):
+       response = self.search(doctors=self.doctors[2].id, start_date=self.monday)
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       self.assertEqual([r['doctor']['id'] for r in response.data['results']], [self.doctors[2].id])
+
+   def test_query_count_does_not_grow_with_doctors_and_days(self):
+       cache.clear()
+       with CaptureQueriesContext(connection) as small:
+           self.search(doctors=self.doctors[0].id, start_date=self.monday)
+       cache.clear()
+       with CaptureQueriesContext(connection) as large:
+           self.search(start_date=self.monday, end_date=self.monday + datetime.timedelta(days=20))
+       self.assertEqual(len(small), len(large))
+
+   def test_invalid_range(self):
+       response = self.search(start_date=self.monday, end_date=self.monday - datetime.timedelta(days=1))
+       self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+       response = self.search(start_date=self.monday, end_date=self.monday + datetime.timedelta(days=60))
+       self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DirectoryCacheTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       cache_layer.reset_stats()
+       self.client = APIClient()
+       self.user = User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology'
+       )
+       Availability.objects.create(
+           doctor=self.doctor,
+           day_of_week='MON',
+           start_time=datetime.time(9, 0),
+           end_time=datetime.time(10, 0)
+       )
+       self.client.force_authenticate(self.user)
+
+   def test_directory_reads_are_served_without_queries(self):
+       urls = [
+           '/api/doctors/',
+           '/api/doctors/?specialization=Cardiology',
+           f'/api/doctors/{self.doctor.id}/',
+           f'/api/doctors/{self.doctor.id}/availabilities/',
+       ]
+       for url in urls:
+           self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+       for url in urls:
+           with self.assertNumQueries(0):
+               response = self.client.get(url)
+           self.assertEqual(response.status_code, status.HTTP_200_OK)
+           self.assertEqual(response['X-Cache'], 'HIT')
+       self.assertEqual(cache_layer.stats()['doctors.detail'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+   def test_doctor_change_invalidates_list_and_detail(self):
+       self.client.get('/api/doctors/')
+       self.client.get(f'/api/doctors/{self.doctor.id}/')
+       self.doctor.specialization = 'Neurology'
+       self.doctor.save()
+       self.assertEqual(self.client.get('/api/doctors/').data['results'][0]['specialization'], 'Neurology')
+       self.assertEqual(self.client.get(f'/api/doctors/{self.doctor.id}/').data['specialization'], 'Neurology')
+
+   def test_availability_actions_invalidate_doctor(self):
+       url = f'/api/doctors/{self.doctor.id}/availabilities/'
+       self.client.get(url)
+       self.client.get(f'/api/doctors/{self.doctor.id}/')
+       response = self.client.post(f'/api/doctors/{self.doctor.id}/add_availability/', {
+           'day_of_week': 'TUE',
+           'start_time': '09:00',
+           'end_time': '11:00'
+       })
+       self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+       self.assertEqual(len(self.client.get(url).data), 2)
+       self.assertEqual(len(self.client.get(f'/api/doctors/{self.doctor.id}/').data['availabilities']), 2)
+
+       response = self.client.delete(
+           f'/api/doctors/{self.doctor.id}/remove_availability/?availability_id={response.data["id"]}'
+       )
+       self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+       self.assertEqual(len(self.client.get(url).data), 1)
+
+   def test_missing_doctor_is_not_cached(self):
+       self.assertEqual(self.client.get('/api/doctors/999/').status_code, status.HTTP_404_NOT_FOUND)
+       Doctor.objects.create(
+           id=999,
+           first_name='New',
+           last_name='Doctor',
+           email='new.doctor@example.com',
+           specialization='Neurology'
+       )
+       self.assertEqual(self.client.get('/api/doctors/999/').status_code, status.HTTP_200_OK)
+
+   def test_cache_stats_require_admin(self):
+       self.assertEqual(self.client.get('/api/cache/stats/').status_code, status.HTTP_403_FORBIDDEN)
+       self.user.is_staff = True
+       self.user.save()
+       self.client.get('/api/doctors/')
+       response = self.client.get('/api/cache/stats/')
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       self.assertEqual(response.data['doctors.list']['misses'], 1)
+
+
+class DoctorLookupTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       self.user = User.objects.create_user(username='doctoruser', password='doctorpass123', role='DOCTOR')
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology',
+           user=self.user
+       )
+       token = self.client.post('/api/auth/token/', {
+           'username': 'doctoruser',
+           'password': 'doctorpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def count_queries(self, url):
+       with CaptureQueriesContext(connection) as queries:
+           response = self.client.get(url)
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       return len(queries)
+
+   def test_lookup_is_cached_across_requests(self):
+       first = self.count_queries('/api/doctors/my_patients/')
+       self.assertEqual(self.count_queries('/api/doctors/my_patients/'), first - 1)
+       # shared by every doctor endpoint
+       with self.assertNumQueries(0):
+           self.assertEqual(doctor_for_user(self.user.id), self.doctor)
+
+   def test_unlinking_profile_invalidates_lookup(self):
+       self.client.get('/api/doctors/my_records/')
+       self.doctor.user = None
+       self.doctor.save()
+       response = self.client.get('/api/doctors/my_records/')
+       self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+       self.assertEqual(response.data['detail'], 'No doctor profile linked to your account.')
+
+   def test_linking_profile_invalidates_missing_lookup(self):
+       other = User.objects.create_user(username='otheruser', password='otherpass123', role='DOCTOR')
+       self.assertIsNone(doctor_for_user(other.id))
+       self.doctor.user = other
+       self.doctor.save()
+       self.assertEqual(doctor_for_user(other.id), self.doctor)
+       self.assertIsNone(doctor_for_user(self.user.id))
+
+
+class DashboardTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       self.user = User.objects.create_user(username='doctoruser', password='doctorpass123', role='DOCTOR')
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology',
+           user=self.user
+       )
+       self.other_doctor = Doctor.objects.create(
+           first_name='Bob',
+           last_name='Brown',
+           email='bob.brown@example.com',
+           specialization='Neurology'
+       )
+       self.rows = 0
+       self.add_patients(2)
+       token = self.client.post('/api/auth/token/', {
+           'username': 'doctoruser',
+           'password': 'doctorpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def add_patients(self, count, doctor=None):
+       today = timezone.localdate()
+       for _ in range(count):
+           self.rows += 1
+           patient = Patient.objects.create(
+               first_name=f'Patient{self.rows}',
+               last_name='Doe',
+               date_of_birth='1990-01-01',
+               email=f'patient{self.rows}@example.com'
+           )
+           appointment = Appointment.objects.create(
+               patient=patient,
+               doctor=doctor or self.doctor,
+               appointment_datetime=local_datetime(today, 0, self.rows)
+           )
+           MedicalRecord.objects.create(patient=patient, doctor=doctor or self.doctor, appointment=appointment, diagnosis='Flu')
+
+   def dashboard(self, query=''):
+       response = self.client.get(f'/api/doctors/my_dashboard/{query}')
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       return response.data
+
+   def test_dashboard_sections(self):
+       self.add_patients(1, doctor=self.other_doctor)
+       data = self.dashboard()
+       self.assertEqual(data['counts']['patients'], 2)
+       self.assertEqual(data['counts']['records'], 2)
+       self.assertEqual(data['counts']['appointments_today'], 2)
+       self.assertEqual(len(data['appointments_today']), 2)
+       self.assertEqual(len(data['recent_records']), 2)
+       self.assertEqual([p['first_name'] for p in data['patients']], ['Patient1', 'Patient2'])
+
+   def test_query_count_does_not_grow_with_patients(self):
+       self.dashboard()
+       with CaptureQueriesContext(connection) as small:
+           self.dashboard()
+       self.add_patients(10)
+       with CaptureQueriesContext(connection) as large:
+           data = self.dashboard()
+       self.assertEqual(len(small), len(large))
+       self.assertEqual(data['counts']['patients'], 12)
+
+   def test_since_returns_only_changes(self):
+       since = self.dashboard()['next_since']
+       data = self.dashboard(f'?since={since}')
+       self.assertEqual((data['appointments_today'], data['recent_records'], data['patients']), ([], [], []))
+
+       self.add_patients(1)
+       data = self.dashboard(f'?since={since}')
+       self.assertEqual([p['first_name'] for p in data['patients']], ['Patient3'])
+       self.assertEqual(len(data['recent_records']), 1)
+       self.assertEqual(len(data['appointments_today']), 1)
+       self.assertEqual(data['counts']['patients'], 3)
+
+   def test_limit_bounds_every_section(self):
+       self.add_patients(3)
+       data = self.dashboard('?limit=2')
+       self.assertEqual([len(data[name]) for name in ('appointments_today', 'recent_records', 'patients')], [2, 2, 2])
+       self.assertEqual(data['has_more'], {'appointments_today': True, 'recent_records': True, 'patients': True})
+
+   def test_truncated_delta_resumes_where_it_stopped(self):
+       since = self.dashboard()['next_since']
+       self.add_patients(5)
+       seen = {'appointments_today': [], 'recent_records': [], 'patients': []}
+       for _ in range(10):
+           data = self.dashboard(f'?since={since}&limit=2')
+           for name in seen:
+               self.assertLessEqual(len(data[name]), 2)
+               seen[name] += [row['id'] for row in data[name]]
+           since = data['next_since']
+           if not any(data['has_more'].values()):
+               break
+       self.assertFalse(any(data['has_more'].values()))
+       self.assertEqual(len(set(seen['patients'])), 5)
+       self.assertEqual(len(set(seen['recent_records'])), 5)
+       self.assertEqual(len(set(seen['appointments_today'])), 5)
+
+   def test_rows_changed_together_are_not_split(self):
+       since = self.dashboard()['next_since']
+       self.add_patients(3)
+       MedicalRecord.objects.update(updated_at=timezone.now())
+       data = self.dashboard(f'?since={since}&limit=2')
+       self.assertEqual(len(data['recent_records']), 5)
+       self.assertFalse(data['has_more']['recent_records'])
+
+   def test_invalid_since_and_missing_profile(self):
+       response = self.client.get('/api/doctors/my_dashboard/?since=yesterday')
+       self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+       self.doctor.user = None
+       self.doctor.save()
+       response = self.client.get('/api/doctors/my_dashboard/')
+       self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,63 +1,96 @@
 from django.shortcuts import render
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from functools import partial
 import datetime
 
-from .models import Doctor, Availability
-from .serializers import DoctorSerializer, DoctorListSerializer, AvailabilitySerializer
-from patients.models import Patient
+from .models import Doctor, Availability, AvailabilityException
+from .serializers import DoctorSerializer, DoctorListSerializer, AvailabilitySerializer, AvailabilityExceptionSerializer
+from . import slots
+from .caching import DIRECTORY, doctor_resource, invalidate_doctor
+from .access import request_doctor
+from .dashboard import build_dashboard, doctor_patients, doctor_records
 from patients.serializers import PatientListSerializer
-from records.models import MedicalRecord
 from records.serializers import MedicalRecordSerializer
 from appointments.models import Appointment
+from appointments.serializers import AppointmentSerializer
+from core.prefetch import PrefetchPlanMixin, optimize_queryset
+from core.pagination import AppointmentCursorPagination, NewestFirstCursorPagination, paginated_response
+from core.cache import cached_response
+from search.filters import FullTextSearchFilter
 
-class DoctorViewSet(viewsets.ModelViewSet):
+# widest date range a single slot search may cover
+MAX_SEARCH_DAYS = 31
+# rows per section of the doctor dashboard
+DASHBOARD_LIMIT = 20
+MAX_DASHBOARD_LIMIT = 200
+
+class DoctorViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
    queryset = Doctor.objects.all()
    permission_classes = [IsAuthenticated]
-   filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+   filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
    filterset_fields = ['specialization']
-   search_fields = ['first_name', 'last_name', 'specialization']
+   search_kind = 'doctor'
    
    def get_serializer_class(self):
        if self.action == 'list':
            return DoctorListSerializer
        return DoctorSerializer
    
+   # directory reads are served from core.cache; the doctors' signals invalidate them
+   def list(self, request, *args, **kwargs):
+       return cached_response(request, 'doctors.list', [DIRECTORY], partial(super().list, request, *args, **kwargs))
+   
+   def retrieve(self, request, *args, **kwargs):
+       build = partial(super().retrieve, request, *args, **kwargs)
+       if not str(kwargs.get('pk', '')).isdigit():
+           return build()
+       return cached_response(request, 'doctors.detail', [doctor_resource(int(kwargs['pk']))], build)
+   
    @action(detail=True, methods=['get'])
    def availabilities(self, request, pk=None):
+       if not str(pk).isdigit():
+           return self._availabilities(request, pk)
+       return cached_response(
+           request, 'doctors.availabilities', [doctor_resource(int(pk))],
+           partial(self._availabilities, request, pk)
+       )
+   
+   def _availabilities(self, request, pk):
        doctor = self.get_object()
        availabilities = doctor.availabilities.all()
        serializer = AvailabilitySerializer(availabilities, many=True)
        return Response(serializer.data)
    
    @action(detail=True, methods=['post'])
+   @transaction.atomic
    def add_availability(self, request, pk=None):
        doctor = self.get_object()
        serializer = AvailabilitySerializer(data=request.data)
        if serializer.is_valid():
-           if 'specific_date' in serializer.validated_data and serializer.validated_data['specific_date']:
-               existing = Availability.objects.filter(
-                   doctor=doctor,
-                   specific_date=serializer.validated_data['specific_date']
-               ).first()
-               
-               if existing:
-                   existing.delete()
+           data = serializer.validated_data
+           # a window replaces the overlapping ones of its kind on the same day; others are kept, so
+           # split shifts are several windows
+           replaced = Availability.objects.filter(
+               doctor=doctor,
+               kind=data.get('kind', Availability.WORK),
+               start_time__lt=data['end_time'],
+               end_time__gt=data['start_time']
+           )
+           if data.get('specific_date'):
+               replaced = replaced.filter(specific_date=data['specific_date'])
            else:
-               existing = Availability.objects.filter(
-                   doctor=doctor,
-                   day_of_week=serializer.validated_data['day_of_week'],
-                   specific_date__isnull=True
-               ).first()
-               
-               if existing:
-                   existing.delete()
-                   
+               replaced = replaced.filter(day_of_week=data['day_of_week'], specific_date__isnull=True)
+           replaced.delete()
+           
            serializer.save(doctor=doctor)
+           invalidate_doctor(doctor.id)
            return Response(serializer.data, status=status.HTTP_201_CREATED)
        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
    
@@ -68,10 +101,36 @@ class DoctorViewSet(viewsets.ModelViewSet):
            availability_id = request.query_params.get('availability_id')
            availability = Availability.objects.get(id=availability_id, doctor=doctor)
            availability.delete()
+           invalidate_doctor(doctor.id)
            return Response(status=status.HTTP_204_NO_CONTENT)
        except Availability.DoesNotExist:
            return Response({"detail": "Availability not found."}, status=status.HTTP_404_NOT_FOUND)
    
+   @action(detail=True, methods=['get'])
+   def exceptions(self, request, pk=None):
+       doctor = self.get_object()
+       serializer = AvailabilityExceptionSerializer(doctor.availability_exceptions.all(), many=True)
+       return Response(serializer.data)
+   
+   @action(detail=True, methods=['post'])
+   def add_exception(self, request, pk=None):
+       doctor = self.get_object()
+       serializer = AvailabilityExceptionSerializer(data=request.data)
+       if serializer.is_valid():
+           serializer.save(doctor=doctor)
+           return Response(serializer.data, status=status.HTTP_201_CREATED)
+       return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+   
+   @action(detail=True, methods=['delete'])
+   def remove_exception(self, request, pk=None):
+       doctor = self.get_object()
+       try:
+           exception = AvailabilityException.objects.get(id=request.query_params.get('exception_id'), doctor=doctor)
+       except (AvailabilityException.DoesNotExist, ValueError):
+           return Response({"detail": "Exception not found."}, status=status.HTTP_404_NOT_FOUND)
+       exception.delete()
+       return Response(status=status.HTTP_204_NO_CONTENT)
+   
    @action(detail=True, methods=['get'])
    def available_slots(self, request, pk=None):
        doctor = self.get_object()
@@ -85,94 +144,114 @@ class DoctorViewSet(viewsets.ModelViewSet):
        except ValueError:
            return Response({"detail": "Invalid date format. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
        
-       specific_availability = Availability.objects.filter(
-           doctor=doctor,
-           specific_date=date
-       ).first()
+       available_slots = slots.free_slots(doctor.id, date)
+       if available_slots is None:
+           return Response({"detail": f"Doctor is not available on {date.strftime('%A')}s."}, 
+                          status=status.HTTP_404_NOT_FOUND)
        
-       if specific_availability:
-           availability = specific_availability
-       else:
-           day_of_week = date.strftime('%a').upper()[:3]
-           
-           try:
-               availability = doctor.availabilities.get(day_of_week=day_of_week, specific_date__isnull=True)
-           except Availability.DoesNotExist:
-               return Response({"detail": f"Doctor is not available on {date.strftime('%A')}s."}, 
-                              status=status.HTTP_404_NOT_FOUND)
-       
-       start_time = datetime.datetime.combine(date, availability.start_time)
-       end_time = datetime.datetime.combine(date, availability.end_time)
+       return Response({
+           "date": date_str,
+           "day_of_week": date.strftime('%A'),
+           "available_slots": available_slots
+       })
+   
+   @action(detail=False, methods=['get'])
+   def search_slots(self, request):
+       start_str = request.query_params.get('start_date', None)
+       end_str = request.query_params.get('end_date', start_str)
        
-       now = timezone.now()
-       if date == now.date() and start_time < now:
-           start_time = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+       if not start_str:
+           return Response({"detail": "start_date parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
        
-       time_slots = []
-       current = start_time
+       try:
+           start_date = datetime.datetime.strptime(start_str, '%Y-%m-%d').date()
+           end_date = datetime.datetime.strptime(end_str, '%Y-%m-%d').date()
+       except ValueError:
+           return Response({"detail": "Invalid date format. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
        
-       while current <= end_time - datetime.timedelta(minutes=30):
-           time_slots.append(current)
-           current += datetime.timedelta(minutes=30)
+       if end_date < start_date:
+           return Response({"detail": "end_date must not be before start_date."}, status=status.HTTP_400_BAD_REQUEST)
+       if (end_date - start_date).days >= MAX_SEARCH_DAYS:
+           return Response({"detail": f"Date range cannot exceed {MAX_SEARCH_DAYS} days."}, status=status.HTTP_400_BAD_REQUEST)
        
-       booked_appointments = Appointment.objects.filter(
-           doctor=doctor,
-           appointment_datetime__date=date,
-           status='SCHEDULED'
-       ).values_list('appointment_datetime', flat=True)
+       doctors = self.filter_queryset(self.get_queryset())
+       doctor_ids = request.query_params.get('doctors', None)
+       if doctor_ids:
+           try:
+               doctors = doctors.filter(id__in=[int(pk) for pk in doctor_ids.split(',') if pk])
+           except ValueError:
+               return Response({"detail": "doctors must be a comma-separated list of IDs."}, status=status.HTTP_400_BAD_REQUEST)
+       doctors = list(doctors)
        
-       available_slots = [slot for slot in time_slots 
-                         if slot not in booked_appointments]
+       dates = [start_date + datetime.timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+       days = slots.get_days([doctor.id for doctor in doctors], dates)
        
-       formatted_slots = [slot.strftime('%H:%M') for slot in available_slots]
+       results = []
+       for doctor in doctors:
+           doctor_days = []
+           for date in dates:
+               available_slots = slots.format_day(days[(doctor.id, date)], date)
+               if available_slots:
+                   doctor_days.append({
+                       "date": date.isoformat(),
+                       "day_of_week": date.strftime('%A'),
+                       "available_slots": available_slots
+                   })
+           if doctor_days:
+               results.append({
+                   "doctor": DoctorListSerializer(doctor).data,
+                   "dates": doctor_days
+               })
        
        return Response({
-           "date": date_str,
-           "day_of_week": date.strftime('%A'),
-           "available_slots": formatted_slots
+           "start_date": start_date.isoformat(),
+           "end_date": end_date.isoformat(),
+           "results": results
        })
    
    @action(detail=False, methods=['get'])
    def my_patients(self, request):
-       try:
-           doctor = Doctor.objects.get(user=request.user)
-           
-           patient_ids = Appointment.objects.filter(doctor=doctor).values_list('patient', flat=True).distinct()
-           patients = Patient.objects.filter(id__in=patient_ids)
-           
-           serializer = PatientListSerializer(patients, many=True)
-           return Response(serializer.data)
-       except Doctor.DoesNotExist:
-           return Response({"detail": "No doctor profile linked to your account."}, status=status.HTTP_404_NOT_FOUND)
+       doctor = request_doctor(request)
+       return paginated_response(self, doctor_patients(doctor), PatientListSerializer)
 
    @action(detail=False, methods=['get'])
    def my_records(self, request):
-       try:
-           doctor = Doctor.objects.get(user=request.user)
-           
-           patient_ids = Appointment.objects.filter(doctor=doctor).values_list('patient', flat=True).distinct()
-           records = MedicalRecord.objects.filter(patient__id__in=patient_ids)
-           
-           serializer = MedicalRecordSerializer(records, many=True)
-           return Response(serializer.data)
-       except Doctor.DoesNotExist:
-           return Response({"detail": "No doctor profile linked to your account."}, status=status.HTTP_404_NOT_FOUND)
+       doctor = request_doctor(request)
+       records = optimize_queryset(doctor_records(doctor), MedicalRecordSerializer)
+       
+       return paginated_response(self, records, MedicalRecordSerializer, NewestFirstCursorPagination)
        
    @action(detail=False, methods=['get'])
    def my_appointments(self, request):
+       doctor = request_doctor(request)
+       
+       appointments = optimize_queryset(Appointment.objects.filter(doctor=doctor), AppointmentSerializer).order_by('-appointment_datetime')
+       
+       date = request.query_params.get('date', None)
+       if date:
+           try:
+               appointments = appointments.on_date(datetime.datetime.strptime(date, '%Y-%m-%d').date())
+           except ValueError:
+               return Response({"detail": "Invalid date format. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+       
+       return paginated_response(self, appointments, AppointmentSerializer, AppointmentCursorPagination)
+   
+   @action(detail=False, methods=['get'])
+   def my_dashboard(self, request):
+       doctor = request_doctor(request)
+       
+       since = None
+       since_str = request.query_params.get('since', None)
+       if since_str:
+           since = parse_datetime(since_str.replace(' ', '+'))
+           if since is None:
+               return Response({"detail": "Invalid since. Use an ISO 8601 datetime."}, status=status.HTTP_400_BAD_REQUEST)
+           if timezone.is_naive(since):
+               since = timezone.make_aware(since)
+       
        try:
-           doctor = Doctor.objects.get(user=request.user)
-           
-           appointments = Appointment.objects.filter(doctor=doctor).order_by('-appointment_datetime')
-           
-           date = request.query_params.get('date', None)
-           if date:
-               appointments = appointments.filter(appointment_datetime__date=date)
-           
-           from appointments.serializers import AppointmentSerializer
-           serializer = AppointmentSerializer(appointments, many=True)
-           return Response(serializer.data)
+           limit = min(int(request.query_params.get('limit', DASHBOARD_LIMIT)), MAX_DASHBOARD_LIMIT)
+       except ValueError:
+           return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
        
-       except Doctor.DoesNotExist:
-           return Response({"detail": "No doctor profile linked to your account."}, status=status.HTTP_404_NOT_FOUND)
-       
\ No newline at end of file
+       return Response(build_dashboard(doctor, since, max(limit, 1), self.get_serializer_context()))
@@ -3,10 +3,10 @@ from .models import Notification
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['patient', 'notification_type', 'status', 'created_at', 'sent_at']
+    list_display = ['patient', 'notification_type', 'status', 'created_at', 'sent_at', 'attempts']
     list_filter = ['notification_type', 'status', 'created_at']
     search_fields = ['patient__first_name', 'patient__last_name', 'message']
-    readonly_fields = ['created_at', 'sent_at']
+    readonly_fields = ['created_at', 'sent_at', 'attempts', 'next_attempt_at', 'last_error']
     list_editable = ['status']
     
     fieldsets = (
@@ -14,7 +14,7 @@ class NotificationAdmin(admin.ModelAdmin):
             'fields': ('patient', 'appointment', 'notification_type', 'message')
         }),
         ('Status & Timing', {
-            'fields': ('status', 'created_at', 'sent_at')
+            'fields': ('status', 'created_at', 'sent_at', 'attempts', 'next_attempt_at', 'last_error')
         }),
     )
     
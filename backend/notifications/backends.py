@@ -0,0 +1,66 @@
+"""
+Delivery channels for notifications.
+
+A backend receives a batch of notifications and returns the ones it could not
+deliver together with the error, so a provider with a bulk API can send the
+whole batch in one call. ``NOTIFICATION_BACKEND`` selects the backend; the
+console and file backends stand in for a real SMS/email provider locally.
+"""
+import json
+import sys
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class BaseBackend:
+    def send(self, notification):
+        raise NotImplementedError
+
+    def send_batch(self, notifications):
+        """Send ``notifications`` and return ``{notification id: error message}`` for failures."""
+        failures = {}
+        for notification in notifications:
+            try:
+                self.send(notification)
+            except Exception as exc:
+                failures[notification.id] = str(exc) or exc.__class__.__name__
+        return failures
+
+
+def _payload(notification):
+    return {
+        'id': notification.id,
+        'patient': notification.patient_id,
+        'appointment': notification.appointment_id,
+        'notification_type': notification.notification_type,
+        'message': notification.message,
+        'sent_at': timezone.now().isoformat(),
+    }
+
+
+class ConsoleBackend(BaseBackend):
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, notification):
+        self.stream.write(json.dumps(_payload(notification)) + '\n')
+        self.stream.flush()
+
+
+class FileBackend(BaseBackend):
+    """Appends one JSON line per notification to ``NOTIFICATION_FILE_PATH``."""
+
+    def __init__(self, path=None):
+        self.path = path or settings.NOTIFICATION_FILE_PATH
+
+    def send_batch(self, notifications):
+        with open(self.path, 'a') as f:
+            for notification in notifications:
+                f.write(json.dumps(_payload(notification)) + '\n')
+        return {}
+
+
+def get_backend(path=None):
+    return import_string(path or settings.NOTIFICATION_BACKEND)()
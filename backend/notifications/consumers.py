@@ -0,0 +1,98 @@
+"""Outbox consumers that turn appointment events into patient notifications."""
+from appointments.events import (
+    APPOINTMENT_CREATED, APPOINTMENT_STATUS_CHANGED, APPOINTMENTS_BOOKED, APPOINTMENTS_RESCHEDULED,
+)
+from appointments.models import Appointment
+from core.outbox import consumer
+from .models import Notification
+from .reminders import format_when, remind_late_bookings
+
+
+def _appointment(event):
+    return Appointment.objects.select_related('doctor').filter(pk=event.payload['appointment_id']).first()
+
+
+def _when(appointment):
+    return format_when(appointment.appointment_datetime)
+
+
+@consumer(APPOINTMENT_CREATED, name='notifications.confirmation')
+def send_confirmation(event):
+    appointment = _appointment(event)
+    if appointment is None:
+        return
+    Notification.objects.create(
+        patient_id=appointment.patient_id,
+        appointment=appointment,
+        notification_type='APPOINTMENT_CONFIRMATION',
+        message=f"Your appointment with {appointment.doctor} has been scheduled for {_when(appointment)}."
+    )
+
+
+@consumer(APPOINTMENT_STATUS_CHANGED, name='notifications.cancellation')
+def send_cancellation(event):
+    if event.payload['status'] != 'CANCELLED':
+        return
+    appointment = _appointment(event)
+    if appointment is None:
+        return
+    Notification.objects.filter(
+        appointment=appointment,
+        notification_type='APPOINTMENT_REMINDER',
+        status='PENDING'
+    ).delete()
+    Notification.objects.create(
+        patient_id=appointment.patient_id,
+        appointment=appointment,
+        notification_type='APPOINTMENT_CANCELLATION',
+        message=f"Your appointment with {appointment.doctor} on {_when(appointment)} has been cancelled."
+    )
+
+
+@consumer(APPOINTMENT_CREATED, name='notifications.late_reminder')
+@consumer(APPOINTMENT_STATUS_CHANGED, name='notifications.late_reminder')
+def send_late_reminder(event):
+    if event.payload['status'] != 'SCHEDULED':
+        return
+    appointment = _appointment(event)
+    if appointment is not None:
+        remind_late_bookings([appointment])
+
+
+def _appointments(ids):
+    return list(Appointment.objects.select_related('doctor').filter(pk__in=ids))
+
+
+@consumer(APPOINTMENTS_BOOKED, name='notifications.bulk_confirmation')
+def send_bulk_confirmations(event):
+    appointments = _appointments(event.payload['appointment_ids'])
+    Notification.objects.bulk_create([
+        Notification(
+            patient_id=appointment.patient_id,
+            appointment=appointment,
+            notification_type='APPOINTMENT_CONFIRMATION',
+            message=f"Your appointment with {appointment.doctor} has been scheduled for {_when(appointment)}."
+        )
+        for appointment in appointments
+    ])
+    remind_late_bookings(appointments)
+
+
+@consumer(APPOINTMENTS_RESCHEDULED, name='notifications.reschedule')
+def send_reschedule_notices(event):
+    appointments = _appointments([change['appointment_id'] for change in event.payload['appointments']])
+    # reminders quote the old time; the reminder scan or the late reminder below replaces them
+    reminders = Notification.objects.filter(appointment__in=appointments, notification_type='APPOINTMENT_REMINDER')
+    reminders.filter(status='PENDING').delete()
+    # sent and failed ones stay as history but release their (appointment, window) slot for the new time
+    reminders.filter(reminder_window__isnull=False).update(reminder_window=None)
+    Notification.objects.bulk_create([
+        Notification(
+            patient_id=appointment.patient_id,
+            appointment=appointment,
+            notification_type='APPOINTMENT_RESCHEDULED',
+            message=f"Your appointment has been moved to {_when(appointment)} with {appointment.doctor}."
+        )
+        for appointment in appointments if appointment.status == 'SCHEDULED'
+    ])
+    remind_late_bookings(appointments)
@@ -0,0 +1,67 @@
+"""
+Claim and deliver pending notifications outside the request path.
+
+Batches are claimed with ``core.leases.claim_due``, so any number of workers
+can run side by side without sending a notification twice.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from core.leases import claim_due, retry_delay
+from .backends import get_backend
+from .models import Notification
+
+
+def claim_batch(batch_size, now=None):
+    """Claim up to ``batch_size`` due notifications and return them."""
+    return claim_due(
+        Notification.objects.filter(status='PENDING'),
+        batch_size,
+        settings.NOTIFICATION_CLAIM_TIMEOUT,
+        now or timezone.now(),
+        order_by=('created_at',),
+    )
+
+
+def dispatch_batch(batch_size=100, backend=None, now=None):
+    """
+    Claim and send one batch. Returns ``(sent, failed)`` where failed counts
+    notifications that were given up on as well as those rescheduled.
+    """
+    now = now or timezone.now()
+    notifications = claim_batch(batch_size, now)
+    if not notifications:
+        return 0, 0
+
+    backend = backend or get_backend()
+    try:
+        failures = backend.send_batch(notifications)
+    except Exception as exc:
+        failures = {notification.id: str(exc) or exc.__class__.__name__ for notification in notifications}
+
+    for notification in notifications:
+        notification.attempts += 1
+        notification.claim_token = None
+        error = failures.get(notification.id)
+        if error is None:
+            notification.status = 'SENT'
+            notification.sent_at = now
+            notification.next_attempt_at = None
+            notification.last_error = ''
+            continue
+        notification.last_error = error
+        if notification.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+            notification.status = 'FAILED'
+            notification.next_attempt_at = None
+        else:
+            notification.next_attempt_at = now + retry_delay(
+                notification.attempts,
+                settings.NOTIFICATION_RETRY_BACKOFF,
+                settings.NOTIFICATION_RETRY_MAX_DELAY,
+            )
+
+    Notification.objects.bulk_update(
+        notifications,
+        ['status', 'sent_at', 'attempts', 'next_attempt_at', 'last_error', 'claim_token'],
+    )
+    return len(notifications) - len(failures), len(failures)
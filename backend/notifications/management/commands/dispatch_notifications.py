@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.backends import get_backend
+from notifications.dispatch import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = 'Send pending notifications in batches; run several workers to scale out'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--sleep', type=float, default=5.0,
+                            help='Seconds to wait when no notification is due')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no notification is due instead of polling')
+        parser.add_argument('--backend', type=str, default=None,
+                            help='Dotted path overriding NOTIFICATION_BACKEND')
+
+    def handle(self, *args, **kwargs):
+        backend = get_backend(kwargs['backend'])
+        total_sent = total_failed = 0
+
+        try:
+            while True:
+                sent, failed = dispatch_batch(kwargs['batch_size'], backend)
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent}, failed {failed}')
+                    continue
+                if kwargs['once']:
+                    break
+                time.sleep(kwargs['sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Dispatched {total_sent} notifications, {total_failed} failed'))
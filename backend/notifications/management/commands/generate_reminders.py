@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.reminders import generate_reminders
+
+
+class Command(BaseCommand):
+    help = 'Create reminder notifications for appointments entering the reminder windows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--sleep', type=float, default=60.0,
+                            help='Seconds between scans')
+        parser.add_argument('--once', action='store_true',
+                            help='Scan once and exit')
+
+    def handle(self, *args, **kwargs):
+        try:
+            while True:
+                scanned = generate_reminders(chunk_size=kwargs['chunk_size'])
+                for window, count in scanned.items():
+                    if count:
+                        self.stdout.write(f'{window} min window: scanned {count} appointments')
+                if kwargs['once']:
+                    break
+                time.sleep(kwargs['sleep'])
+        except KeyboardInterrupt:
+            pass
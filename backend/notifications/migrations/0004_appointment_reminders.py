@@ -0,0 +1,34 @@
+# Generated by Django 3.2.12 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notification_dispatch_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_minutes', models.PositiveIntegerField(unique=True)),
+                ('scanned_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'reminder_watermarks',
+            },
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='reminder_window',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('reminder_window__isnull', False)), fields=('appointment', 'reminder_window'), name='unique_appointment_reminder'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.12 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_appointment_reminders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('APPOINTMENT_REMINDER', 'Appointment Reminder'), ('APPOINTMENT_CONFIRMATION', 'Appointment Confirmation'), ('APPOINTMENT_CANCELLATION', 'Appointment Cancellation'), ('APPOINTMENT_RESCHEDULED', 'Appointment Rescheduled'), ('GENERAL', 'General Notification')], max_length=25),
+        ),
+    ]
@@ -7,6 +7,7 @@ class Notification(models.Model):
         ('APPOINTMENT_REMINDER', 'Appointment Reminder'),
         ('APPOINTMENT_CONFIRMATION', 'Appointment Confirmation'),
         ('APPOINTMENT_CANCELLATION', 'Appointment Cancellation'),
+        ('APPOINTMENT_RESCHEDULED', 'Appointment Rescheduled'),
         ('GENERAL', 'General Notification'),
     ]
     
@@ -23,10 +24,45 @@ class Notification(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
     sent_at = models.DateTimeField(null=True, blank=True)
+    # delivery bookkeeping for the dispatch worker
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    claim_token = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+    # minutes before the appointment for APPOINTMENT_REMINDER rows
+    reminder_window = models.PositiveIntegerField(null=True, blank=True)
     
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['patient', 'created_at'], name='notif_patient_created_idx'),
+            models.Index(fields=['patient', 'status'], name='notif_patient_status_idx'),
+            models.Index(fields=['created_at'], name='notif_created_idx'),
+            # the pending queue stays small, so a partial index keeps it cheap to scan
+            models.Index(fields=['created_at'], condition=models.Q(status='PENDING'), name='notif_pending_idx'),
+        ]
+        constraints = [
+            # makes reminder generation idempotent across runs
+            models.UniqueConstraint(
+                fields=['appointment', 'reminder_window'],
+                condition=models.Q(reminder_window__isnull=False),
+                name='unique_appointment_reminder'
+            ),
+        ]
         
     def __str__(self):
-        return f"{self.get_notification_type_display()} for {self.patient}"
\ No newline at end of file
+        return f"{self.get_notification_type_display()} for {self.patient}"
+
+
+class ReminderWatermark(models.Model):
+    """How far ahead appointments have been scanned for one reminder window."""
+    window_minutes = models.PositiveIntegerField(unique=True)
+    scanned_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'reminder_watermarks'
+
+    def __str__(self):
+        return f"{self.window_minutes} min reminders scanned until {self.scanned_until}"
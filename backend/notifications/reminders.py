@@ -0,0 +1,124 @@
+"""
+Appointment reminder generation.
+
+For every window in ``APPOINTMENT_REMINDER_WINDOWS`` (minutes before the
+appointment) a watermark records how far ahead appointments have been
+scanned. Each run only reads the appointments that entered the window since
+the previous run, walking them in keyset order in chunks; every chunk is
+inserted with ``bulk_create`` in its own short transaction which also moves
+the watermark forward. The unique (appointment, reminder_window) constraint
+makes re-scanning harmless, so an interrupted or concurrent run never
+produces duplicates.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from appointments.models import Appointment
+from .models import Notification, ReminderWatermark
+
+
+def reminder_windows():
+    return sorted(settings.APPOINTMENT_REMINDER_WINDOWS)
+
+
+def format_when(value):
+    return value.strftime('%B %d, %Y at %I:%M %p')
+
+
+def _reminder(appointment_id, patient_id, appointment_datetime, doctor_first_name, doctor_last_name, window):
+    return Notification(
+        patient_id=patient_id,
+        appointment_id=appointment_id,
+        notification_type='APPOINTMENT_REMINDER',
+        reminder_window=window,
+        message=(
+            f"Reminder: your appointment with Dr. {doctor_first_name} {doctor_last_name} "
+            f"is on {format_when(appointment_datetime)}."
+        ),
+    )
+
+
+def _advance(window, value):
+    """Move the window's watermark forward to ``value``; it never moves back."""
+    if not ReminderWatermark.objects.filter(window_minutes=window, scanned_until__lt=value).update(scanned_until=value):
+        ReminderWatermark.objects.get_or_create(window_minutes=window, defaults={'scanned_until': value})
+
+
+def scan_window(window, now=None, chunk_size=None):
+    """
+    Create the reminders for appointments that entered ``window`` since the
+    last scan. Returns the number of appointments scanned.
+    """
+    now = now or timezone.now()
+    chunk_size = chunk_size or settings.APPOINTMENT_REMINDER_CHUNK_SIZE
+    horizon = now + datetime.timedelta(minutes=window)
+
+    watermark = ReminderWatermark.objects.filter(window_minutes=window).first()
+    start = max(watermark.scanned_until, now) if watermark else now
+    if start >= horizon:
+        return 0
+
+    upcoming = Appointment.objects.filter(status='SCHEDULED', appointment_datetime__lte=horizon)
+    last_datetime, last_id = start, 0
+    scanned = 0
+    while True:
+        chunk = list(
+            upcoming.filter(appointment_datetime__gte=last_datetime)
+            .filter(Q(appointment_datetime__gt=last_datetime) | Q(id__gt=last_id))
+            .order_by('appointment_datetime', 'id')
+            .values_list('id', 'patient_id', 'appointment_datetime', 'doctor__first_name', 'doctor__last_name')
+            [:chunk_size]
+        )
+        if not chunk:
+            break
+        with transaction.atomic():
+            Notification.objects.bulk_create([_reminder(*row, window) for row in chunk], ignore_conflicts=True)
+            _advance(window, chunk[-1][2])
+        scanned += len(chunk)
+        last_id, _, last_datetime = chunk[-1][:3]
+        if len(chunk) < chunk_size:
+            break
+
+    _advance(window, horizon)
+    return scanned
+
+
+def generate_reminders(now=None, chunk_size=None):
+    """Scan every configured window. Returns ``{window: appointments scanned}``."""
+    now = now or timezone.now()
+    return {window: scan_window(window, now, chunk_size) for window in reminder_windows()}
+
+
+def remind_late_bookings(appointments, now=None):
+    """
+    Cover bookings made after their time was already scanned, e.g. one booked
+    an hour ahead: each gets the reminder of the smallest window that has
+    passed it. Appointments need ``doctor`` loaded. Returns the number of
+    reminders created.
+    """
+    now = now or timezone.now()
+    upcoming = [a for a in appointments if a.status == 'SCHEDULED' and a.appointment_datetime > now]
+    if not upcoming:
+        return 0
+
+    watermarks = list(ReminderWatermark.objects.filter(
+        window_minutes__in=reminder_windows(),
+        scanned_until__gte=min(a.appointment_datetime for a in upcoming),
+    ).order_by('window_minutes').values_list('window_minutes', 'scanned_until'))
+
+    reminders = []
+    for appointment in upcoming:
+        window = next((w for w, scanned in watermarks if scanned >= appointment.appointment_datetime), None)
+        if window is not None:
+            doctor = appointment.doctor
+            reminders.append(_reminder(
+                appointment.id, appointment.patient_id, appointment.appointment_datetime,
+                doctor.first_name, doctor.last_name, window,
+            ))
+    Notification.objects.bulk_create(reminders, ignore_conflicts=True)
+    return len(reminders)
+
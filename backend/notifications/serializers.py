@@ -11,4 +11,4 @@ class NotificationSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Notification
-        fields = '__all__'
\ No newline at end of file
+        exclude = ['claim_token']
\ No newline at end of file
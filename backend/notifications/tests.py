@@ -1,3 +1,220 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.utils import timezone
+import datetime
+import io
+import json
+import os
+import tempfile
 
-# Create your tests here.
+from patients.models import Patient
+from doctors.models import Doctor
+from appointments.models import Appointment
+from appointments import events
+from core import outbox
+from notifications.models import Notification, ReminderWatermark
+from notifications.reminders import generate_reminders, scan_window
+from notifications.backends import BaseBackend, FileBackend
+from notifications.dispatch import claim_batch, dispatch_batch
+
+
+class RecordingBackend(BaseBackend):
+   def __init__(self, fail=()):
+       self.fail = set(fail)
+       self.sent = []
+
+   def send(self, notification):
+       if notification.id in self.fail:
+           raise RuntimeError('provider unavailable')
+       self.sent.append(notification.id)
+
+
+@override_settings(
+   NOTIFICATION_MAX_ATTEMPTS=3,
+   NOTIFICATION_RETRY_BACKOFF=60,
+   NOTIFICATION_RETRY_MAX_DELAY=3600,
+   NOTIFICATION_CLAIM_TIMEOUT=300,
+)
+class DispatchTests(TestCase):
+   def setUp(self):
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       self.notifications = [
+           Notification.objects.create(
+               patient=self.patient,
+               notification_type='GENERAL',
+               message=f'Message {i}'
+           )
+           for i in range(3)
+       ]
+
+   def test_batch_is_sent_and_marked(self):
+       backend = RecordingBackend()
+       self.assertEqual(dispatch_batch(10, backend), (3, 0))
+       self.assertEqual(len(backend.sent), 3)
+       for notification in Notification.objects.all():
+           self.assertEqual(notification.status, 'SENT')
+           self.assertIsNotNone(notification.sent_at)
+           self.assertEqual(notification.attempts, 1)
+           self.assertIsNone(notification.claim_token)
+       self.assertEqual(dispatch_batch(10, backend), (0, 0))
+
+   def test_claimed_rows_are_not_claimed_twice(self):
+       first = claim_batch(2)
+       second = claim_batch(10)
+       self.assertEqual(len(first), 2)
+       self.assertEqual(len(second), 1)
+       self.assertFalse({n.id for n in first} & {n.id for n in second})
+
+   def test_expired_claim_is_picked_up_again(self):
+       claim_batch(10)
+       later = timezone.now() + datetime.timedelta(seconds=301)
+       self.assertEqual(len(claim_batch(10, now=later)), 3)
+
+   def test_failure_is_retried_with_backoff_then_failed(self):
+       failing = self.notifications[0]
+       backend = RecordingBackend(fail=[failing.id])
+       self.assertEqual(dispatch_batch(10, backend), (2, 1))
+
+       failing.refresh_from_db()
+       self.assertEqual(failing.status, 'PENDING')
+       self.assertEqual(failing.last_error, 'provider unavailable')
+       first_retry = failing.next_attempt_at
+       self.assertGreater(first_retry, timezone.now() + datetime.timedelta(seconds=50))
+       # not due yet
+       self.assertEqual(dispatch_batch(10, backend), (0, 0))
+
+       dispatch_batch(10, backend, now=first_retry)
+       failing.refresh_from_db()
+       self.assertEqual(failing.attempts, 2)
+       self.assertGreater(failing.next_attempt_at - first_retry, datetime.timedelta(seconds=110))
+
+       dispatch_batch(10, backend, now=failing.next_attempt_at)
+       failing.refresh_from_db()
+       self.assertEqual(failing.status, 'FAILED')
+       self.assertEqual(failing.attempts, 3)
+       self.assertIsNone(failing.sent_at)
+
+   def test_file_backend_and_command(self):
+       with tempfile.TemporaryDirectory() as tmp:
+           path = os.path.join(tmp, 'notifications.log')
+           with override_settings(NOTIFICATION_FILE_PATH=path):
+               call_command(
+                   'dispatch_notifications', '--once', '--batch-size', '2',
+                   '--backend', 'notifications.backends.FileBackend',
+                   stdout=io.StringIO()
+               )
+           with open(path) as f:
+               lines = [json.loads(line) for line in f]
+       self.assertEqual(sorted(line['id'] for line in lines), sorted(n.id for n in self.notifications))
+       self.assertFalse(Notification.objects.filter(status='PENDING').exists())
+
+   def test_file_backend_reports_no_failures(self):
+       with tempfile.NamedTemporaryFile() as f:
+           self.assertEqual(FileBackend(f.name).send_batch(self.notifications), {})
+
+
+@override_settings(APPOINTMENT_REMINDER_WINDOWS=[1440, 120])
+class ReminderTests(TestCase):
+   def setUp(self):
+       self.now = timezone.now().replace(microsecond=0)
+       self.patient = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1990-01-01',
+           email='john.doe@example.com'
+       )
+       self.doctor = Doctor.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           email='jane.smith@example.com',
+           specialization='Cardiology'
+       )
+
+   def book(self, hours, status='SCHEDULED'):
+       return Appointment.objects.create(
+           patient=self.patient,
+           doctor=self.doctor,
+           appointment_datetime=self.now + datetime.timedelta(hours=hours),
+           status=status
+       )
+
+   def reminders(self, window=None):
+       reminders = Notification.objects.filter(notification_type='APPOINTMENT_REMINDER')
+       if window is not None:
+           reminders = reminders.filter(reminder_window=window)
+       return reminders
+
+   def test_reminders_for_each_window(self):
+       soon = self.book(1)
+       tomorrow = self.book(20)
+       self.book(30)
+       self.book(5, status='CANCELLED')
+
+       self.assertEqual(generate_reminders(self.now), {120: 1, 1440: 2})
+       self.assertEqual(set(self.reminders(1440).values_list('appointment_id', flat=True)), {soon.id, tomorrow.id})
+       self.assertEqual(list(self.reminders(120).values_list('appointment_id', flat=True)), [soon.id])
+       self.assertIn('Dr. Jane Smith', self.reminders(120).get().message)
+
+   def test_runs_are_idempotent_and_only_scan_new_range(self):
+       self.book(1)
+       later = self.book(25)
+       generate_reminders(self.now)
+       self.assertEqual(generate_reminders(self.now), {120: 0, 1440: 0})
+
+       # two hours on, only the newly entered part of each window is read
+       self.assertEqual(generate_reminders(self.now + datetime.timedelta(hours=2)), {120: 0, 1440: 1})
+       self.assertEqual(self.reminders().count(), 3)
+       self.assertTrue(self.reminders(1440).filter(appointment=later).exists())
+
+       # re-scanning from scratch does not duplicate anything
+       ReminderWatermark.objects.all().delete()
+       generate_reminders(self.now)
+       self.assertEqual(self.reminders().count(), 3)
+
+   def test_scan_walks_the_window_in_chunks(self):
+       for hours in range(1, 8):
+           self.book(hours)
+       self.assertEqual(scan_window(1440, self.now, chunk_size=2), 7)
+       self.assertEqual(self.reminders(1440).count(), 7)
+       self.assertEqual(
+           ReminderWatermark.objects.get(window_minutes=1440).scanned_until,
+           self.now + datetime.timedelta(minutes=1440)
+       )
+
+   def test_late_booking_gets_smallest_passed_window(self):
+       generate_reminders()
+       appointment = self.book(1)
+       events.appointment_created(appointment)
+       outbox.process_batch()
+       self.assertEqual(list(self.reminders().values_list('reminder_window', flat=True)), [120])
+
+   def test_reschedule_after_sent_reminder_is_reminded_again(self):
+       appointment = self.book(20)
+       generate_reminders(self.now)
+       self.reminders(1440).update(status='SENT', sent_at=self.now)
+
+       previous = appointment.appointment_datetime
+       appointment.appointment_datetime = self.now + datetime.timedelta(hours=44)
+       appointment.save()
+       events.appointments_rescheduled([(appointment, self.doctor.id, previous)])
+       outbox.process_batch()
+
+       generate_reminders(self.now + datetime.timedelta(hours=24))
+       self.assertEqual(self.reminders().filter(status='SENT', reminder_window=None).count(), 1)
+       reminder = self.reminders(1440).get()
+       self.assertEqual(reminder.status, 'PENDING')
+       self.assertIn(appointment.appointment_datetime.strftime('%B %d, %Y'), reminder.message)
+
+   def test_cancellation_drops_pending_reminders(self):
+       appointment = self.book(1)
+       generate_reminders(self.now)
+       appointment.status = 'CANCELLED'
+       appointment.save()
+       events.status_changed(appointment, 'SCHEDULED')
+       outbox.process_batch()
+       self.assertFalse(self.reminders().exists())
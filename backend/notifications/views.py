@@ -7,14 +7,18 @@ from rest_framework.response import Response
 
 from .models import Notification
 from .serializers import NotificationSerializer
+from core.prefetch import PrefetchPlanMixin
+from core.pagination import NewestFirstCursorPagination, paginated_response
 
 # Create your views here.
-class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class NotificationViewSet(PrefetchPlanMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NewestFirstCursorPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['patient', 'appointment', 'notification_type', 'status']
+    prefetch_actions = PrefetchPlanMixin.prefetch_actions + ('patient_notifications',)
     
     @action(detail=False, methods=['get'])
     def patient_notifications(self, request):
@@ -22,6 +26,5 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         if not patient_id:
             return Response({"detail": "Patient ID is required"}, status=status.HTTP_400_BAD_REQUEST)
             
-        notifications = Notification.objects.filter(patient_id=patient_id)
-        serializer = self.get_serializer(notifications, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        notifications = self.get_queryset().filter(patient_id=patient_id)
+        return paginated_response(self, notifications, self.get_serializer_class())
\ No newline at end of file
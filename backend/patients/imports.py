@@ -0,0 +1,187 @@
+"""
+Bulk patient import from CSV or NDJSON.
+
+The input is read as a stream, one row at a time, and handled in chunks of
+``batch_size`` rows: every row is validated with the ``PatientSerializer``
+rules, emails already in the database are found with one query per chunk,
+and the new patients are written with one ``bulk_create`` per chunk together
+with their search documents and lookup keys. Rows that fail validation or
+repeat an email (in the file or in the database) are reported and skipped;
+the rest of the import carries on. A chunk that keeps failing to write is
+retried row by row and the rows that cannot be saved are reported as failed.
+"""
+import csv
+import io
+import itertools
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from search.index import index_objects
+from .lookup import index_patients
+from .models import Patient
+from .serializers import PatientImportSerializer
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+class ImportReport:
+    def __init__(self, max_errors=None):
+        self.max_errors = settings.PATIENT_IMPORT_MAX_ERRORS if max_errors is None else max_errors
+        self.rows = 0
+        self.created = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+def format_for(filename, default='csv'):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return {'ndjson': 'ndjson', 'jsonl': 'ndjson', 'csv': 'csv'}.get(extension, default)
+
+
+def text_stream(binary):
+    """Decode a binary file object lazily, dropping a UTF-8 byte order mark."""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+def count_rows(binary, format='csv', limit=None):
+    """
+    Count the rows of a seekable binary upload, stopping after ``limit`` + 1,
+    and rewind it so it can be imported.
+    """
+    stream = text_stream(binary)
+    try:
+        rows = read_rows(stream, format)
+        if limit is not None:
+            rows = itertools.islice(rows, limit + 1)
+        return sum(1 for _ in rows)
+    finally:
+        # keep the upload open for the import itself
+        stream.detach()
+        binary.seek(0)
+
+
+def read_rows(stream, format='csv'):
+    """
+    Yield ``(row number, dict)`` from a text stream. Empty CSV cells are left
+    out so that optional columns may be blank.
+    """
+    if format == 'csv':
+        # row 1 is the header
+        for number, row in enumerate(csv.DictReader(stream), 2):
+            yield number, {key: value for key, value in row.items() if key and value not in ('', None)}
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            row = error
+        yield number, row
+
+
+def _validate(chunk, report, seen):
+    """Return the valid, unseen rows of ``chunk`` as ``(row number, validated data)``."""
+    valid = []
+    # one serializer validates every row, so its fields are built once per chunk
+    serializer = PatientImportSerializer()
+    for number, row in chunk:
+        if not isinstance(row, dict):
+            report.error(number, {'non_field_errors': [f'Invalid JSON object: {row}']})
+            continue
+        try:
+            data = serializer.run_validation(row)
+        except ValidationError as error:
+            report.error(number, as_serializer_error(error))
+            continue
+        if data['email'] in seen:
+            report.duplicates += 1
+            continue
+        seen.add(data['email'])
+        valid.append((number, data))
+    return valid
+
+
+def _existing_emails(valid):
+    return set(Patient.objects.filter(email__in=[data['email'] for _, data in valid]).values_list('email', flat=True))
+
+
+def _write(valid, dry_run=False):
+    """Create the patients of ``valid`` that are not in the database yet; returns (created, duplicates)."""
+    existing = _existing_emails(valid)
+    new = [data for _, data in valid if data['email'] not in existing]
+    if not new or dry_run:
+        return len(new), len(existing)
+    with transaction.atomic():
+        Patient.objects.bulk_create([Patient(**data) for data in new])
+        # bulk_create skips signals and does not return ids on every backend
+        patients = list(Patient.objects.filter(email__in=[data['email'] for data in new]))
+        index_patients(patients)
+        index_objects('patient', patients)
+    return len(new), len(existing)
+
+
+def _write_rows(valid, report):
+    """Write ``valid`` one row at a time, reporting the rows that still fail; returns (created, duplicates)."""
+    created = duplicates = 0
+    for number, data in valid:
+        try:
+            row_created, row_duplicates = _write([(number, data)])
+        except IntegrityError as error:
+            report.error(number, {'non_field_errors': [f'Could not be saved: {error}']})
+            continue
+        created += row_created
+        duplicates += row_duplicates
+    return created, duplicates
+
+
+def import_patients(rows, batch_size=None, dry_run=False, progress=None, max_errors=None):
+    """
+    Import ``(row number, dict)`` pairs as produced by ``read_rows``. Calls
+    ``progress(report)`` after every chunk and returns the ``ImportReport``.
+    With ``dry_run`` rows are validated and deduplicated but nothing is written.
+    """
+    batch_size = batch_size or settings.PATIENT_IMPORT_BATCH_SIZE
+    report = ImportReport(max_errors)
+    seen = set()
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, batch_size))
+        if not chunk:
+            break
+        report.rows += len(chunk)
+        valid = _validate(chunk, report, seen)
+        if valid:
+            try:
+                created, duplicates = _write(valid, dry_run)
+            except IntegrityError:
+                # a concurrent insert took one of the emails; retry against the new state
+                try:
+                    created, duplicates = _write(valid, dry_run)
+                except IntegrityError:
+                    # still failing: find the offending rows and keep the rest of the chunk
+                    created, duplicates = _write_rows(valid, report)
+            report.created += created
+            report.duplicates += duplicates
+        if progress:
+            progress(report)
+    return report
@@ -0,0 +1,127 @@
+"""
+Fuzzy patient lookup for check-in.
+
+Every patient has a set of precomputed keys in ``PatientLookupKey``:
+trigrams of the name words and of the email's local part, a Soundex code per
+name word and trigrams of the phone number's digits. A query is broken into
+keys the same way and patients are ranked by the weight of the keys they
+share with it, so misspellings ("Jhon Smtih") still meet on the phonetic
+codes and partial phone numbers on the digit trigrams. Ranking is one
+indexed ``GROUP BY`` over the matching keys, capped at ``limit`` rows.
+"""
+import math
+import re
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .models import PatientLookupKey
+
+WORDS = re.compile(r'[^\W\d_]+')
+DIGITS = re.compile(r'\d+')
+
+TRIGRAM_WEIGHT = 1
+PHONETIC_WEIGHT = 2
+# query keys beyond this are ignored
+MAX_QUERY_KEYS = 48
+# share of the query's key weight a candidate must match
+MIN_SIMILARITY = 0.3
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def soundex(word):
+    word = word.lower()
+    code, previous = word[0].upper(), SOUNDEX_CODES.get(word[0])
+    for char in word[1:]:
+        digit = SOUNDEX_CODES.get(char)
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def trigrams(value, pad='$', prefix=False):
+    padded = f'{pad}{value}' + ('' if prefix else pad) if pad else value
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _text_keys(text, phonetic=True, prefix=False):
+    """Keys of the words in ``text``; with ``prefix`` the last word may be unfinished."""
+    keys = {}
+    words = [word for word in WORDS.findall(text.lower()) if len(word) >= 2]
+    for position, word in enumerate(words, 1):
+        partial = prefix and position == len(words)
+        for gram in trigrams(word, prefix=partial):
+            keys[f't:{gram}'] = TRIGRAM_WEIGHT
+        if phonetic and (not partial or len(word) >= 4):
+            keys[f's:{soundex(word)}'] = PHONETIC_WEIGHT
+    return keys
+
+
+def _digit_keys(text):
+    keys = {}
+    for run in DIGITS.findall(text):
+        for gram in trigrams(run, pad=None):
+            keys[f'd:{gram}'] = TRIGRAM_WEIGHT
+    return keys
+
+
+def lookup_keys(first_name, last_name, email, phone):
+    """``{key: weight}`` stored for a patient."""
+    keys = _text_keys(f'{first_name} {last_name}')
+    keys.update(_text_keys((email or '').split('@')[0], phonetic=False))
+    # separators inside phone numbers vary, so the digits are indexed as one run
+    keys.update(_digit_keys(''.join(DIGITS.findall(phone or ''))))
+    return keys
+
+
+def query_keys(text):
+    # the last word is still being typed unless the query ends in a space
+    keys = _text_keys(text, prefix=not text[-1:].isspace())
+    keys.update(_digit_keys(text))
+    return dict(sorted(keys.items(), key=lambda item: (-item[1], item[0]))[:MAX_QUERY_KEYS])
+
+
+def index_patients(patients):
+    """Replace the lookup keys of ``patients`` in one delete and one batched insert."""
+    rows = [
+        (patient.pk, key, weight)
+        for patient in patients
+        for key, weight in lookup_keys(patient.first_name, patient.last_name, patient.email, patient.phone).items()
+    ]
+    quote = connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {quote(PatientLookupKey._meta.db_table)} ({quote('patient_id')}, {quote('key')}, {quote('weight')}) "
+        f"VALUES (%s, %s, %s)"
+    )
+    with transaction.atomic():
+        PatientLookupKey.objects.filter(patient_id__in=[patient.pk for patient in patients]).delete()
+        # plain executemany: imports write tens of keys per patient and model
+        # instances would cost more than the insert itself
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+    return len(rows)
+
+
+def find_candidates(text, limit=10):
+    """Return up to ``limit`` ``(patient_id, similarity)`` pairs, best first."""
+    keys = query_keys(text)
+    if not keys:
+        return []
+    total = sum(keys.values())
+    ranked = (
+        PatientLookupKey.objects.filter(key__in=list(keys))
+        .values('patient_id')
+        .annotate(score=Sum('weight'))
+        .filter(score__gte=max(1, math.ceil(total * MIN_SIMILARITY)))
+        .order_by('-score', 'patient_id')
+        .values_list('patient_id', 'score')[:limit]
+    )
+    return [(patient_id, round(min(score / total, 1.0), 4)) for patient_id, score in ranked]
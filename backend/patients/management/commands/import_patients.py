@@ -0,0 +1,55 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from patients.imports import IMPORT_FORMATS, format_for, import_patients, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import patients from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help="File to import, or - for standard input")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, default=None,
+                            help='Input format; guessed from the file extension by default')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate and deduplicate without writing')
+        parser.add_argument('--errors', type=str, default=None,
+                            help='Write the row errors to this file as NDJSON')
+
+    def handle(self, *args, **kwargs):
+        path = kwargs['path']
+        format = kwargs['format'] or format_for(path)
+        started = time.monotonic()
+
+        def progress(report):
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{report.rows} rows: {report.created} created, {report.duplicates} duplicates, '
+                f'{report.failed} failed ({report.rows / elapsed if elapsed else 0:.0f} rows/s)'
+            )
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        except OSError as error:
+            raise CommandError(error)
+        with stream:
+            report = import_patients(
+                read_rows(stream, format), kwargs['batch_size'], kwargs['dry_run'], progress,
+            )
+
+        if kwargs['errors']:
+            with open(kwargs['errors'], 'w') as errors:
+                for error in report.errors:
+                    errors.write(json.dumps(error) + '\n')
+        for error in report.errors[:20]:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+
+        verb = 'Would create' if kwargs['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {report.created} patients from {report.rows} rows '
+            f'({report.duplicates} duplicates, {report.failed} failed)'
+        ))
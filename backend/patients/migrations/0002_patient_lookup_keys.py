@@ -0,0 +1,101 @@
+# Generated by Django 3.2.12 on 2026-10-18 07:11
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# frozen copy of the key builders in patients.lookup as they were when this
+# migration was written, so later changes there do not alter it
+WORDS = re.compile(r'[^\W\d_]+')
+DIGITS = re.compile(r'\d+')
+
+TRIGRAM_WEIGHT = 1
+PHONETIC_WEIGHT = 2
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def soundex(word):
+    word = word.lower()
+    code, previous = word[0].upper(), SOUNDEX_CODES.get(word[0])
+    for char in word[1:]:
+        digit = SOUNDEX_CODES.get(char)
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def trigrams(value, pad='$'):
+    padded = f'{pad}{value}{pad}' if pad else value
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _text_keys(text, phonetic=True):
+    keys = {}
+    for word in WORDS.findall(text.lower()):
+        if len(word) < 2:
+            continue
+        for gram in trigrams(word):
+            keys[f't:{gram}'] = TRIGRAM_WEIGHT
+        if phonetic:
+            keys[f's:{soundex(word)}'] = PHONETIC_WEIGHT
+    return keys
+
+
+def _digit_keys(text):
+    return {f'd:{gram}': TRIGRAM_WEIGHT for run in DIGITS.findall(text) for gram in trigrams(run, pad=None)}
+
+
+def lookup_keys(first_name, last_name, email, phone):
+    keys = _text_keys(f'{first_name} {last_name}')
+    keys.update(_text_keys((email or '').split('@')[0], phonetic=False))
+    keys.update(_digit_keys(''.join(DIGITS.findall(phone or ''))))
+    return keys
+
+
+def index_existing_patients(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    PatientLookupKey = apps.get_model('patients', 'PatientLookupKey')
+    rows = []
+    for patient in Patient.objects.order_by('pk').iterator(chunk_size=1000):
+        keys = lookup_keys(patient.first_name, patient.last_name, patient.email, patient.phone)
+        rows.extend(PatientLookupKey(patient_id=patient.pk, key=key, weight=weight) for key, weight in keys.items())
+        if len(rows) >= 10000:
+            PatientLookupKey.objects.bulk_create(rows)
+            rows = []
+    PatientLookupKey.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientLookupKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=16)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lookup_keys', to='patients.patient')),
+            ],
+            options={
+                'db_table': 'patient_lookup_keys',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='patientlookupkey',
+            constraint=models.UniqueConstraint(fields=('key', 'patient'), name='unique_patient_lookup_key'),
+        ),
+        migrations.RunPython(index_existing_patients, migrations.RunPython.noop),
+    ]
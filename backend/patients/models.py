@@ -17,4 +17,17 @@ class Patient(models.Model):
         return f"{self.first_name}{self.last_name}"
     
     class Meta:
-        ordering = ["last_name", 'first_name']
\ No newline at end of file
+        ordering = ["last_name", 'first_name']
+
+
+class PatientLookupKey(models.Model):
+    """One n-gram or phonetic key of a patient, see ``patients.lookup``."""
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='lookup_keys')
+    key = models.CharField(max_length=16)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        db_table = 'patient_lookup_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'patient'], name='unique_patient_lookup_key'),
+        ]
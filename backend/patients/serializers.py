@@ -9,4 +9,10 @@ class PatientSerializer(serializers.ModelSerializer):
 class PatientListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Patient
-        fields = ['id', 'first_name', 'last_name', 'email', 'phone']
\ No newline at end of file
+        fields = ['id', 'first_name', 'last_name', 'email', 'phone']
+
+
+class PatientImportSerializer(PatientSerializer):
+    """PatientSerializer for bulk imports; email uniqueness is checked per chunk instead of per row."""
+    class Meta(PatientSerializer.Meta):
+        extra_kwargs = {'email': {'validators': []}}
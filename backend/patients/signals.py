@@ -0,0 +1,26 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .models import Patient
+from .lookup import index_patients
+
+LOOKUP_FIELDS = ('first_name', 'last_name', 'email', 'phone')
+
+
+def _lookup_values(patient):
+    # read from __dict__ so deferred fields are not loaded one query per row
+    return tuple(patient.__dict__.get(field) for field in LOOKUP_FIELDS)
+
+
+@receiver(post_init, sender=Patient)
+def remember_lookup_values(sender, instance, **kwargs):
+    instance._lookup_values = _lookup_values(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Patient)
+def patient_saved(sender, instance, created, raw=False, **kwargs):
+    # keys are removed with the patient by the foreign key's cascade
+    if raw or (not created and instance._lookup_values == _lookup_values(instance)):
+        return
+    index_patients([instance])
+    instance._lookup_values = _lookup_values(instance)
@@ -1,3 +1,207 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import IntegrityError, connection
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+import io
+import json
+from unittest import mock
+import os
+import tempfile
 
-# Create your tests here.
+from .models import Patient, PatientLookupKey
+from .lookup import find_candidates, soundex
+from .imports import import_patients, read_rows
+from . import imports
+from search import engine
+
+
+User = get_user_model()
+
+
+class PatientLookupTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.john = Patient.objects.create(
+           first_name='John',
+           last_name='Smith',
+           date_of_birth='1990-01-01',
+           email='john.smith@example.com',
+           phone='(555) 123-4567'
+       )
+       self.joan = Patient.objects.create(
+           first_name='Joan',
+           last_name='Smythe',
+           date_of_birth='1975-03-02',
+           email='joan@example.com',
+           phone='555-987-6543'
+       )
+       self.mary = Patient.objects.create(
+           first_name='Mary',
+           last_name='Jones',
+           date_of_birth='1980-07-07',
+           email='mary.jones@example.com'
+       )
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def ids(self, query, limit=10):
+       return [patient_id for patient_id, _ in find_candidates(query, limit)]
+
+   def test_soundex(self):
+       self.assertEqual(soundex('Robert'), 'R163')
+       self.assertEqual(soundex('Rupert'), 'R163')
+       self.assertEqual(soundex('Ashcraft'), 'A261')
+       self.assertEqual(soundex('Lee'), 'L000')
+
+   def test_misspelled_names(self):
+       self.assertEqual(self.ids('Jhon Smtih')[0], self.john.id)
+       self.assertEqual(self.ids('joan smyth')[:2], [self.joan.id, self.john.id])
+       self.assertNotIn(self.mary.id, self.ids('jhon smtih'))
+
+   def test_partial_input(self):
+       self.assertEqual(self.ids('mar'), [self.mary.id])
+       self.assertEqual(self.ids('4567'), [self.john.id])
+       self.assertEqual(self.ids('smith 555-123'), [self.john.id, self.joan.id])
+
+   def test_keys_follow_edits(self):
+       self.mary.last_name = 'Poppins'
+       self.mary.email = 'mary.poppins@example.com'
+       self.mary.save()
+       self.assertEqual(self.ids('poppins'), [self.mary.id])
+       self.assertNotIn(self.mary.id, self.ids('jones '))
+
+       self.mary.delete()
+       self.assertFalse(PatientLookupKey.objects.filter(patient_id=self.mary.id).exists())
+
+   def test_unchanged_save_keeps_keys(self):
+       keys = list(PatientLookupKey.objects.filter(patient=self.john).values_list('id', flat=True))
+       self.john.address = '1 Main St'
+       self.john.save()
+       self.assertEqual(list(PatientLookupKey.objects.filter(patient=self.john).values_list('id', flat=True)), keys)
+
+   def test_lookup_endpoint(self):
+       with self.assertNumQueries(2):
+           response = self.client.get('/api/patients/lookup/', {'q': 'jon smith', 'limit': 1})
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       self.assertEqual([p['id'] for p in response.data['results']], [self.john.id])
+       self.assertGreater(response.data['results'][0]['similarity'], 0)
+       self.assertIn('lookup;dur=', response['Server-Timing'])
+
+       self.assertEqual(self.client.get('/api/patients/lookup/').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PatientImportTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       Patient.objects.create(
+           first_name='Existing',
+           last_name='Patient',
+           date_of_birth='1970-01-01',
+           email='existing@example.com'
+       )
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def csv_rows(self, count, start=0):
+       lines = ['first_name,last_name,date_of_birth,email,phone']
+       lines += [f'Pat{i},Import{i},1990-01-{i % 28 + 1:02d},pat{i}@example.com,' for i in range(start, start + count)]
+       return '\n'.join(lines) + '\n'
+
+   def test_csv_import_dedupes_and_reports_errors(self):
+       data = self.csv_rows(3) + (
+           'Dup,Row,1990-01-01,pat1@example.com,\n'
+           'Old,Row,1990-01-01,existing@example.com,\n'
+           'Bad,Row,not-a-date,bad@example.com,\n'
+       )
+       report = import_patients(read_rows(io.StringIO(data)), batch_size=2)
+       self.assertEqual((report.rows, report.created, report.duplicates, report.failed), (6, 3, 2, 1))
+       self.assertEqual(report.errors[0]['row'], 7)
+       self.assertIn('date_of_birth', report.errors[0]['errors'])
+       self.assertEqual(Patient.objects.filter(email__startswith='pat').count(), 3)
+
+       # bulk-created patients are searchable and found by the check-in lookup
+       pat2 = Patient.objects.get(email='pat2@example.com')
+       self.assertEqual([row[1] for row in engine.search('pat2 import2')], [pat2.id])
+       self.assertIn(pat2.id, [patient_id for patient_id, _ in find_candidates('pat import')])
+
+   def test_chunk_that_keeps_failing_is_written_row_by_row(self):
+       index_patients = imports.index_patients
+
+       def failing(patients):
+           if any(patient.email == 'pat1@example.com' for patient in patients):
+               raise IntegrityError('constraint failed')
+           index_patients(patients)
+
+       with mock.patch.object(imports, 'index_patients', side_effect=failing):
+           report = import_patients(read_rows(io.StringIO(self.csv_rows(3))), batch_size=3)
+       self.assertEqual((report.rows, report.created, report.failed), (3, 2, 1))
+       self.assertEqual(report.errors[0]['row'], 3)
+       self.assertEqual(
+           set(Patient.objects.filter(email__startswith='pat').values_list('email', flat=True)),
+           {'pat0@example.com', 'pat2@example.com'}
+       )
+
+   def test_queries_per_chunk_do_not_grow_with_rows(self):
+       def queries(count, start):
+           with CaptureQueriesContext(connection) as captured:
+               import_patients(read_rows(io.StringIO(self.csv_rows(count, start))), batch_size=100)
+           return len(captured)
+       self.assertEqual(queries(5, 0), queries(15, 100))
+
+   def test_dry_run_writes_nothing(self):
+       report = import_patients(read_rows(io.StringIO(self.csv_rows(4))), dry_run=True)
+       self.assertEqual(report.created, 4)
+       self.assertEqual(Patient.objects.count(), 1)
+
+   def test_command(self):
+       with tempfile.TemporaryDirectory() as directory:
+           path = os.path.join(directory, 'patients.csv')
+           with open(path, 'w') as handle:
+               handle.write(self.csv_rows(5))
+           out = io.StringIO()
+           call_command('import_patients', path, '--batch-size', '2', stdout=out)
+       self.assertIn('Created 5 patients from 5 rows', out.getvalue())
+       self.assertEqual(Patient.objects.count(), 6)
+
+   def test_ndjson_upload(self):
+       lines = [
+           json.dumps({'first_name': 'Ann', 'last_name': 'Lee', 'date_of_birth': '1991-02-03', 'email': 'ann@example.com'}),
+           '{not json',
+           json.dumps({'first_name': 'No', 'last_name': 'Email', 'date_of_birth': '1991-02-03'}),
+       ]
+       upload = SimpleUploadedFile('patients.ndjson', ('\n'.join(lines) + '\n').encode())
+       response = self.client.post('/api/patients/import/', {'file': upload}, format='multipart')
+       self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+       self.assertEqual((response.data['created'], response.data['failed']), (1, 2))
+       self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+       self.assertTrue(Patient.objects.filter(email='ann@example.com').exists())
+
+       response = self.client.post('/api/patients/import/', {}, format='multipart')
+       self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+   @override_settings(PATIENT_IMPORT_MAX_ROWS=3)
+   def test_upload_over_the_row_limit_is_refused(self):
+       upload = SimpleUploadedFile('patients.csv', self.csv_rows(4).encode())
+       response = self.client.post('/api/patients/import/', {'file': upload}, format='multipart')
+       self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+       self.assertEqual(Patient.objects.count(), 1)
+
+       upload = SimpleUploadedFile('patients.csv', self.csv_rows(3).encode())
+       response = self.client.post('/api/patients/import/', {'file': upload}, format='multipart')
+       self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+       self.assertEqual(response.data['created'], 3)
@@ -1,20 +1,96 @@
 from django.shortcuts import render
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+import time
+
 from .models import Patient
 from .serializers import PatientSerializer, PatientListSerializer
+from .lookup import find_candidates
+from .imports import IMPORT_FORMATS, count_rows, format_for, import_patients, read_rows, text_stream
+from core.conditional import ConditionalGetMixin
+from core.export import StreamingExportMixin
+from search.filters import FullTextSearchFilter
+
+# candidates returned by the check-in lookup
+LOOKUP_LIMIT = 10
+MAX_LOOKUP_LIMIT = 25
 
 # Create your views here.
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(ConditionalGetMixin, StreamingExportMixin, viewsets.ModelViewSet):
     queryset = Patient.objects.all()
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['insurance_provider']
-    search_fields = ['first_name', 'last_name', 'email']
+    search_kind = 'patient'
+    export_fields = [
+        'id', 'first_name', 'last_name', 'date_of_birth', 'email', 'phone', 'address',
+        'insurance_provider', 'insurance_id', 'created_at', 'updated_at',
+    ]
     
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'lookup'):
             return PatientListSerializer
         return PatientSerializer
+
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        """Fuzzy top-k match on name, email and phone for check-in."""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"detail": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', LOOKUP_LIMIT)), MAX_LOOKUP_LIMIT))
+        except ValueError:
+            return Response({"detail": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        started = time.perf_counter()
+        candidates = find_candidates(request.query_params['q'], limit)
+        patients = Patient.objects.in_bulk([patient_id for patient_id, _ in candidates])
+        results = [
+            {**self.get_serializer(patients[patient_id]).data, 'similarity': similarity}
+            for patient_id, similarity in candidates if patient_id in patients
+        ]
+        took_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        response = Response({'query': query, 'took_ms': took_ms, 'results': results})
+        response['Server-Timing'] = f'lookup;dur={took_ms}'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Import the CSV or NDJSON ``file`` upload. ``format`` overrides the
+        format guessed from the file name; ``dry_run`` only validates.
+        The import runs within the request, so uploads of more than
+        ``PATIENT_IMPORT_MAX_ROWS`` rows are refused with 413; larger files
+        go through ``python manage.py import_patients``.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"detail": "file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        format = request.data.get('format') or format_for(upload.name)
+        if format not in IMPORT_FORMATS:
+            return Response(
+                {"detail": f"format must be one of: {', '.join(IMPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+        max_rows = settings.PATIENT_IMPORT_MAX_ROWS
+        if count_rows(upload.file, format, max_rows) > max_rows:
+            return Response(
+                {"detail": f"Uploads are limited to {max_rows} rows; use the import_patients command for larger files."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        report = import_patients(read_rows(text_stream(upload.file), format), dry_run=dry_run)
+        return Response(
+            {**report.as_dict(), 'dry_run': dry_run},
+            status=status.HTTP_200_OK if dry_run or not report.created else status.HTTP_201_CREATED
+        )
@@ -0,0 +1,23 @@
+"""Outbox events published by medical record writes."""
+from core import outbox
+
+RECORD_CREATED = 'record.created'
+RECORD_UPDATED = 'record.updated'
+
+
+def _payload(record, user):
+    return {
+        'record_id': record.id,
+        'patient_id': record.patient_id,
+        'doctor_id': record.doctor_id,
+        'appointment_id': record.appointment_id,
+        'user_id': user.id if user else None,
+    }
+
+
+def record_created(record, user=None):
+    return outbox.publish(RECORD_CREATED, record, _payload(record, user))
+
+
+def record_updated(record, user=None):
+    return outbox.publish(RECORD_UPDATED, record, _payload(record, user))
@@ -20,6 +20,11 @@ class MedicalRecord(models.Model):
     class Meta:
         db_table = 'medical_records'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['patient', 'created_at'], name='record_patient_created_idx'),
+            models.Index(fields=['doctor', 'created_at'], name='record_doctor_created_idx'),
+            models.Index(fields=['created_at'], name='record_created_idx'),
+        ]
         
     def __str__(self):
         return f"Medical Record for {self.patient} on {self.created_at.date()}"
\ No newline at end of file
@@ -1,5 +1,6 @@
 # records/tests.py
 from django.test import TestCase, Client
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -222,8 +223,8 @@ class PatientAPITests(TestCase):
    def test_get_patients_list(self):
        response = self.client.get('/api/patients/')
        self.assertEqual(response.status_code, status.HTTP_200_OK)
-       self.assertEqual(len(response.data), 1)
-       self.assertEqual(response.data[0]['first_name'], 'John')
+       self.assertEqual(len(response.data['results']), 1)
+       self.assertEqual(response.data['results'][0]['first_name'], 'John')
 
    def test_get_patient_detail(self):
        response = self.client.get(f'/api/patients/{self.patient.id}/')
@@ -297,8 +298,8 @@ class DoctorAPITests(TestCase):
    def test_get_doctors_list(self):
        response = self.client.get('/api/doctors/')
        self.assertEqual(response.status_code, status.HTTP_200_OK)
-       self.assertEqual(len(response.data), 1)
-       self.assertEqual(response.data[0]['first_name'], 'Jane')
+       self.assertEqual(len(response.data['results']), 1)
+       self.assertEqual(response.data['results'][0]['first_name'], 'Jane')
 
    def test_get_doctor_detail(self):
        response = self.client.get(f'/api/doctors/{self.doctor.id}/')
@@ -405,7 +406,7 @@ class AppointmentAPITests(TestCase):
    def test_get_appointments_list(self):
        response = self.client.get('/api/appointments/')
        self.assertEqual(response.status_code, status.HTTP_200_OK)
-       self.assertEqual(len(response.data), 1)
+       self.assertEqual(len(response.data['results']), 1)
 
    def test_get_appointment_detail(self):
        response = self.client.get(f'/api/appointments/{self.appointment.id}/')
@@ -437,6 +438,7 @@ class AppointmentAPITests(TestCase):
 
 class MedicalRecordAPITests(TestCase):
    def setUp(self):
+       cache.clear()
        self.client = APIClient()
        self.staff_user = User.objects.create_user(
            username='staffuser',
@@ -489,7 +491,7 @@ class MedicalRecordAPITests(TestCase):
    def test_get_records_list(self):
        response = self.client.get('/api/records/')
        self.assertEqual(response.status_code, status.HTTP_200_OK)
-       self.assertEqual(len(response.data), 1)
+       self.assertEqual(len(response.data['results']), 1)
 
    def test_get_record_detail(self):
        response = self.client.get(f'/api/records/{self.medical_record.id}/')
@@ -515,13 +517,14 @@ class MedicalRecordAPITests(TestCase):
    def test_patient_records(self):
        response = self.client.get(f'/api/records/patient_records/?patient_id={self.patient.id}')
        self.assertEqual(response.status_code, status.HTTP_200_OK)
-       self.assertEqual(len(response.data), 1)
-       self.assertEqual(response.data[0]['diagnosis'], 'Hypertension')
+       self.assertEqual(len(response.data['results']), 1)
+       self.assertEqual(response.data['results'][0]['diagnosis'], 'Hypertension')
 
 
       
 class DoctorSpecificAPITests(TestCase):
    def setUp(self):
+       cache.clear()
        self.client = APIClient()
        self.doctor_user = User.objects.create_user(
            username='doctoruser',
@@ -597,21 +600,21 @@ class DoctorSpecificAPITests(TestCase):
    def test_my_appointments(self):
        response = self.client.get('/api/doctors/my_appointments/')
        self.assertEqual(response.status_code, status.HTTP_200_OK)
-       self.assertEqual(len(response.data), 2)
+       self.assertEqual(len(response.data['results']), 2)
 
    def test_my_patients(self):
        response = self.client.get('/api/doctors/my_patients/')
        self.assertEqual(response.status_code, status.HTTP_200_OK)
-       self.assertEqual(len(response.data), 2)
-       patient_names = [patient['first_name'] for patient in response.data]
+       self.assertEqual(len(response.data['results']), 2)
+       patient_names = [patient['first_name'] for patient in response.data['results']]
        self.assertIn('John', patient_names)
        self.assertIn('Alice', patient_names)
 
    def test_my_records(self):
        response = self.client.get('/api/doctors/my_records/')
        self.assertEqual(response.status_code, status.HTTP_200_OK)
-       self.assertGreaterEqual(len(response.data), 1)
-       self.assertEqual(response.data[0]['diagnosis'], 'Hypertension')
+       self.assertGreaterEqual(len(response.data['results']), 1)
+       self.assertEqual(response.data['results'][0]['diagnosis'], 'Hypertension')
 
    def test_create_medical_record_as_doctor(self):
        new_record_data = {
@@ -640,6 +643,7 @@ class DoctorSpecificAPITests(TestCase):
 
 class PermissionTests(TestCase):
    def setUp(self):
+       cache.clear()
        self.client = APIClient()
        
        self.staff_user = User.objects.create_user(
@@ -4,17 +4,31 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Doctor
+from django.db import transaction
 from .models import MedicalRecord
 from .serializers import MedicalRecordSerializer
+from . import events
+from core.conditional import ConditionalGetMixin
+from core.prefetch import PrefetchPlanMixin
+from core.pagination import NewestFirstCursorPagination, paginated_response
+from core.export import StreamingExportMixin
+from doctors.access import request_doctor
+from search.filters import FullTextSearchFilter
 
 # Create your views here.
-class MedicalRecordViewSet(viewsets.ModelViewSet):
+class MedicalRecordViewSet(ConditionalGetMixin, StreamingExportMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = MedicalRecord.objects.all()
     serializer_class = MedicalRecordSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    pagination_class = NewestFirstCursorPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['patient', 'appointment']
+    search_kind = 'record'
+    prefetch_actions = PrefetchPlanMixin.prefetch_actions + ('patient_records',)
+    export_fields = [
+        'id', 'patient', 'patient__first_name', 'patient__last_name', 'doctor', 'appointment',
+        'diagnosis', 'symptoms', 'prescription', 'notes', 'created_at', 'updated_at',
+    ]
     
     @action(detail=False, methods=['get'])
     def patient_records(self, request):
@@ -22,29 +36,27 @@ class MedicalRecordViewSet(viewsets.ModelViewSet):
         if not patient_id:
             return Response({"detail": "Patient ID is required"}, status=status.HTTP_400_BAD_REQUEST)
             
-        records = MedicalRecord.objects.filter(patient_id=patient_id)
-        serializer = self.get_serializer(records, many=True)
-        return Response(serializer.data)
+        records = self.get_queryset().filter(patient_id=patient_id)
+        return paginated_response(self, records, self.get_serializer_class())
         
     
-    def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user, updated_by=self.request.user)
-        
+    @transaction.atomic
     def perform_update(self, serializer):
-        serializer.save(updated_by=self.request.user)
-        
-        
+        record = serializer.save(updated_by_id=self.request.user.id)
+        events.record_updated(record, self.request.user)
         
+    @transaction.atomic
     def perform_create(self, serializer):
-        try:
-            doctor = Doctor.objects.get(user=self.request.user.id)
-            serializer.save(
+        doctor = request_doctor(self.request, required=False)
+        if doctor:
+            record = serializer.save(
                 doctor=doctor,
-                created_by=self.request.user, 
-                updated_by=self.request.user
+                created_by_id=self.request.user.id, 
+                updated_by_id=self.request.user.id
+            )
+        else:
+            record = serializer.save(
+                created_by_id=self.request.user.id, 
+                updated_by_id=self.request.user.id
             )
-        except Doctor.DoesNotExist:
-            serializer.save(
-                created_by=self.request.user, 
-                updated_by=self.request.user
-            )
\ No newline at end of file
+        events.record_created(record, self.request.user)
\ No newline at end of file
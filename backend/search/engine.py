@@ -0,0 +1,95 @@
+"""
+Full-text queries over ``SearchDocument``.
+
+Queries are split into words and every word must match as a prefix, so
+``"jan smi"`` finds Jane Smith while she is still being typed. Matches in
+the title weigh more than matches in the body. SQLite ranks with FTS5's
+``bm25()``, PostgreSQL with ``ts_rank()`` over the GIN-indexed tsvector;
+other databases fall back to unranked ``icontains`` filters.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import SearchDocument
+
+WORD = re.compile(r'\w+')
+# words beyond this are ignored
+MAX_TERMS = 8
+# bm25 weight of the title against the body; on PostgreSQL the same ratio
+# comes from ts_rank's default weights for labels A and D
+TITLE_WEIGHT = 10.0
+
+
+def terms(query):
+    return [word.lower() for word in WORD.findall(query or '')][:MAX_TERMS]
+
+
+def _match_expression(words):
+    if connection.vendor == 'sqlite':
+        return ' AND '.join(f'"{word}"*' for word in words)
+    return ' & '.join(f"{word}:*" for word in words)
+
+
+def _fallback(words):
+    documents = SearchDocument.objects.all()
+    for word in words:
+        documents = documents.filter(Q(title__icontains=word) | Q(body__icontains=word))
+    return documents
+
+
+def matching_ids(query, kind):
+    """Subquery of the ``kind`` object ids matching ``query``, for ``pk__in`` filters."""
+    words = terms(query)
+    if not words:
+        return SearchDocument.objects.none().values('object_id')
+    if connection.vendor == 'sqlite':
+        # CROSS JOIN pins the FTS5 table as the outer loop; otherwise SQLite walks
+        # every document of the kind
+        sql = (
+            'SELECT d.object_id FROM search_fts CROSS JOIN search_documents d ON d.id = search_fts.rowid '
+            'WHERE search_fts MATCH %s AND d.kind = %s'
+        )
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT object_id FROM search_documents WHERE search_vector @@ to_tsquery('simple', %s) AND kind = %s"
+    else:
+        return _fallback(words).filter(kind=kind).values('object_id')
+    return RawSQL(sql, [_match_expression(words), kind])
+
+
+def _ranked_sql(kinds):
+    kind_filter = f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})" if kinds else ''
+    if connection.vendor == 'sqlite':
+        rank = f'bm25(search_fts, {TITLE_WEIGHT}, 1.0)'
+        return (
+            f'SELECT d.kind, d.object_id, d.title, -{rank} AS score '
+            f'FROM search_fts CROSS JOIN search_documents d ON d.id = search_fts.rowid '
+            f'WHERE search_fts MATCH %s{kind_filter} '
+            f'ORDER BY {rank}, d.id LIMIT %s'
+        )
+    return (
+        f"SELECT d.kind, d.object_id, d.title, ts_rank(d.search_vector, q) AS score "
+        f"FROM search_documents d, to_tsquery('simple', %s) q "
+        f"WHERE d.search_vector @@ q{kind_filter} "
+        f"ORDER BY score DESC, d.id LIMIT %s"
+    )
+
+
+def search(query, kinds=None, limit=20):
+    """
+    Return up to ``limit`` matches as ``(kind, object_id, title, score)``,
+    best first. A higher score is a better match.
+    """
+    words = terms(query)
+    if not words:
+        return []
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        documents = _fallback(words).filter(kind__in=kinds) if kinds else _fallback(words)
+        rows = documents.order_by('title', 'id').values_list('kind', 'object_id', 'title')[:limit]
+        return [(*row, 0.0) for row in rows]
+
+    with connection.cursor() as cursor:
+        cursor.execute(_ranked_sql(kinds), [_match_expression(words), *(kinds or []), limit])
+        return [(kind, object_id, title, float(score)) for kind, object_id, title, score in cursor.fetchall()]
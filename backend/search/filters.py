@@ -0,0 +1,16 @@
+from rest_framework import filters
+
+from . import engine
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the full-text index instead of ``icontains`` over
+    ``search_fields``. The view names its document kind in ``search_kind``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not engine.terms(query):
+            return queryset
+        return queryset.filter(pk__in=engine.matching_ids(query, view.search_kind))
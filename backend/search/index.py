@@ -0,0 +1,99 @@
+"""
+Keeping ``SearchDocument`` rows in step with the models they describe.
+
+Each kind maps a model to a function returning the document's title and
+body. Single saves go through ``index_instance``; imports and rebuilds hand
+whole batches to ``index_objects``, which replaces them with one delete and
+one ``bulk_create``.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from patients.models import Patient
+from doctors.models import Doctor
+from records.models import MedicalRecord
+from .models import SearchDocument
+
+
+def _join(*values):
+    return ' '.join(str(value) for value in values if value)
+
+
+def patient_document(patient):
+    return (
+        f"{patient.first_name} {patient.last_name}",
+        _join(patient.email, patient.phone, patient.insurance_provider, patient.insurance_id),
+    )
+
+
+def doctor_document(doctor):
+    return (
+        f"Dr. {doctor.first_name} {doctor.last_name}",
+        _join(doctor.specialization, doctor.email, doctor.phone, doctor.bio),
+    )
+
+
+def record_document(record):
+    title = (record.diagnosis or '').strip().split('\n')[0][:120] or f"Medical record #{record.pk}"
+    return title, _join(record.diagnosis, record.symptoms, record.prescription, record.notes)
+
+
+DOCUMENTS = {
+    'patient': (Patient, patient_document),
+    'doctor': (Doctor, doctor_document),
+    'record': (MedicalRecord, record_document),
+}
+
+
+def kind_for(model):
+    for kind, (document_model, _) in DOCUMENTS.items():
+        if document_model is model:
+            return kind
+    return None
+
+
+def _document(kind, instance):
+    title, body = DOCUMENTS[kind][1](instance)
+    return SearchDocument(kind=kind, object_id=instance.pk, title=title[:255], body=body)
+
+
+def index_instance(instance):
+    kind = kind_for(type(instance))
+    document = _document(kind, instance)
+    updated = SearchDocument.objects.filter(kind=kind, object_id=instance.pk).update(
+        title=document.title, body=document.body, updated_at=timezone.now(),
+    )
+    if not updated:
+        SearchDocument.objects.bulk_create([document], ignore_conflicts=True)
+
+
+def remove_instance(instance):
+    SearchDocument.objects.filter(kind=kind_for(type(instance)), object_id=instance.pk).delete()
+
+
+def index_objects(kind, objects):
+    """Replace the documents of ``objects`` (all of one ``kind``) in bulk."""
+    documents = [_document(kind, instance) for instance in objects]
+    with transaction.atomic():
+        SearchDocument.objects.filter(kind=kind, object_id__in=[doc.object_id for doc in documents]).delete()
+        SearchDocument.objects.bulk_create(documents)
+    return len(documents)
+
+
+def rebuild(kinds=None, batch_size=1000):
+    """Re-index every object of ``kinds`` (default all). Returns ``{kind: count}``."""
+    counts = {}
+    for kind in kinds or DOCUMENTS:
+        model = DOCUMENTS[kind][0]
+        SearchDocument.objects.filter(kind=kind).delete()
+        batch, counts[kind] = [], 0
+        for instance in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(instance)
+            if len(batch) == batch_size:
+                counts[kind] += index_objects(kind, batch)
+                batch = []
+        counts[kind] += index_objects(kind, batch)
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO search_fts(search_fts) VALUES ('optimize')")
+    return counts
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search.index import DOCUMENTS, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the patient, doctor and medical record tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*',
+                            help=f"Kinds to rebuild ({', '.join(DOCUMENTS)}); all by default")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **kwargs):
+        unknown = set(kwargs['kinds']) - set(DOCUMENTS)
+        if unknown:
+            raise CommandError(f"Unknown kinds: {', '.join(sorted(unknown))}")
+        counts = rebuild(kwargs['kinds'], kwargs['batch_size'])
+        for kind, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} {kind} documents'))
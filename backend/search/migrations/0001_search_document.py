@@ -0,0 +1,149 @@
+# Generated by Django 3.2.12 on 2026-10-18 07:08
+
+from django.db import migrations, models
+
+# The full-text index is kept next to the table and is not part of the model
+# state. SQLite gets an external-content FTS5 table maintained by triggers;
+# PostgreSQL a generated tsvector column (title weighted A, body D) with a
+# GIN index. The 'simple' configuration keeps words unstemmed on both, so
+# prefix queries behave the same way.
+CREATE_FTS5 = [
+    """
+    CREATE VIRTUAL TABLE search_fts USING fts5(
+        title, body, content='search_documents', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+DROP_FTS5 = [
+    'DROP TRIGGER IF EXISTS search_documents_ai',
+    'DROP TRIGGER IF EXISTS search_documents_ad',
+    'DROP TRIGGER IF EXISTS search_documents_au',
+    'DROP TABLE IF EXISTS search_fts',
+]
+
+CREATE_TSVECTOR = """
+    ALTER TABLE search_documents ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', title), 'A') ||
+            setweight(to_tsvector('simple', body), 'D')
+        ) STORED;
+    CREATE INDEX search_vector_idx ON search_documents USING gin (search_vector);
+"""
+
+DROP_TSVECTOR = """
+    DROP INDEX IF EXISTS search_vector_idx;
+    ALTER TABLE search_documents DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+def add_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in CREATE_FTS5:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute(CREATE_TSVECTOR)
+
+
+def remove_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in DROP_FTS5:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute(DROP_TSVECTOR)
+
+
+# frozen copies of the document builders in search.index as they were when this
+# migration was written, so later changes there do not alter it
+def _join(*values):
+    return ' '.join(str(value) for value in values if value)
+
+
+def patient_document(patient):
+    return (
+        f"{patient.first_name} {patient.last_name}",
+        _join(patient.email, patient.phone, patient.insurance_provider, patient.insurance_id),
+    )
+
+
+def doctor_document(doctor):
+    return (
+        f"Dr. {doctor.first_name} {doctor.last_name}",
+        _join(doctor.specialization, doctor.email, doctor.phone, doctor.bio),
+    )
+
+
+def record_document(record):
+    title = (record.diagnosis or '').strip().split('\n')[0][:120] or f"Medical record #{record.pk}"
+    return title, _join(record.diagnosis, record.symptoms, record.prescription, record.notes)
+
+
+def index_existing_rows(apps, schema_editor):
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    sources = [
+        ('patient', apps.get_model('patients', 'Patient'), patient_document),
+        ('doctor', apps.get_model('doctors', 'Doctor'), doctor_document),
+        ('record', apps.get_model('records', 'MedicalRecord'), record_document),
+    ]
+    for kind, model, document in sources:
+        batch = []
+        for instance in model.objects.order_by('pk').iterator(chunk_size=1000):
+            title, body = document(instance)
+            batch.append(SearchDocument(kind=kind, object_id=instance.pk, title=title[:255], body=body))
+            if len(batch) == 1000:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('patients', '0001_initial'),
+        ('doctors', '0005_availability_avail_doctor_date_idx'),
+        ('records', '0002_medicalrecord_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('patient', 'Patient'), ('doctor', 'Doctor'), ('record', 'Medical record')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'search_documents',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+        migrations.RunPython(index_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of one patient, doctor or medical record. The full-text
+    index over ``title`` and ``body`` lives outside the model: an FTS5 table
+    on SQLite, a generated tsvector column with a GIN index on PostgreSQL.
+    """
+    KINDS = [
+        ('patient', 'Patient'),
+        ('doctor', 'Doctor'),
+        ('record', 'Medical record'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'search_documents'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id}: {self.title}"
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from patients.models import Patient
+from doctors.models import Doctor
+from records.models import MedicalRecord
+from .index import index_instance, remove_instance
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_save, sender=Doctor)
+@receiver(post_save, sender=MedicalRecord)
+def document_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_instance(instance)
+
+
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=Doctor)
+@receiver(post_delete, sender=MedicalRecord)
+def document_deleted(sender, instance, **kwargs):
+    remove_instance(instance)
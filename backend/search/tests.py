@@ -0,0 +1,116 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+import io
+
+from patients.models import Patient
+from doctors.models import Doctor
+from records.models import MedicalRecord
+from search.models import SearchDocument
+from search import engine
+
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+   def setUp(self):
+       cache.clear()
+       self.client = APIClient()
+       User.objects.create_user(username='staffuser', password='staffpass123', role='STAFF')
+       self.jane = Patient.objects.create(
+           first_name='Jane',
+           last_name='Smith',
+           date_of_birth='1990-01-01',
+           email='jane.smith@example.com',
+           insurance_provider='Acme Health'
+       )
+       self.john = Patient.objects.create(
+           first_name='John',
+           last_name='Doe',
+           date_of_birth='1985-05-05',
+           email='john.doe@example.com'
+       )
+       self.doctor = Doctor.objects.create(
+           first_name='Gregory',
+           last_name='House',
+           email='house@example.com',
+           specialization='Diagnostics'
+       )
+       self.record = MedicalRecord.objects.create(
+           patient=self.john,
+           doctor=self.doctor,
+           diagnosis='Seasonal influenza',
+           symptoms='Fever and cough',
+           notes='Follow up with Dr. House if the fever persists'
+       )
+       token = self.client.post('/api/auth/token/', {
+           'username': 'staffuser',
+           'password': 'staffpass123'
+       }).data['access']
+       self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+   def found(self, query, kinds=None):
+       return [(kind, object_id) for kind, object_id, _, _ in engine.search(query, kinds)]
+
+   def test_saves_are_indexed(self):
+       self.assertEqual(self.found('jan smi'), [('patient', self.jane.id)])
+       self.assertEqual(self.found('influenza'), [('record', self.record.id)])
+
+       self.jane.insurance_provider = 'Globex'
+       self.jane.save()
+       self.assertEqual(self.found('acme'), [])
+       self.assertEqual(self.found('jane globex'), [('patient', self.jane.id)])
+
+       self.record.delete()
+       self.assertEqual(self.found('influenza'), [])
+       self.assertFalse(SearchDocument.objects.filter(kind='record').exists())
+
+   def test_title_matches_rank_first(self):
+       # "house" is the doctor's name and only mentioned in the record's notes
+       self.assertEqual(self.found('house'), [('doctor', self.doctor.id), ('record', self.record.id)])
+       self.assertEqual(self.found('house', ['record']), [('record', self.record.id)])
+
+   def test_query_syntax_is_not_interpreted(self):
+       self.assertEqual(self.found('"smith* -('), [('patient', self.jane.id)])
+       self.assertEqual(self.found('  '), [])
+
+   def test_search_endpoint(self):
+       response = self.client.get('/api/search/', {'q': 'fever', 'type': 'record,patient'})
+       self.assertEqual(response.status_code, status.HTTP_200_OK)
+       self.assertEqual(len(response.data['results']), 1)
+       result = response.data['results'][0]
+       self.assertEqual((result['type'], result['id']), ('record', self.record.id))
+       self.assertEqual(result['object']['diagnosis'], 'Seasonal influenza')
+
+       response = self.client.get('/api/search/doctor/', {'q': 'diag'})
+       self.assertEqual([r['id'] for r in response.data['results']], [self.doctor.id])
+
+       self.assertEqual(self.client.get('/api/search/', {'q': 'x', 'type': 'nurse'}).status_code, status.HTTP_400_BAD_REQUEST)
+       self.assertEqual(self.client.get('/api/search/nurse/', {'q': 'x'}).status_code, status.HTTP_404_NOT_FOUND)
+
+   def test_search_endpoint_queries(self):
+       # one ranked query plus one per kind in the results
+       with self.assertNumQueries(3):
+           response = self.client.get('/api/search/', {'q': 'house'})
+       self.assertEqual(len(response.data['results']), 2)
+
+   def test_list_search_parameter_uses_index(self):
+       response = self.client.get('/api/patients/', {'search': 'acme'})
+       self.assertEqual([p['id'] for p in response.data['results']], [self.jane.id])
+       response = self.client.get('/api/doctors/', {'search': 'diagnostics'})
+       self.assertEqual([d['id'] for d in response.data['results']], [self.doctor.id])
+       response = self.client.get('/api/records/', {'search': 'cough'})
+       self.assertEqual([r['id'] for r in response.data['results']], [self.record.id])
+
+   def test_rebuild_restores_missing_documents(self):
+       Patient.objects.filter(pk=self.jane.pk).update(first_name='Janet')
+       SearchDocument.objects.filter(kind='patient').delete()
+       out = io.StringIO()
+       call_command('rebuild_search_index', 'patient', stdout=out)
+       self.assertIn('Indexed 2 patient documents', out.getvalue())
+       self.assertEqual(self.found('janet'), [('patient', self.jane.id)])
+       self.assertEqual(SearchDocument.objects.count(), 4)
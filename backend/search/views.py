@@ -0,0 +1,68 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from patients.serializers import PatientListSerializer
+from doctors.serializers import DoctorListSerializer
+from records.serializers import MedicalRecordSerializer
+from core.prefetch import optimize_queryset
+from .index import DOCUMENTS
+from . import engine
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+SERIALIZERS = {
+    'patient': PatientListSerializer,
+    'doctor': DoctorListSerializer,
+    'record': MedicalRecordSerializer,
+}
+
+
+def _hydrate(matches, context):
+    """Serialize the matched objects with one query per kind, keeping the rank order."""
+    ids = {}
+    for kind, object_id, _, _ in matches:
+        ids.setdefault(kind, []).append(object_id)
+    objects = {}
+    for kind, object_ids in ids.items():
+        serializer_class = SERIALIZERS[kind]
+        queryset = optimize_queryset(DOCUMENTS[kind][0].objects.filter(pk__in=object_ids), serializer_class)
+        for data in serializer_class(queryset, many=True, context=context).data:
+            objects[kind, data['id']] = data
+    return [
+        {'type': kind, 'id': object_id, 'title': title, 'score': round(score, 4), 'object': objects[kind, object_id]}
+        # documents whose object is gone (e.g. deleted by a bulk query) are skipped
+        for kind, object_id, title, score in matches if (kind, object_id) in objects
+    ]
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search(request, kind=None):
+    """
+    Ranked full-text search over patients, doctors and medical records.
+    ``q`` is the query, ``type`` an optional comma-separated list of kinds.
+    """
+    if kind is not None and kind not in DOCUMENTS:
+        raise NotFound(f"Unknown search type '{kind}'.")
+    kinds = [kind] if kind else [value for value in request.query_params.get('type', '').split(',') if value]
+    unknown = set(kinds) - set(DOCUMENTS)
+    if unknown:
+        return Response(
+            {"detail": f"Unknown search type: {', '.join(sorted(unknown))}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = min(int(request.query_params.get('limit', SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+    except ValueError:
+        return Response({"detail": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+    query = request.query_params.get('q', '')
+    matches = engine.search(query, kinds, max(limit, 1))
+    return Response({
+        'query': query,
+        'results': _hydrate(matches, {'request': request}),
+    })
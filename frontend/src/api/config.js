@@ -0,0 +1,5 @@
+// List endpoints are paginated: rows are under `results`, with `next`/`previous` links.
+export const listResults = (data) => (Array.isArray(data) ? data : data.results);
+
+// Largest page the API serves, for pickers that need every patient or doctor.
+export const MAX_PAGE_SIZE = 500;
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate, useLocation } from 'react-router-dom';
 import axios from 'axios';
+import { listResults, MAX_PAGE_SIZE } from '../../api/config';
 import { toast } from 'react-toastify';
 import DatePicker from 'react-datepicker';
 import "react-datepicker/dist/react-datepicker.css";
@@ -113,8 +114,8 @@ const AppointmentForm = () => {
  
  const fetchPatients = async () => {
    try {
-     const res = await axios.get('/api/patients/');
-     setPatients(res.data);
+     const res = await axios.get(`/api/patients/?page_size=${MAX_PAGE_SIZE}`);
+     setPatients(listResults(res.data));
    } catch (err) {
      console.error('Error fetching patients:', err);
      toast.error('Failed to load patients. Please refresh the page.');
@@ -123,8 +124,8 @@ const AppointmentForm = () => {
  
  const fetchDoctors = async () => {
    try {
-     const res = await axios.get('/api/doctors/');
-     setDoctors(res.data);
+     const res = await axios.get(`/api/doctors/?page_size=${MAX_PAGE_SIZE}`);
+     setDoctors(listResults(res.data));
    } catch (err) {
      console.error('Error fetching doctors:', err);
      toast.error('Failed to load doctors. Please refresh the page.');
@@ -206,8 +207,8 @@ const AppointmentForm = () => {
        }
        
        // Get booked appointments
-       const bookedRes = await axios.get(`/api/appointments/?doctor=${doctorId}&date=${date}&status=SCHEDULED`);
-       const bookedTimes = bookedRes.data.map(app => {
+       const bookedRes = await axios.get(`/api/appointments/?doctor=${doctorId}&date=${date}&status=SCHEDULED&page_size=${MAX_PAGE_SIZE}`);
+       const bookedTimes = listResults(bookedRes.data).map(app => {
          const appTime = new Date(app.appointment_datetime);
          return `${appTime.getHours().toString().padStart(2, '0')}:${appTime.getMinutes().toString().padStart(2, '0')}`;
        });
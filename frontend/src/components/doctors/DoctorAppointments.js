@@ -2,6 +2,7 @@ import React, { useState, useEffect, useContext } from 'react';
 import { Link } from 'react-router-dom';
 import { AuthContext } from '../../context/AuthContext';
 import axios from 'axios';
+import { listResults } from '../../api/config';
 
 const DoctorAppointments = () => {
   const { user } = useContext(AuthContext);
@@ -13,7 +14,7 @@ const DoctorAppointments = () => {
     const fetchAppointments = async () => {
       try {
         const res = await axios.get(`/api/doctors/my_appointments/`);
-        setAppointments(res.data);
+        setAppointments(listResults(res.data));
         setLoading(false);
       } catch (err) {
         console.error('Error fetching appointments:', err);
@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useContext } from 'react';
 import axios from 'axios';
+import { listResults, MAX_PAGE_SIZE } from '../../api/config';
 import { toast } from 'react-toastify';
 import { AuthContext } from '../../context/AuthContext';
 import DatePicker from 'react-datepicker';
@@ -66,11 +67,12 @@ const DoctorAvailability = () => {
    const fetchDoctorData = async () => {
      setLoading(true);
      try {
-       const res = await axios.get('/api/doctors/');
+       const res = await axios.get(`/api/doctors/?page_size=${MAX_PAGE_SIZE}`);
+       const doctors = listResults(res.data);
        
-       const doctorRecord = res.data.find(d => 
+       const doctorRecord = doctors.find(d => 
          (user?.first_name && d.first_name === user.first_name) || 
-         res.data[0] 
+         doctors[0] 
        );
        
        if (doctorRecord) {
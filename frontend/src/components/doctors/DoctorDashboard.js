@@ -11,9 +11,8 @@ const DoctorDashboard = () => {
   useEffect(() => {
   const fetchTodayAppointments = async () => {
     try {
-      const today = new Date().toISOString().split('T')[0];
-      const res = await axios.get(`/api/doctors/my_appointments/?date=${today}`);
-      setTodayAppointments(res.data);
+      const res = await axios.get(`/api/doctors/my_dashboard/`);
+      setTodayAppointments(res.data.appointments_today);
       setLoading(false);
     } catch (err) {
       console.error('Error fetching appointments:', err);
@@ -1,6 +1,7 @@
 import React, { useState, useEffect , useContext} from 'react';
 import { Link, useParams, useNavigate } from 'react-router-dom';
 import axios from 'axios';
+import { listResults } from '../../api/config';
 import Spinner from '../layout/Spinner';
 import { toast } from 'react-toastify';
 import { AuthContext } from '../../context/AuthContext';
@@ -27,8 +28,8 @@ const PatientDetail = () => {
         ]);
         
         setPatient(patientRes.data);
-        setAppointments(appointmentsRes.data);
-        setRecords(recordsRes.data);
+        setAppointments(listResults(appointmentsRes.data));
+        setRecords(listResults(recordsRes.data));
         setLoading(false);
       } catch (err) {
         console.error('Error fetching patient data:', err);
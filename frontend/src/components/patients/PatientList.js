@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useContext } from 'react';
 import { Link } from 'react-router-dom';
 import axios from 'axios';
+import { listResults } from '../../api/config';
 import { AuthContext } from '../../context/AuthContext';
 import Spinner from '../layout/Spinner';
 
@@ -27,7 +28,7 @@ const PatientList = () => {
          const uniquePatients = [];
          const patientIds = new Set();
          
-         res.data.forEach(appointment => {
+         listResults(res.data).forEach(appointment => {
            if (!patientIds.has(appointment.patient)) {
              patientIds.add(appointment.patient);
              uniquePatients.push(appointment.patient_details);
@@ -36,7 +37,7 @@ const PatientList = () => {
          
          setPatients(uniquePatients);
        } else {
-         setPatients(res.data);
+         setPatients(listResults(res.data));
        }
        
        setLoading(false);
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useContext } from 'react';
 import { useParams, useNavigate, useLocation } from 'react-router-dom';
 import axios from 'axios';
+import { listResults, MAX_PAGE_SIZE } from '../../api/config';
 import { toast } from 'react-toastify';
 import { AuthContext } from '../../context/AuthContext';
 
@@ -35,13 +36,13 @@ const MedicalRecordForm = () => {
    const fetchInitialData = async () => {
      setLoading(true);
      try {
-       const patientsRes = await axios.get('/api/patients/');
-       setPatients(patientsRes.data);
+       const patientsRes = await axios.get(`/api/patients/?page_size=${MAX_PAGE_SIZE}`);
+       setPatients(listResults(patientsRes.data));
 
-       const doctorsRes = await axios.get('/api/doctors/');
-       setDoctors(doctorsRes.data);
+       const doctorsRes = await axios.get(`/api/doctors/?page_size=${MAX_PAGE_SIZE}`);
+       setDoctors(listResults(doctorsRes.data));
        
-       const doctorUser = doctorsRes.data.find(d => d.user === user?.id || d.email === user?.email);
+       const doctorUser = listResults(doctorsRes.data).find(d => d.user === user?.id || d.email === user?.email);
        if (doctorUser) {
          setCurrentDoctor(doctorUser);
          setFormData(prev => ({
@@ -52,7 +53,7 @@ const MedicalRecordForm = () => {
 
        if (patientId) {
          const appointmentsRes = await axios.get(`/api/appointments/?patient=${patientId}`);
-         setAppointments(appointmentsRes.data);
+         setAppointments(listResults(appointmentsRes.data));
        }
 
        if (id) {
@@ -71,7 +72,7 @@ const MedicalRecordForm = () => {
 
          if (record.patient && !patientId) {
            const appointmentsRes = await axios.get(`/api/appointments/?patient=${record.patient}`);
-           setAppointments(appointmentsRes.data);
+           setAppointments(listResults(appointmentsRes.data));
          }
        }
 
@@ -112,7 +113,7 @@ const MedicalRecordForm = () => {
    if (patientId) {
      try {
        const appointmentsRes = await axios.get(`/api/appointments/?patient=${patientId}`);
-       setAppointments(appointmentsRes.data);
+       setAppointments(listResults(appointmentsRes.data));
      } catch (err) {
        console.error('Error fetching patient appointments:', err);
        toast.error('Failed to load patient appointments');
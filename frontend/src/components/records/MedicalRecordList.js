@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useContext } from 'react';
 import { Link } from 'react-router-dom';
 import axios from 'axios';
+import { listResults } from '../../api/config';
 import { AuthContext } from '../../context/AuthContext';
 import Spinner from '../layout/Spinner';
 
@@ -23,7 +24,7 @@ const MedicalRecordList = () => {
       }
        
        const res = await axios.get(url);
-       setRecords(res.data);
+       setRecords(listResults(res.data));
        setLoading(false);
      } catch (err) {
        console.error('Error fetching medical records:', err);